@@ -0,0 +1,78 @@
+"""
+Compare the per-row insert path (Queries.insert_*) with BulkWriter.
+
+Runs against the database configured in .env and drops all tables first, so
+point it at a scratch database:
+
+    python benchmarks/bench_bulk_insert.py --recreate_tables --articles 20 --compounds 10 --assays 500
+"""
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+import argparse
+import time
+from src.schemas.compound_extraction import Assay
+from src.storage.bulk_writer import BulkWriter
+from src.storage.queries import Queries
+
+
+def synthetic_corpus(n_articles: int, n_compounds: int, n_assays: int, offset: int) -> list[tuple]:
+    corpus = []
+    for a in range(n_articles):
+        pmid = str(offset + a)
+        article = {
+            "pmid": pmid, "doi": f"10.0/{pmid}", "title": f"Article {pmid}", "abstract": "...",
+            "journal": "Bench", "authors": "A B", "pdf_url": None, "disease_area": "oncology",
+        }
+        enriched = []
+        for c in range(n_compounds):
+            # Half of the compounds are shared between articles
+            cid = offset + (c if c % 2 else a * n_compounds + c)
+            compound = {
+                "name": f"compound-{cid}", "pubchem_cid": cid, "molecular_formula": "C1",
+                "molecular_weight": 100.0, "logp": 1.0, "tpsa": 10.0, "lipinski_pass": True,
+            }
+            assays = [
+                Assay(assay_id=i, assay_type="Confirmatory", target_name="P00000", activity_outcome="active",
+                      potency_type="IC50", potency_value=1.5, potency_unit="uM", reference=None)
+                for i in range(n_assays)
+            ]
+            enriched.append((compound, assays, "benchmark"))
+        corpus.append((article, enriched))
+    return corpus
+
+
+def per_row(corpus: list[tuple]) -> None:
+    for article, enriched in corpus:
+        article_id = Queries.insert_article(article)
+        for compound, assays, context in enriched:
+            compound_id = Queries.insert_compound(compound, article_id, context)
+            for assay in assays:
+                Queries.insert_assay(assay, compound_id)
+
+
+def bulk(corpus: list[tuple]) -> None:
+    with BulkWriter() as writer:
+        for article, enriched in corpus:
+            writer.add_article(article, enriched)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk insert benchmark")
+    parser.add_argument("--recreate_tables", action="store_true", help="Confirm that all tables may be dropped")
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--compounds", type=int, default=10)
+    parser.add_argument("--assays", type=int, default=500)
+    args = parser.parse_args()
+
+    if not args.recreate_tables:
+        parser.error("this benchmark drops all tables, pass --recreate_tables to confirm")
+    Queries.create_tables(drop=True)
+
+    for label, fn, offset in (("per-row", per_row, 1_000_000), ("bulk", bulk, 2_000_000)):
+        corpus = synthetic_corpus(args.articles, args.compounds, args.assays, offset)
+        start = time.perf_counter()
+        fn(corpus)
+        elapsed = time.perf_counter() - start
+        rows = sum(len(e) * (1 + args.assays) + 1 for _, e in corpus)
+        print(f"{label:>8}: {elapsed:8.2f}s  ({rows / elapsed:,.0f} rows/s)")
@@ -0,0 +1,64 @@
+"""
+Compare the legacy fixed-size chunker with the token- and structure-aware one.
+
+Reads PDFs from an article directory (text comes from the text cache when
+available) and reports NER calls and estimated input tokens per article:
+
+    python benchmarks/bench_chunking.py --article_dir data/raw --limit 50
+"""
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+import argparse
+from pathlib import Path
+from src.utils.file_io import file_sha256
+from src.utils.pdf_utils import chunk_text, estimate_tokens, extract_text_from_pdf, read_cached_text
+from src.utils.prompt import PROMPT_TEMPLATE
+
+
+def fixed_chunks(text: str, chunk_size: int = 5000, overlap: int = 250) -> list[str]:
+    # The previous pdf_utils.chunk_text: raw character windows
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def load_text(pdf_file: Path) -> str:
+    text = read_cached_text(file_sha256(pdf_file))
+    return text if text is not None else extract_text_from_pdf(pdf_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunking benchmark")
+    parser.add_argument("--article_dir", type=Path, default=Path("data/raw"))
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of PDFs (0 = all)")
+    parser.add_argument("--keep_back_matter", action="store_true", help="Do not drop references/acknowledgements")
+    args = parser.parse_args()
+
+    pdf_files = sorted(args.article_dir.glob("*.pdf"))
+    if args.limit:
+        pdf_files = pdf_files[:args.limit]
+    if not pdf_files:
+        parser.error(f"no PDFs in {args.article_dir}")
+
+    overhead = estimate_tokens(PROMPT_TEMPLATE.format(text=""))
+    totals = {"fixed": [0, 0], "structured": [0, 0]}
+    for pdf_file in pdf_files:
+        text = load_text(pdf_file)
+        for label, chunks in (
+                ("fixed", fixed_chunks(text)),
+                ("structured", chunk_text(text, drop_back_matter=not args.keep_back_matter)),
+        ):
+            totals[label][0] += len(chunks)
+            # Every call pays for the prompt template on top of its text
+            totals[label][1] += sum(estimate_tokens(c) + overhead for c in chunks)
+
+    n = len(pdf_files)
+    print(f"{n} articles, prompt overhead {overhead} tokens per call")
+    for label, (calls, tokens) in totals.items():
+        print(f"{label:>10}: {calls:6d} calls ({calls / n:5.1f}/article)  {tokens:10,d} input tokens ({tokens / n:8,.0f}/article)")
+    fixed_tokens, structured_tokens = totals["fixed"][1], totals["structured"][1]
+    print(f"input tokens saved: {1 - structured_tokens / fixed_tokens:.1%}")
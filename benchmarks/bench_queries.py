@@ -0,0 +1,104 @@
+"""
+Time the analytics query mix with and without the secondary indexes.
+
+Each query runs `--repeat` times with the indexes in place, then again inside
+a transaction that drops them and is rolled back afterwards. DROP INDEX locks
+the tables until the rollback, so run it against a copy of the database:
+
+    python benchmarks/bench_queries.py --repeat 5 [--explain]
+"""
+import os
+import sys
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+import argparse
+import statistics
+import time
+from sqlalchemy import text
+from src.storage.database import sync_engine
+from src.storage.migrations import migrate
+from src.storage.models import Base
+
+# Representative of the SQL generated in the Streamlit app
+QUERIES = {
+    "article by pmid": "SELECT * FROM articles WHERE pmid = :pmid",
+    "articles per disease area": "SELECT count(*) FROM articles WHERE disease_area = :disease_area",
+    "compounds of an article": """
+        SELECT c.name, c.pubchem_cid FROM compounds c
+        JOIN article_compound ac ON ac.compound_id = c.id
+        WHERE ac.article_id = :article_id
+    """,
+    "active assays of a compound": """
+        SELECT a.assay_id, a.target_name, a.potency_type, a.potency_value FROM assays a
+        JOIN compounds c ON c.id = a.compound_id
+        WHERE c.name = :compound AND a.activity_outcome = 'active'
+    """,
+    "compounds active on a target": """
+        SELECT DISTINCT c.name FROM compounds c
+        JOIN assays a ON a.compound_id = c.id
+        WHERE a.target_name = :target AND a.activity_outcome = 'active'
+    """,
+    "articles mentioning a target": """
+        SELECT DISTINCT ar.pmid, ar.title FROM articles ar
+        JOIN article_compound ac ON ac.article_id = ar.id
+        JOIN assays a ON a.compound_id = ac.compound_id
+        WHERE a.target_name = :target AND a.activity_outcome = 'active'
+    """,
+}
+
+PARAMS_SQL = {
+    "pmid": "SELECT pmid FROM articles ORDER BY id DESC LIMIT 1",
+    "disease_area": "SELECT disease_area FROM articles WHERE disease_area IS NOT NULL LIMIT 1",
+    "article_id": "SELECT article_id FROM article_compound LIMIT 1",
+    "compound": "SELECT c.name FROM compounds c JOIN assays a ON a.compound_id = c.id LIMIT 1",
+    "target": "SELECT target_name FROM assays WHERE activity_outcome = 'active' AND target_name IS NOT NULL LIMIT 1",
+}
+
+
+def index_names() -> list[str]:
+    return [index.name for table in Base.metadata.sorted_tables for index in table.indexes]
+
+
+def time_queries(conn, params: dict, repeat: int, explain: bool) -> dict[str, float]:
+    timings = {}
+    for label, sql in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            samples.append(time.perf_counter() - start)
+        timings[label] = statistics.median(samples)
+        if explain:
+            plan = conn.execute(text(f"EXPLAIN {sql}"), params).scalars().all()
+            print(f"--- {label}\n" + "\n".join(plan))
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (median is reported)")
+    parser.add_argument("--explain", action="store_true", help="Print query plans")
+    args = parser.parse_args()
+
+    migrate(sync_engine)
+    with sync_engine.connect() as conn:
+        params = {name: conn.execute(text(sql)).scalar() for name, sql in PARAMS_SQL.items()}
+        if any(value is None for value in params.values()):
+            parser.error(f"not enough data to pick query parameters: {params}")
+
+        print("with indexes")
+        indexed = time_queries(conn, params, args.repeat, args.explain)
+        conn.rollback()
+
+        transaction = conn.begin()
+        try:
+            for name in index_names():
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            print("without indexes")
+            plain = time_queries(conn, params, args.repeat, args.explain)
+        finally:
+            # DDL is transactional in PostgreSQL: the indexes come back untouched
+            transaction.rollback()
+
+    for label in QUERIES:
+        print(f"{label:>30}: {plain[label] * 1000:9.2f} ms -> {indexed[label] * 1000:9.2f} ms "
+              f"({plain[label] / max(indexed[label], 1e-9):6.1f}x)")
@@ -1,15 +1,17 @@
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
+from src.core import settings
 from vanna_calls import (
+    setup_vanna,
     generate_questions_cached,
     generate_sql_cached,
     run_sql_cached,
-    generate_plotly_code_cached,
     generate_plot_cached,
-    generate_followup_cached,
     should_generate_chart_cached,
     is_sql_valid_cached,
-    generate_summary_cached
+    answer_tasks,
+    generate_combined_answer,
 )
 
 avatar_url = "https://vanna.ai/img/vanna.svg"
@@ -57,6 +59,10 @@ if my_question is None:
 
 if my_question:
     st.session_state["my_question"] = my_question
+    if st.session_state.get("df_question") != my_question:
+        # Never show or summarize the result of the previous question
+        st.session_state["df_question"] = my_question
+        st.session_state["df"] = None
     user_message = st.chat_message("user")
     user_message.write(f"{my_question}")
 
@@ -94,57 +100,91 @@ if my_question:
                 else:
                     assistant_message_table.dataframe(df)
 
-            if should_generate_chart_cached(question=my_question, sql=sql, df=df):
-
-                code = generate_plotly_code_cached(question=my_question, sql=sql, df=df)
-
-                if st.session_state.get("show_plotly_code", False):
-                    assistant_message_plotly_code = st.chat_message(
-                        "assistant",
-                        avatar=avatar_url,
-                    )
-                    assistant_message_plotly_code.code(
-                        code, language="python", line_numbers=True
-                    )
-
-                if code is not None and code != "":
-                    if st.session_state.get("show_chart", True):
-                        assistant_message_chart = st.chat_message(
-                            "assistant",
-                            avatar=avatar_url,
-                        )
-                        fig = generate_plot_cached(code=code, df=df)
+            chart = should_generate_chart_cached(question=my_question, sql=sql, df=df) and (
+                st.session_state.get("show_plotly_code", False) or st.session_state.get("show_chart", True)
+            )
+            show_summary = st.session_state.get("show_summary", True)
+            show_followup = st.session_state.get("show_followup", True)
+
+            # One placeholder per panel, in display order, filled as soon as its result arrives
+            placeholders = {}
+            if chart:
+                placeholders["plotly_code"] = st.chat_message("assistant", avatar=avatar_url).empty()
+            if show_summary:
+                placeholders["summary"] = st.chat_message("assistant", avatar=avatar_url).empty()
+            if show_followup:
+                placeholders["followup_questions"] = st.chat_message("assistant", avatar=avatar_url).empty()
+            for name, placeholder in placeholders.items():
+                placeholder.caption(f"Generating {name.replace('_', ' ')} ...")
+
+            def render(name, value):
+                placeholder = placeholders[name]
+                if name == "plotly_code":
+                    container = placeholder.container()
+                    if st.session_state.get("show_plotly_code", False):
+                        container.code(value, language="python", line_numbers=True)
+                    if value and st.session_state.get("show_chart", True):
+                        fig = generate_plot_cached(code=value, df=df)
                         if fig is not None:
-                            assistant_message_chart.plotly_chart(fig)
+                            container.plotly_chart(fig)
                         else:
-                            assistant_message_chart.error("I couldn't generate a chart")
-
-            if st.session_state.get("show_summary", True):
-                assistant_message_summary = st.chat_message(
-                    "assistant",
-                    avatar=avatar_url,
-                )
-                summary = generate_summary_cached(question=my_question, df=df)
-                if summary is not None:
-                    assistant_message_summary.text(summary)
-
-            if st.session_state.get("show_followup", True):
-                assistant_message_followup = st.chat_message(
-                    "assistant",
-                    avatar=avatar_url,
-                )
-                followup_questions = generate_followup_cached(
-                    question=my_question, sql=sql, df=df
-                )
-                st.session_state["df"] = None
-
-                if len(followup_questions) > 0:
-                    assistant_message_followup.text(
-                        "Here are some possible follow-up questions"
+                            container.error("I couldn't generate a chart")
+                elif name == "summary":
+                    if value is not None:
+                        placeholder.text(value)
+                    else:
+                        placeholder.empty()
+                else:
+                    container = placeholder.container()
+                    if value:
+                        container.text("Here are some possible follow-up questions")
+                        # Print the first 5 follow-up questions
+                        for question in value[:5]:
+                            container.button(question, on_click=set_question, args=(question,))
+
+            # Results of the current question and SQL are kept so that reruns (e.g. widget clicks)
+            # do not call the LLM again; a new question replaces them
+            if st.session_state.get("answers_key") != (my_question, sql):
+                st.session_state["answers_key"] = (my_question, sql)
+                st.session_state["answers"] = {}
+            answers = st.session_state["answers"]
+            missing = [name for name in placeholders if name not in answers]
+            for name in placeholders:
+                if name in answers:
+                    render(name, answers[name])
+
+            if missing:
+                vn = setup_vanna()
+                combined = None
+                if settings.VANNA_COMBINED_ANSWER and len(missing) > 1:
+                    try:
+                        combined = generate_combined_answer(vn, my_question, sql, df)
+                    except Exception as e:
+                        st.warning(f"Combined answer failed, falling back to separate requests: {e}")
+                if combined is not None:
+                    for name in missing:
+                        answers[name] = combined[name]
+                        render(name, combined[name])
+                else:
+                    tasks = answer_tasks(
+                        vn, my_question, sql, df,
+                        chart="plotly_code" in missing,
+                        summary="summary" in missing,
+                        followup="followup_questions" in missing,
                     )
-                    # Print the first 5 follow-up questions
-                    for question in followup_questions[:5]:
-                        assistant_message_followup.button(question, on_click=set_question, args=(question,))
+                    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+                        futures = {pool.submit(fn): name for name, fn in tasks.items()}
+                        for future in as_completed(futures):
+                            name = futures[future]
+                            try:
+                                answers[name] = future.result()
+                            except Exception as e:
+                                placeholders[name].error(f"Failed to generate {name.replace('_', ' ')}: {e}")
+                                continue
+                            render(name, answers[name])
+
+            if show_followup:
+                st.session_state["df"] = None
 
     else:
         assistant_message_error = st.chat_message(
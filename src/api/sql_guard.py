@@ -0,0 +1,202 @@
+"""
+Guarded execution of LLM-generated SQL with a shared result cache.
+
+Every query runs on the query pool in a read-only transaction with a
+server-side statement timeout. Before it runs, EXPLAIN estimates its cost and
+row count: queries returning more than SQL_ROW_CAP rows or costing more than
+SQL_MAX_COST are wrapped in a LIMIT, and rejected if even the limited plan is
+too expensive (e.g. a large sort or aggregate). Results are cached on disk for
+SQL_CACHE_TTL_SECONDS, keyed by the SQL and the data version that the
+pipeline bumps after every write, so all app processes share the cache and a
+pipeline run invalidates it. Frames are cached as Parquet, so dtypes (dates,
+decimals, nullable integers) survive the round trip without unpickling
+anything read from the shared cache file.
+"""
+import base64
+import io
+import json
+import logging
+import re
+from dataclasses import dataclass
+import pandas as pd
+from sqlalchemy import text
+from src.core import settings
+from src.storage.cache import SqliteCache, make_key
+from src.storage.database import query_engine
+from src.storage.queries import Queries
+
+logger = logging.getLogger("pubchem_db")
+
+_READ_ONLY_RE = re.compile(r"^\s*(?:SELECT|WITH|VALUES|TABLE)\b", re.IGNORECASE)
+
+
+class SqlGuardError(Exception):
+    """Raised for SQL that is not a single read-only statement or is too expensive to run."""
+
+
+@dataclass
+class GuardedResult:
+    """
+    Result of a guarded query.
+
+    Args:
+        frame (pd.DataFrame): Result rows, at most the row cap.
+        truncated (bool): More rows matched than the row cap.
+        rewritten (bool): The query was wrapped in a LIMIT by the cost check.
+        cost (float): Planner cost estimate of the executed query.
+        cached (bool): Served from the result cache.
+    """
+    frame: pd.DataFrame
+    truncated: bool
+    rewritten: bool
+    cost: float
+    cached: bool = False
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Strip whitespace and trailing semicolons, and reject anything but one read-only statement.
+
+    Args:
+        sql (str): Generated SQL.
+
+    Returns:
+        str: Statement ready to be wrapped or explained.
+    """
+    statement = sql.strip().rstrip(";").strip()
+    if not _READ_ONLY_RE.match(statement):
+        raise SqlGuardError("only SELECT queries can be run")
+    if ";" in re.sub(r"'(?:[^']|'')*'", "", statement):
+        raise SqlGuardError("only a single statement can be run")
+    return statement
+
+
+def _explain(conn, sql: str) -> tuple[float, float]:
+    plan = conn.execution_options(no_parameters=True).exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]["Plan"]
+    return top["Total Cost"], top["Plan Rows"]
+
+
+def guard_sql(conn, sql: str, row_cap: int, max_cost: float) -> tuple[str, bool, float]:
+    """
+    Check a query's plan and add a LIMIT to runaway queries.
+
+    Args:
+        conn (Connection): Connection inside the guarded transaction.
+        sql (str): Normalized SQL.
+        row_cap (int): Maximum rows returned.
+        max_cost (float): Maximum planner cost.
+
+    Returns:
+        tuple[str, bool, float]: SQL to run, whether it was rewritten, and its estimated cost.
+    """
+    cost, rows = _explain(conn, sql)
+    if cost <= max_cost and rows <= row_cap:
+        return sql, False, cost
+
+    # One extra row tells whether the result was truncated
+    limited = f"SELECT * FROM ({sql}) AS guarded LIMIT {row_cap + 1}"
+    limited_cost, _ = _explain(conn, limited)
+    if limited_cost > max_cost:
+        raise SqlGuardError(
+            f"query is too expensive (estimated cost {cost:,.0f}, limit {max_cost:,.0f}); "
+            "add filters or aggregate over a summary view"
+        )
+    logger.info(f"Rewrote query with LIMIT {row_cap + 1}: estimated cost {cost:,.0f} -> {limited_cost:,.0f}")
+    return limited, True, limited_cost
+
+
+class SqlGuard:
+    """
+    Run generated SQL under a timeout, a row cap and a plan cost check, with a shared result cache.
+
+    Args:
+        cache (SqliteCache | None): Result cache; None disables caching.
+        row_cap (int): Maximum rows returned.
+        max_cost (float): Maximum planner cost.
+        statement_timeout_ms (int): Server-side timeout of the query.
+        engine (Engine): Engine of the query pool.
+    """
+
+    def __init__(
+            self,
+            cache: SqliteCache | None = None,
+            row_cap: int = settings.SQL_ROW_CAP,
+            max_cost: float = settings.SQL_MAX_COST,
+            statement_timeout_ms: int = settings.SQL_STATEMENT_TIMEOUT_MS,
+            engine=query_engine,
+    ):
+        self.cache = cache
+        self.row_cap = row_cap
+        self.max_cost = max_cost
+        self.statement_timeout_ms = statement_timeout_ms
+        self.engine = engine
+
+    def run(self, sql: str) -> GuardedResult:
+        """
+        Run a query, serving it from the cache when the data has not changed since it was cached.
+
+        Args:
+            sql (str): Generated SQL.
+
+        Returns:
+            GuardedResult: Result and guard decisions.
+        """
+        statement = normalize_sql(sql)
+        key = make_key(statement, Queries.data_version(), self.row_cap, self.max_cost)
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                frame = pd.read_parquet(io.BytesIO(base64.b64decode(entry["frame"])))
+                return GuardedResult(frame, entry["truncated"], entry["rewritten"], entry["cost"], cached=True)
+
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}"))
+                # Writable CTEs would pass the SELECT check; a read-only transaction refuses them
+                conn.execute(text("SET LOCAL transaction_read_only = on"))
+                statement, rewritten, cost = guard_sql(conn, statement, self.row_cap, self.max_cost)
+                # Server-side cursor: only the rows fetched below cross the wire
+                result = conn.execution_options(no_parameters=True, stream_results=True).exec_driver_sql(statement)
+                rows = result.fetchmany(self.row_cap + 1)
+                frame = pd.DataFrame(rows[:self.row_cap], columns=list(result.keys()))
+            finally:
+                transaction.rollback()
+
+        guarded = GuardedResult(frame, len(rows) > self.row_cap, rewritten, cost)
+        if self.cache is not None:
+            buffer = io.BytesIO()
+            try:
+                frame.to_parquet(buffer, index=False)
+            except (ValueError, TypeError, NotImplementedError, ImportError) as e:
+                # e.g. columns mixing types; the result is still returned, just not cached
+                logger.debug(f"Result not cached: {e}")
+                return guarded
+            self.cache.set(key, {
+                # The cache stores JSON values; the frame goes in as base64 of its Parquet bytes
+                "frame": base64.b64encode(buffer.getvalue()).decode("ascii"),
+                "truncated": guarded.truncated,
+                "rewritten": guarded.rewritten,
+                "cost": guarded.cost,
+            })
+        return guarded
+
+
+def open_result_cache() -> SqliteCache:
+    """
+    Open the result cache shared by all app processes.
+
+    Returns:
+        SqliteCache: Result cache.
+    """
+    return SqliteCache(
+        settings.SQL_CACHE_PATH,
+        "sql_results",
+        max_entries=settings.SQL_CACHE_MAX_ENTRIES,
+        max_age_seconds=settings.SQL_CACHE_TTL_SECONDS,
+        # The cap is small, so trim it well before the default number of writes
+        evict_every=max(1, settings.SQL_CACHE_MAX_ENTRIES // 10),
+    )
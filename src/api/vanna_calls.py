@@ -1,11 +1,17 @@
+import re
 import streamlit as st
 from src.core.settings import DB_USER, DB_HOST, DB_PASS, DB_PORT, DB_NAME, VANNA_MODEL_NAME, VANNA_API_KEY
 from vanna.remote import VannaDefault
+from src.api.sql_guard import SqlGuard, SqlGuardError, open_result_cache
+from src.utils.processing import recover_json
+from src.utils.prompt import COMBINED_ANSWER_PROMPT
 
 @st.cache_resource(ttl=3600)
 def setup_vanna():
     vn = VannaDefault(api_key=VANNA_API_KEY, model=VANNA_MODEL_NAME)
     vn.connect_to_postgres(host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
+    # Every generated statement, including the ones Vanna runs itself, goes through the guard
+    vn.run_sql = run_guarded_sql
     return vn
 
 @st.cache_data(show_spinner="Generating sample questions ...")
@@ -24,35 +30,98 @@ def is_sql_valid_cached(sql: str):
     vn = setup_vanna()
     return vn.is_sql_valid(sql=sql)
 
-@st.cache_data(show_spinner="Running SQL query ...")
+@st.cache_resource
+def setup_sql_guard():
+    return SqlGuard(cache=open_result_cache())
+
+def run_guarded_sql(sql: str):
+    return setup_sql_guard().run(sql).frame
+
 def run_sql_cached(sql: str):
-    vn = setup_vanna()
-    return vn.run_sql(sql=sql)
+    # Cached by SqlGuard across processes and invalidated by pipeline writes, so no st.cache_data here
+    with st.spinner("Running SQL query ..."):
+        try:
+            result = setup_sql_guard().run(sql)
+        except SqlGuardError as e:
+            st.error(f"Query not run: {e}")
+            st.stop()
+    if result.truncated:
+        st.warning(f"Showing the first {len(result.frame):,} rows only")
+    return result.frame
 
 @st.cache_data(show_spinner="Checking if we should generate a chart ...")
 def should_generate_chart_cached(question, sql, df):
     vn = setup_vanna()
     return vn.should_generate_chart(df=df)
 
-@st.cache_data(show_spinner="Generating Plotly code ...")
-def generate_plotly_code_cached(question, sql, df):
-    vn = setup_vanna()
-    code = vn.generate_plotly_code(question=question, sql=sql, df=df)
-    return code
-
-
 @st.cache_data(show_spinner="Running Plotly code ...")
 def generate_plot_cached(code, df):
     vn = setup_vanna()
     return vn.get_plotly_figure(plotly_code=code, df=df)
 
+# Plain (uncached, Streamlit-free) calls that app.py runs concurrently in worker
+# threads; Streamlit commands may only be issued from the script thread.
 
-@st.cache_data(show_spinner="Generating followup questions ...")
-def generate_followup_cached(question, sql, df):
-    vn = setup_vanna()
-    return vn.generate_followup_questions(question=question, sql=sql, df=df)
+def answer_tasks(vn, question: str, sql: str, df, chart: bool, summary: bool, followup: bool) -> dict:
+    """
+    Build the independent post-query LLM calls for one answer.
 
-@st.cache_data(show_spinner="Generating summary ...")
-def generate_summary_cached(question, df):
-    vn = setup_vanna()
-    return vn.generate_summary(question=question, df=df)
\ No newline at end of file
+    Args:
+        vn (VannaBase): Vanna instance.
+        question (str): User question.
+        sql (str): Executed SQL.
+        df (pd.DataFrame): Query result.
+        chart (bool): Generate Plotly code.
+        summary (bool): Generate a summary.
+        followup (bool): Generate follow-up questions.
+
+    Returns:
+        dict: Zero-argument callables keyed by "plotly_code", "summary" and "followup_questions".
+    """
+    tasks = {}
+    if chart:
+        tasks["plotly_code"] = lambda: vn.generate_plotly_code(question=question, sql=sql, df=df)
+    if summary:
+        tasks["summary"] = lambda: vn.generate_summary(question=question, df=df)
+    if followup:
+        tasks["followup_questions"] = lambda: vn.generate_followup_questions(question=question, sql=sql, df=df)
+    return tasks
+
+
+def _clean_plotly_code(code: str) -> str:
+    code = re.sub(r"^```(?:python)?\s*|\s*```$", "", code.strip())
+    return code.replace("fig.show()", "").strip()
+
+
+def generate_combined_answer(vn, question: str, sql: str, df) -> dict | None:
+    """
+    Ask for Plotly code, summary and follow-up questions in a single LLM request.
+
+    Args:
+        vn (VannaBase): Vanna instance.
+        question (str): User question.
+        sql (str): Executed SQL.
+        df (pd.DataFrame): Query result.
+
+    Returns:
+        dict | None: "plotly_code", "summary" and "followup_questions", or None if the
+        answer could not be parsed.
+    """
+    prompt = COMBINED_ANSWER_PROMPT.format(
+        question=question,
+        sql=sql,
+        dtypes=df.dtypes.to_string(),
+        sample=df.head(20).to_csv(index=False),
+    )
+    raw = vn.submit_prompt([
+        vn.system_message("You are a data analyst answering questions about a PostgreSQL database."),
+        vn.user_message(prompt),
+    ])
+    data, _ = recover_json(raw or "")
+    if not data:
+        return None
+    return {
+        "plotly_code": _clean_plotly_code(data.get("plotly_code") or ""),
+        "summary": data.get("summary"),
+        "followup_questions": list(data.get("followup_questions") or []),
+    }
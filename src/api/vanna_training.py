@@ -0,0 +1,93 @@
+"""
+Train the Vanna model to answer aggregate questions from the materialized summary views.
+
+Training data lives on the Vanna server, so this only needs to run once after
+the views are created or changed:
+
+    python -m src.api.vanna_training
+"""
+from vanna.remote import VannaDefault
+from src.core.settings import VANNA_API_KEY, VANNA_MODEL_NAME
+from src.storage.summaries import SUMMARY_VIEWS, summary_ddl
+
+DOCUMENTATION = [
+    "For counts, rates and rankings over compounds, disease areas, journals or assay targets, query the "
+    "materialized views mv_compound_disease_activity, mv_journal_lipinski, mv_target_activity and "
+    "mv_disease_area_summary instead of joining articles, article_compound, compounds and assays. "
+    "Use the base tables only for row-level details such as individual assays or article titles.",
+    "Articles without a disease area are grouped under disease_area = 'unspecified' and articles without a "
+    "journal under journal = 'unknown' in the summary views.",
+    "lipinski_pass_rate is a fraction between 0 and 1 computed over compounds with a known Lipinski result.",
+] + [f"{name}: {description}" for name, (description, _, _) in SUMMARY_VIEWS.items()]
+
+QUESTION_SQL = [
+    (
+        "Which compounds have the most active assays in oncology?",
+        "SELECT compound_name, pubchem_cid, active_assays, article_count FROM mv_compound_disease_activity "
+        "WHERE disease_area = 'oncology' ORDER BY active_assays DESC LIMIT 10",
+    ),
+    (
+        "How many active assays does each compound have per disease area?",
+        "SELECT compound_name, disease_area, active_assays FROM mv_compound_disease_activity "
+        "ORDER BY compound_name, disease_area",
+    ),
+    (
+        "What is the Lipinski pass rate by journal?",
+        "SELECT journal, compound_count, lipinski_pass_rate FROM mv_journal_lipinski "
+        "ORDER BY compound_count DESC",
+    ),
+    (
+        "Which targets have the most active compounds?",
+        "SELECT target_name, active_compounds, tested_compounds FROM mv_target_activity "
+        "ORDER BY active_compounds DESC LIMIT 10",
+    ),
+    (
+        "How many articles and compounds are there per disease area?",
+        "SELECT disease_area, article_count, compound_count, active_compound_count FROM mv_disease_area_summary "
+        "ORDER BY article_count DESC",
+    ),
+    (
+        "Which disease area has the highest share of Lipinski-compliant compounds?",
+        "SELECT disease_area, lipinski_pass_rate, compound_count FROM mv_disease_area_summary "
+        "WHERE lipinski_pass_rate IS NOT NULL ORDER BY lipinski_pass_rate DESC LIMIT 1",
+    ),
+]
+
+
+def train_summaries(vn) -> int:
+    """
+    Add the summary view DDL, documentation and example queries to a Vanna model.
+
+    Items the model already holds are skipped, so training can be repeated safely.
+
+    Args:
+        vn (VannaBase): Vanna instance.
+
+    Returns:
+        int: Number of training items added.
+    """
+    existing = set()
+    training_data = vn.get_training_data()
+    if training_data is not None and len(training_data):
+        existing = set(training_data["content"].dropna())
+
+    added = 0
+    for name in SUMMARY_VIEWS:
+        ddl = summary_ddl(name)
+        if ddl not in existing:
+            vn.train(ddl=ddl)
+            added += 1
+    for documentation in DOCUMENTATION:
+        if documentation not in existing:
+            vn.train(documentation=documentation)
+            added += 1
+    for question, sql in QUESTION_SQL:
+        if sql not in existing:
+            vn.train(question=question, sql=sql)
+            added += 1
+    return added
+
+
+if __name__ == "__main__":
+    vn = VannaDefault(api_key=VANNA_API_KEY, model=VANNA_MODEL_NAME)
+    print(f"added {train_summaries(vn)} training items")
@@ -9,11 +9,58 @@ DEFAULT_TEMPERATURE = float(os.getenv("DEFAULT_TEMPERATURE", "0.3"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "3000"))
 BEDROCK_ROLE_ARN = os.getenv("BEDROCK_ROLE_ARN", "arn:aws:iam::338861521122:role/BedrockBatchExecutionRole-us-east-1")
 
+# ==== Bedrock batch inference ====
+BATCH_S3_BUCKET = os.getenv("BATCH_S3_BUCKET")
+BATCH_S3_PREFIX = os.getenv("BATCH_S3_PREFIX", "bedrock-batch")
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+BATCH_MIN_RECORDS = int(os.getenv("BATCH_MIN_RECORDS", "100"))
+
 # ==== Prompt building ====
 PROMPT_TEMPERATURE = 0.3
 PROMPT_TOP_P = 0.7
 PROMPT_MAX_TOKENS = 3000
 
+# ==== Chunking ====
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "128000"))
+NER_CHUNK_TOKENS = int(os.getenv("NER_CHUNK_TOKENS", "4000"))
+NER_CHUNK_OVERLAP_TOKENS = int(os.getenv("NER_CHUNK_OVERLAP_TOKENS", "60"))
+CHUNK_DROP_BACK_MATTER = os.getenv("CHUNK_DROP_BACK_MATTER", "true").lower() == "true"
+
+# ==== NER concurrency ====
+NER_MAX_IN_FLIGHT = int(os.getenv("NER_MAX_IN_FLIGHT", "8"))
+NER_REQUESTS_PER_SECOND = float(os.getenv("NER_REQUESTS_PER_SECOND", "4"))
+NER_BURST = float(os.getenv("NER_BURST", "8"))
+NER_PACK_MAX_SECTIONS = int(os.getenv("NER_PACK_MAX_SECTIONS", "8"))
+NER_PACK_ITEM_TOKENS = int(os.getenv("NER_PACK_ITEM_TOKENS", "1000"))
+NER_PACK_WAIT_SECONDS = float(os.getenv("NER_PACK_WAIT_SECONDS", "2"))
+# The opt-in prefilter only skips chunks once it knows this many compound names; the regexes alone miss common drugs
+PREFILTER_MIN_VOCABULARY = int(os.getenv("PREFILTER_MIN_VOCABULARY", "5000"))
+PREFILTER_MIRROR_MAX_NAMES = int(os.getenv("PREFILTER_MIRROR_MAX_NAMES", "2000000"))
+
+# ==== PDF parsing ====
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+PDF_TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", "120"))
+
+# ==== Processing pipeline ====
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+PIPELINE_DOWNLOAD_WORKERS = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", "4"))
+PIPELINE_TEXT_WORKERS = int(os.getenv("PIPELINE_TEXT_WORKERS", str(PDF_WORKERS)))
+PIPELINE_NER_WORKERS = int(os.getenv("PIPELINE_NER_WORKERS", "4"))
+PIPELINE_ENRICH_WORKERS = int(os.getenv("PIPELINE_ENRICH_WORKERS", "4"))
+PIPELINE_REPORT_SECONDS = float(os.getenv("PIPELINE_REPORT_SECONDS", "30"))
+
+# ==== Local caches ====
+CACHE_DIR = os.getenv("CACHE_DIR", "data/cache")
+# Expired and least recently used entries are evicted after this many writes, not only when a cache is opened
+CACHE_EVICT_EVERY_WRITES = int(os.getenv("CACHE_EVICT_EVERY_WRITES", "1000"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_responses.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "180"))
+PUBCHEM_CACHE_PATH = os.getenv("PUBCHEM_CACHE_PATH", os.path.join(CACHE_DIR, "pubchem.sqlite"))
+PUBCHEM_CACHE_TTL_DAYS = float(os.getenv("PUBCHEM_CACHE_TTL_DAYS", "30"))
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", os.path.join(CACHE_DIR, "text"))
+BATCH_WORK_DIR = os.getenv("BATCH_WORK_DIR", os.path.join(CACHE_DIR, "batch"))
+
 # ==== AWS Settings ====
 AWS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET = os.getenv('AWS_SECRET_ACCESS_KEY')
@@ -31,10 +78,70 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 DATABASE_URL_psycopg = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DATABASE_URL_asyncpg = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Connection pools per workload: "ingest" (pipeline writes) and "query" (Streamlit / ad-hoc SQL)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_INGEST_POOL_SIZE = int(os.getenv("DB_INGEST_POOL_SIZE", "5"))
+DB_INGEST_MAX_OVERFLOW = int(os.getenv("DB_INGEST_MAX_OVERFLOW", "5"))
+# 0 disables the timeout; bulk COPY and summary refreshes can legitimately take minutes
+DB_INGEST_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_INGEST_STATEMENT_TIMEOUT_MS", "0"))
+DB_QUERY_POOL_SIZE = int(os.getenv("DB_QUERY_POOL_SIZE", "10"))
+DB_QUERY_MAX_OVERFLOW = int(os.getenv("DB_QUERY_MAX_OVERFLOW", "10"))
+DB_QUERY_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_QUERY_STATEMENT_TIMEOUT_MS", "30000"))
+DB_BULK_ARTICLES = int(os.getenv("DB_BULK_ARTICLES", "25"))
+DB_BULK_ASSAY_ROWS = int(os.getenv("DB_BULK_ASSAY_ROWS", "50000"))
+# Refresh the materialized summary views after a run that wrote articles
+REFRESH_SUMMARIES = os.getenv("REFRESH_SUMMARIES", "true").lower() == "true"
 
 
 EMAIL = os.getenv("EMAIL_ADDRESS")
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
+ENTREZ_BATCH_SIZE = int(os.getenv("ENTREZ_BATCH_SIZE", "200"))
+
+# ==== Article download ====
+DOWNLOAD_PER_HOST = int(os.getenv("DOWNLOAD_PER_HOST", "4"))
+DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", "64"))
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "60"))
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", str(1 << 20)))
+UNPAYWALL_RPS = float(os.getenv("UNPAYWALL_RPS", "5"))
+
+# ==== PubChem enrichment ====
+# "rest": batched PUG-REST property requests, "pubchempy": one full Compound record per name
+PUBCHEM_BACKEND = os.getenv("PUBCHEM_BACKEND", "rest")
+PUBCHEM_PROPERTY_BATCH = int(os.getenv("PUBCHEM_PROPERTY_BATCH", "200"))
+# Applied while the assay summary streams in: both bound memory, only the row cap shortens the download
+PUBCHEM_ASSAY_ACTIVE_ONLY = os.getenv("PUBCHEM_ASSAY_ACTIVE_ONLY", "false").lower() == "true"
+PUBCHEM_ASSAY_MAX_ROWS = int(os.getenv("PUBCHEM_ASSAY_MAX_ROWS", "0"))
+# "online": PubChem web services, "mirror_first": local mirror, then the network, "mirror": local mirror only
+PUBCHEM_SOURCE = os.getenv("PUBCHEM_SOURCE", "online")
+PUBCHEM_MIRROR_PATH = os.getenv("PUBCHEM_MIRROR_PATH", os.path.join(CACHE_DIR, "pubchem_mirror.sqlite"))
+PUBCHEM_DUMP_DIR = os.getenv("PUBCHEM_DUMP_DIR", "data/pubchem_dumps")
+
+# ==== Remote service resilience ====
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "4"))
+RETRY_BACKOFF_SECONDS = float(os.getenv("RETRY_BACKOFF_SECONDS", "1"))
+RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("RETRY_MAX_BACKOFF_SECONDS", "60"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "8"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "60"))
+# Upper bounds of the adaptive per-service concurrency limits
+SERVICE_MAX_CONCURRENCY = {
+    "bedrock": NER_MAX_IN_FLIGHT,
+    "pubchem": int(os.getenv("PUBCHEM_MAX_CONCURRENCY", "5")),
+    "entrez": int(os.getenv("ENTREZ_MAX_CONCURRENCY", "10" if NCBI_API_KEY else "3")),
+    "unpaywall": int(os.getenv("UNPAYWALL_MAX_CONCURRENCY", "10")),
+}
 
 #VANNA RAG SYSTEM
+# Guard and shared result cache for generated SQL (src/api/sql_guard.py)
+SQL_CACHE_PATH = os.getenv("SQL_CACHE_PATH", os.path.join(CACHE_DIR, "sql_results.sqlite"))
+SQL_CACHE_TTL_SECONDS = float(os.getenv("SQL_CACHE_TTL_SECONDS", "900"))
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "500"))
+SQL_ROW_CAP = int(os.getenv("SQL_ROW_CAP", "10000"))
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "15000"))
+# Planner cost units; queries estimated above this are rewritten with a LIMIT or rejected
+SQL_MAX_COST = float(os.getenv("SQL_MAX_COST", "5000000"))
+# Ask for chart code, summary and follow-up questions in one LLM request instead of three parallel ones
+VANNA_COMBINED_ANSWER = os.getenv("VANNA_COMBINED_ANSWER", "false").lower() == "true"
 VANNA_MODEL_NAME = os.getenv("VANNA_MODEL_NAME")
 VANNA_API_KEY = os.getenv("VANNA_API_KEY")
\ No newline at end of file
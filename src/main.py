@@ -3,9 +3,14 @@ import sys
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
 from pathlib import Path
 from src.services.article_service import process_articles
-from src.services.pubmed_articles import article_collection
+from src.services.ner import open_llm_cache
+from src.services.batch_inference import BedrockBatchClient
+from src.services.prefilter import build_prefilter
+from src.services.pubchem import PubChemCache
+from src.services.pubmed_articles import article_collection, search_articles
 import argparse
 import boto3
+from botocore.config import Config
 from src.core import settings
 from src.storage.queries import Queries
 import logging
@@ -23,20 +28,35 @@ if __name__ == "__main__":
     parser.add_argument("--query", type=str, required=True, help="PubMed search query")
     parser.add_argument("--retmax", type=int, default=30, help="Number of PubMed results")
     parser.add_argument("--data_collection", type=bool, default=False, help="Whether to collect data")
+    parser.add_argument("--max_in_flight", type=int, default=settings.NER_MAX_IN_FLIGHT, help="Maximum concurrent model calls")
+    parser.add_argument("--llm_cache", choices=["use", "refresh", "bypass"], default="use",
+                        help="NER response cache: use it, refresh it (ignore stored answers) or bypass it")
+    parser.add_argument("--pubchem_cache", choices=["use", "refresh", "bypass"], default="use",
+                        help="PubChem name/compound cache: use it, refresh it or bypass it")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="Skip chunks without local compound candidates (needs a warm PubChem cache or mirror)")
+    parser.add_argument("--pack", action="store_true",
+                        help="Pack short chunks (e.g. abstract-only articles) into multi-section model requests")
+    parser.add_argument("--batch", action="store_true", help="Run NER as one Bedrock batch-inference job")
+    parser.add_argument("--recreate_tables", action="store_true",
+                        help="Drop and recreate all tables (including the processing ledger) before the run")
 
     args = parser.parse_args()
     article_dir = args.article_dir
 
-    if args.data_collection:
+    articles = None
+    if args.data_collection and args.batch:
+        # Batch inference needs every PDF on disk before the job is built
         logger.info("Starting article download pipeline")
-        retmax = args.retmax
-        query = args.query
         article_collection(
-            query=query,
+            query=args.query,
             email=settings.EMAIL,
-            retmax=retmax,
+            retmax=args.retmax,
             output_dir=article_dir
         )
+    elif args.data_collection:
+        # The pipeline downloads each PDF in its first stage
+        articles = search_articles(args.query, settings.EMAIL, args.retmax)
     session = boto3.Session(
         aws_access_key_id=settings.AWS_KEY,
         aws_secret_access_key=settings.AWS_SECRET,
@@ -44,11 +64,38 @@ if __name__ == "__main__":
     )
     logger.info("AWS session initialized")
 
-    client = session.client("bedrock-runtime")
+    # Retries and throttling are handled by src.utils.resilience, so botocore must not retry on its own
+    client = session.client("bedrock-runtime", config=Config(retries={"mode": "standard", "max_attempts": 1}))
     logger.info("Bedrock client created")
 
-    Queries.create_tables()
-    logger.info("DB tables created")
+    Queries.create_tables(drop=args.recreate_tables)
+    logger.info("DB tables recreated" if args.recreate_tables else "DB tables ready")
 
-    process_articles(article_dir, client, settings.MODEL_ID, logger=logger)
+    llm_cache = open_llm_cache(args.llm_cache)
+    pubchem_cache = PubChemCache(args.pubchem_cache)
+    prefilter = None
+    if args.prefilter:
+        prefilter = build_prefilter(pubchem_cache)
+        logger.info(f"Prefilter vocabulary: {len(prefilter.vocabulary)} names")
+    batch_client = None
+    if args.batch:
+        batch_client = BedrockBatchClient(session, settings.MODEL_ID, logger=logger)
+        logger.info("Batch inference mode enabled")
+
+    metrics = process_articles(
+        article_dir,
+        client,
+        settings.MODEL_ID,
+        logger=logger,
+        max_in_flight=args.max_in_flight,
+        llm_cache=llm_cache,
+        batch_client=batch_client,
+        pubchem_cache=pubchem_cache,
+        prefilter=prefilter,
+        pack=args.pack,
+        articles=articles,
+    )
+    if metrics:
+        for stage, values in metrics.items():
+            logger.info(f"Stage {stage}: {values}")
     logger.info("Finished processing articles")
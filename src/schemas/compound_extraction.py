@@ -1,5 +1,5 @@
 from typing import Union, TypedDict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class CompoundInfo(TypedDict, total=False):
@@ -32,3 +32,37 @@ class Assay:
     potency_value: Optional[float]
     potency_unit: Optional[str]
     reference: Optional[str]
+
+
+ASSAY_FIELDS = (
+    "assay_id", "assay_type", "target_name", "activity_outcome",
+    "potency_type", "potency_value", "potency_unit", "reference",
+)
+
+
+@dataclass
+class AssayTable:
+    """
+    Assays of one compound stored column-wise (one list per Assay field).
+    """
+    assay_id: list = field(default_factory=list)
+    assay_type: list = field(default_factory=list)
+    target_name: list = field(default_factory=list)
+    activity_outcome: list = field(default_factory=list)
+    potency_type: list = field(default_factory=list)
+    potency_value: list = field(default_factory=list)
+    potency_unit: list = field(default_factory=list)
+    reference: list = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.assay_id)
+
+    def rows(self):
+        return zip(*(getattr(self, name) for name in ASSAY_FIELDS))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ASSAY_FIELDS}
+
+    @classmethod
+    def from_assays(cls, assays: list[Assay]) -> "AssayTable":
+        return cls(**{name: [getattr(a, name) for a in assays] for name in ASSAY_FIELDS})
@@ -1,27 +1,181 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from src.services.ner import extract_compounds_and_context
+from typing import Iterable
+from src.services.batch_inference import BatchClient, run_batch_extraction
+from src.services.extraction_engine import ExtractionEngine
+from src.services.pipeline import Pipeline, Stage
+from src.services.prefilter import ChemicalPrefilter
+from src.services.downloader import ThreadedPdfDownloader
+from src.storage.bulk_writer import BulkWriter
+from src.storage.cache import SqliteCache
+from src.storage.database import pool_stats
+from src.storage.metadata_store import MetadataStore
 from src.schemas.compound_extraction import ArticleRecord
-from src.services.pubchem import fetch_pubchem_data
+from src.services.pubchem import fetch_pubchem_data, fetch_pubchem_batch, PubChemCache
 from src.storage.queries import Queries
-from src.utils.pdf_utils import extract_text_from_pdf, chunk_text
-from src.utils.processing import is_pubchem_candidate
-import json
+from src.storage.summaries import refresh_summaries
+from src.utils.file_io import file_sha256
+from src.utils.pdf_utils import extract_texts_parallel, extract_text_cached, chunk_text
+from src.utils.resilience import service_stats
+from src.utils.processing import is_pubchem_candidate, dedupe_compounds, parse_stats, CONTEXT_MAX_LENGTH
+from src.core import settings
 
 
-def process_articles(raw_dir: Path, client, model, logger):
+def merge_chunk_results(parsed_chunks: list[dict]) -> tuple[list[dict], str | None]:
     """
-    Process article data from PubMed.
+    Merge per-chunk model outputs of one article.
+
+    Args:
+        parsed_chunks (list[dict]): Parsed model output per chunk, in chunk order.
+
+    Returns:
+        tuple[list[dict], str | None]: One candidate per distinct compound with merged
+        context, and the disease area of the first chunk that reported one.
+    """
+    compounds_with_context = []
+    disease_area = None
+
+    for parsed in parsed_chunks:
+        # Collect compounds + context
+        for comp in parsed.get("compounds", []):
+            if is_pubchem_candidate(comp["name"]):
+                compounds_with_context.append(comp)
+
+        # Disease area
+        if disease_area is None and "disease_area" in parsed:
+            disease_area = parsed["disease_area"]
+
+    return dedupe_compounds(compounds_with_context), disease_area
+
+
+def enrich_compounds(
+        compounds_with_context: list[dict],
+        pdf_file: Path,
+        logger,
+        pubchem_cache: PubChemCache | None = None,
+) -> list[tuple]:
+    """
+    Enrich extracted compounds with PubChem data.
+
+    With the "rest" backend (PUBCHEM_BACKEND), properties of all compounds are
+    fetched in batched PUG-REST requests; otherwise one pubchempy lookup is made per compound.
+
+    Args:
+        compounds_with_context (list[dict]): Compounds returned by the model.
+        pdf_file (Path): Source PDF.
+        logger (logging.Logger): Logger.
+        pubchem_cache (PubChemCache | None): Optional PubChem cache.
+
+    Returns:
+        list[tuple]: (compound_data, assays, context) for every compound with a valid PubChem CID.
+    """
+    batch = {}
+    if settings.PUBCHEM_BACKEND == "rest":
+        batch = fetch_pubchem_batch(
+            [comp["name"] for comp in compounds_with_context],
+            article_file=pdf_file.name,
+            logger=logger,
+            cache=pubchem_cache,
+        )
+
+    enriched = {}
+    for comp in compounds_with_context:
+        compound_name = comp["name"]
+
+        if settings.PUBCHEM_BACKEND == "rest":
+            compound_data, assays = batch.get(compound_name, (None, None))
+        else:
+            compound_data, assays = fetch_pubchem_data(
+                compound=compound_name,
+                article_file=pdf_file.name,
+                logger=logger,
+                cache=pubchem_cache,
+            )
+
+        if compound_data:
+            cid = compound_data["pubchem_cid"]
+            if cid in enriched:
+                # Synonyms that resolve to the same CID share one row and one set of assays
+                _, _, context = enriched[cid]
+                extra = comp.get("context")
+                if extra:
+                    context = "; ".join(filter(None, [context, extra]))[:CONTEXT_MAX_LENGTH]
+                enriched[cid] = (enriched[cid][0], enriched[cid][1], context)
+            else:
+                enriched[cid] = (compound_data, assays, comp.get("context"))
+        else:
+            logger.info(f"Skipping insert for {compound_name}, no valid PubChem CID")
+    return list(enriched.values())
+
+
+def build_article_record(meta: dict, disease_area: str | None) -> ArticleRecord:
+    """
+    Build the articles row from a metadata record.
+
+    Args:
+        meta (dict): Article metadata record.
+        disease_area (str | None): Disease area of the article.
+
+    Returns:
+        ArticleRecord: Article row.
+    """
+    return {
+        "pmid": meta.get("PMID"),
+        "doi": meta.get("DOI"),
+        "title": meta.get("Title"),
+        "abstract": meta.get("Abstract"),
+        "journal": meta.get("Journal"),
+        "authors": "; ".join(meta.get("Authors", [])),
+        "pdf_url": meta.get("pdf_url"),
+        "disease_area": disease_area
+    }
+
+
+def persist_article(
+        meta: dict,
+        pdf_file: Path,
+        parsed_chunks: list[dict],
+        writer: BulkWriter,
+        logger,
+        pubchem_cache: PubChemCache | None = None,
+) -> None:
+    """
+    Merge model output, enrich with PubChem and queue one article for storage.
+
+    The ledger records the article as stored when the writer flushes the batch.
+
+    Args:
+        meta (dict): Article metadata record.
+        pdf_file (Path): Source PDF.
+        parsed_chunks (list[dict]): Parsed model output per chunk, in chunk order.
+        writer (BulkWriter): Buffered database writer.
+        logger (logging.Logger): Logger.
+        pubchem_cache (PubChemCache | None): Optional PubChem cache.
+    """
+    compounds_with_context, disease_area = merge_chunk_results(parsed_chunks)
+    enriched = enrich_compounds(compounds_with_context, pdf_file, logger, pubchem_cache)
+    writer.add_article(build_article_record(meta, disease_area), enriched)
+
+
+def load_articles(raw_dir: Path, logger):
+    """
+    Yield PDFs that still need processing, together with their text chunks.
+
+    Articles whose PDF content is unchanged and already stored according to the
+    processing ledger are skipped. Text is extracted in a process pool (or read
+    from the text cache), so articles are yielded as soon as their text is ready.
 
     Args:
         raw_dir (Path): Path to the directory containing the raw data.
-        client (boto3.client): AWS boto3 client.
-        model (ModelID): AWS model ID.
         logger (logging.Logger): Logger.
+
+    Yields:
+        tuple[Path, dict, list[str]]: PDF path, metadata record and chunks.
     """
-    metadata_path = raw_dir / "metadata.json"
-    with open(metadata_path, "r", encoding="utf-8") as f:
-        metadata_records = {rec["PMID"]: rec for rec in json.load(f)}
+    metadata_records = MetadataStore.open(raw_dir)
 
+    jobs = []
     for pdf_file in raw_dir.glob("*.pdf"):
         pmid = pdf_file.stem
         meta = metadata_records.get(pmid)
@@ -29,58 +183,210 @@ def process_articles(raw_dir: Path, client, model, logger):
             logger.warning(f"No metadata found for {pdf_file.name}, skipping.")
             continue
 
+        pdf_hash = file_sha256(pdf_file)
+        if Queries.start_ledger_entry(pmid, pdf_hash):
+            logger.info(f"Skipping {pdf_file.name}, already processed")
+            continue
+        jobs.append((pdf_file, pdf_hash))
+
+    for pdf_file, text in extract_texts_parallel(jobs, logger):
+        if text is None:
+            continue
+        pmid = pdf_file.stem
         logger.info(f"Processing file: {pdf_file.name}")
-        text = extract_text_from_pdf(pdf_file)
         chunks = chunk_text(text)
         logger.debug(f"Split into {len(chunks)} chunks")
+        yield pdf_file, metadata_records.get(pmid), chunks
 
-        compounds_with_context = []
-        disease_area = None
-
-        for i, chunk in enumerate(chunks):
-            logger.debug(f"Sending chunk {i + 1}/{len(chunks)} to model")
-            parsed = extract_compounds_and_context(chunk, client, model, logger)
-
-            # Collect compounds + context
-            for comp in parsed.get("compounds", []):
-                if is_pubchem_candidate(comp["name"]):
-                    compounds_with_context.append(comp)
-
-            # Disease area
-            if disease_area is None and "disease_area" in parsed:
-                disease_area = parsed["disease_area"]
-
-        # Insert article once per file
-        article: ArticleRecord = {
-            "pmid": meta.get("PMID"),
-            "doi": meta.get("DOI"),
-            "title": meta.get("Title"),
-            "abstract": meta.get("Abstract"),
-            "journal": meta.get("Journal"),
-            "authors": "; ".join(meta.get("Authors", [])),
-            "pdf_url": meta.get("pdf_url"),
-            "disease_area": disease_area
-        }
-        article_id = Queries.insert_article(article)
-
-        # Insert compounds + link with context
-        for comp in compounds_with_context:
-            compound_name = comp["name"]
-            context = comp.get("context")
-
-            # Enrich with PubChem
-            compound_data, assays = fetch_pubchem_data(
-                compound=compound_name,
-                article_file=pdf_file.name,
-                logger=logger
-            )
 
-            if compound_data:
-                compound_id = Queries.insert_compound(compound_data, article_id, context)
-                if assays:
-                    for assay in assays:
+@dataclass
+class ArticleJob:
+    """
+    One article travelling through the processing pipeline.
+    """
+    pmid: str
+    meta: dict
+    pdf_file: Path
+    pdf_hash: str | None = None
+    chunks: list[str] = field(default_factory=list)
+    parsed_chunks: list[dict] = field(default_factory=list)
+    disease_area: str | None = None
+    enriched: list[tuple] = field(default_factory=list)
 
-                        Queries.insert_assay(assay, compound_id)
 
-            else:
-                logger.info(f"Skipping insert for {compound_name}, no valid PubChem CID")
\ No newline at end of file
+def build_pipeline(
+        store: MetadataStore,
+        downloader: ThreadedPdfDownloader,
+        engine: ExtractionEngine,
+        writer: BulkWriter,
+        executor: ProcessPoolExecutor,
+        logger,
+        pubchem_cache: PubChemCache | None = None,
+) -> Pipeline:
+    """
+    Build the download -> text -> ner -> enrich -> persist pipeline.
+
+    Every stage returns the job for the next stage, or None to drop it (missing
+    PDF, unchanged article, unreadable text). A stage that raises (e.g. a failed
+    model call or PubChem lookup) drops the job too, so the ledger never marks a
+    partly processed article as stored and the next run retries it. The download stage fetches PDFs
+    not yet on disk and records their metadata in the store. The persist stage
+    has a single worker because the bulk writer is not thread-safe.
+
+    Args:
+        store (MetadataStore): Metadata store of the article directory.
+        downloader (ThreadedPdfDownloader): Pooled PDF downloader shared by the download workers.
+        engine (ExtractionEngine): Shared NER engine.
+        writer (BulkWriter): Buffered database writer.
+        executor (ProcessPoolExecutor): Process pool for PDF parsing.
+        logger (logging.Logger): Logger.
+        pubchem_cache (PubChemCache | None): Optional PubChem cache.
+
+    Returns:
+        Pipeline: Pipeline consuming ArticleJob items.
+    """
+    def download(job: ArticleJob) -> ArticleJob | None:
+        if not job.pdf_file.exists() or job.pmid not in store:
+            record = downloader.fetch(job.meta)
+            if record is None:
+                logger.warning(f"No PDF available for {job.pmid}, skipping.")
+                return None
+            store.append(record)
+            job.meta = record
+        job.pdf_hash = file_sha256(job.pdf_file)
+        if Queries.start_ledger_entry(job.pmid, job.pdf_hash):
+            logger.info(f"Skipping {job.pdf_file.name}, already processed")
+            return None
+        return job
+
+    def extract_text(job: ArticleJob) -> ArticleJob | None:
+        text = extract_text_cached(job.pdf_file, job.pdf_hash, executor, logger)
+        if text is None:
+            return None
+        job.chunks = chunk_text(text)
+        logger.debug(f"Split {job.pdf_file.name} into {len(job.chunks)} chunks")
+        return job
+
+    def extract_compounds(job: ArticleJob) -> ArticleJob:
+        job.parsed_chunks = engine.extract_article(job.chunks)
+        return job
+
+    def enrich(job: ArticleJob) -> ArticleJob:
+        compounds_with_context, job.disease_area = merge_chunk_results(job.parsed_chunks)
+        job.enriched = enrich_compounds(compounds_with_context, job.pdf_file, logger, pubchem_cache)
+        return job
+
+    def persist(job: ArticleJob) -> ArticleJob:
+        logger.info(f"Storing {job.pdf_file.name} with {len(job.enriched)} compounds")
+        writer.add_article(build_article_record(job.meta, job.disease_area), job.enriched)
+        return job
+
+    size = settings.PIPELINE_QUEUE_SIZE
+    return Pipeline(
+        [
+            Stage("download", download, settings.PIPELINE_DOWNLOAD_WORKERS, size),
+            Stage("text", extract_text, settings.PIPELINE_TEXT_WORKERS, size),
+            Stage("ner", extract_compounds, settings.PIPELINE_NER_WORKERS, size),
+            Stage("enrich", enrich, settings.PIPELINE_ENRICH_WORKERS, size),
+            Stage("persist", persist, 1, size),
+        ],
+        logger,
+        report_seconds=settings.PIPELINE_REPORT_SECONDS,
+    )
+
+
+def process_articles(
+        raw_dir: Path,
+        client,
+        model,
+        logger,
+        max_in_flight: int = settings.NER_MAX_IN_FLIGHT,
+        llm_cache: SqliteCache | None = None,
+        batch_client: BatchClient | None = None,
+        pubchem_cache: PubChemCache | None = None,
+        prefilter: ChemicalPrefilter | None = None,
+        pack: bool = False,
+        articles: Iterable[dict] | None = None,
+        email: str = settings.EMAIL,
+) -> dict | None:
+    """
+    Process article data from PubMed.
+
+    Articles stream through a pipeline of download, text extraction, chunk NER,
+    dedupe/enrich and persist stages connected by bounded queues, so network,
+    CPU and database work overlap. The pipeline consumes PubMed metadata records
+    (e.g. straight from a search) and downloads missing PDFs itself; without
+    records it processes the articles already in `raw_dir`. When a batch client
+    is given, all chunks of the PDFs on disk are sent as a single
+    batch-inference job instead.
+
+    Only new or changed PDFs are processed: the processing ledger records per
+    PMID which PDF version is stored, so an interrupted run resumes with the
+    articles it had not stored yet. Text and model answers of those articles
+    come from the text and NER caches.
+    The summary views are refreshed when the run wrote any article.
+
+    Args:
+        raw_dir (Path): Path to the directory containing the raw data.
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+        max_in_flight (int): Maximum number of concurrent model calls.
+        llm_cache (SqliteCache | None): Optional NER response cache.
+        batch_client (BatchClient | None): Batch-inference backend, enables batch mode.
+        pubchem_cache (PubChemCache | None): Optional PubChem cache.
+        prefilter (ChemicalPrefilter | None): Optional local gate that skips chunks without compound mentions.
+        pack (bool): Pack short chunks of any article into multi-section model requests.
+        articles (Iterable[dict] | None): Metadata records to process, defaults to the records in `raw_dir`.
+        email (str): Email address required by the Unpaywall API.
+
+    Returns:
+        dict | None: Per-stage pipeline metrics, None in batch mode.
+    """
+    metrics = None
+    with BulkWriter() as writer:
+        if batch_client is not None:
+            articles = list(load_articles(raw_dir, logger))
+            results = run_batch_extraction(
+                {pdf_file.name: chunks for pdf_file, _, chunks in articles},
+                batch_client,
+                model,
+                logger,
+                cache=llm_cache,
+                prefilter=prefilter,
+            )
+            for pdf_file, meta, _ in articles:
+                if pdf_file.name not in results:
+                    continue
+                persist_article(meta, pdf_file, results[pdf_file.name], writer, logger, pubchem_cache)
+        else:
+            raw_dir.mkdir(parents=True, exist_ok=True)
+            store = MetadataStore.open(raw_dir)
+            jobs = (
+                ArticleJob(pmid=meta["PMID"], meta=meta, pdf_file=raw_dir / f"{meta['PMID']}.pdf")
+                for meta in (store if articles is None else articles)
+            )
+            engine = ExtractionEngine(
+                client, model, logger, max_in_flight=max_in_flight, cache=llm_cache, prefilter=prefilter, pack=pack,
+            )
+            downloader = ThreadedPdfDownloader(email, raw_dir)
+            with engine, downloader, ProcessPoolExecutor(max_workers=settings.PDF_WORKERS) as executor:
+                pipeline = build_pipeline(store, downloader, engine, writer, executor, logger, pubchem_cache)
+                metrics = pipeline.run(jobs)
+            if pack:
+                logger.info(f"Prompt packing stats: {engine.stats()}")
+    if writer.articles_written and settings.REFRESH_SUMMARIES:
+        refresh_summaries()
+        # Cached results of summary-view queries are stale only once the views are refreshed
+        Queries.bump_data_version()
+
+    logger.info(f"Remote service stats: {service_stats()}")
+    logger.info(f"Database pool stats: {pool_stats()}")
+    logger.info(f"Model output parsing stats: {parse_stats.snapshot()}")
+    if llm_cache is not None:
+        logger.info(f"NER cache stats: {llm_cache.stats()}")
+    if prefilter is not None:
+        logger.info(f"Prefilter stats: {prefilter.stats()}")
+    if pubchem_cache is not None:
+        logger.info(f"PubChem cache stats: {pubchem_cache.stats()}")
+    return metrics
@@ -0,0 +1,291 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable
+from src.core import settings
+from src.services.ner import parse_partial_output, llm_cache_key
+from src.services.prefilter import ChemicalPrefilter
+from src.storage.cache import SqliteCache
+from src.utils.prompt import PROMPT_TEMPLATE
+
+TERMINAL_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+
+
+def format_llama_prompt(prompt: str) -> str:
+    """
+    Wrap a user prompt in the Llama 3 chat template expected by InvokeModel.
+
+    Args:
+        prompt (str): User prompt.
+
+    Returns:
+        str: Prompt in Llama 3 instruct format.
+    """
+    return (
+        "<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\n"
+        f"{prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
+    )
+
+
+def build_batch_record(record_id: str, text: str) -> dict:
+    """
+    Build one model-invocation record for a chunk.
+
+    Args:
+        record_id (str): Unique record ID used to route the answer back.
+        text (str): Chunk text.
+
+    Returns:
+        dict: Record in Bedrock batch-inference JSONL format.
+    """
+    return {
+        "recordId": record_id,
+        "modelInput": {
+            "prompt": format_llama_prompt(PROMPT_TEMPLATE.format(text=text)),
+            "max_gen_len": settings.PROMPT_MAX_TOKENS,
+            "temperature": settings.PROMPT_TEMPERATURE,
+            "top_p": settings.PROMPT_TOP_P,
+        },
+    }
+
+
+def output_text(model_output: dict) -> str:
+    """
+    Extract generated text from a batch output record.
+
+    Args:
+        model_output (dict): `modelOutput` of a batch output record.
+
+    Returns:
+        str: Generated text.
+    """
+    if "generation" in model_output:
+        return model_output["generation"]
+    if "output" in model_output:
+        return model_output["output"]["message"]["content"][0].get("text", "")
+    if "content" in model_output:
+        return model_output["content"][0].get("text", "")
+    return ""
+
+
+class BatchClient(ABC):
+    """
+    Submit/poll interface of a batch-inference backend.
+    """
+
+    @abstractmethod
+    def submit(self, input_path: Path, job_name: str) -> str:
+        """
+        Submit a JSONL input file.
+
+        Args:
+            input_path (Path): Local JSONL file with one record per line.
+            job_name (str): Job name.
+
+        Returns:
+            str: Job identifier.
+        """
+
+    @abstractmethod
+    def wait(self, job_id: str, output_path: Path) -> Path:
+        """
+        Block until the job finishes and store its output locally.
+
+        Args:
+            job_id (str): Job identifier returned by `submit`.
+            output_path (Path): Where to write the JSONL output.
+
+        Returns:
+            Path: Local JSONL output file.
+        """
+
+
+class BedrockBatchClient(BatchClient):
+    """
+    Bedrock model-invocation jobs staged through S3.
+
+    Args:
+        session (boto3.Session): AWS session.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+        bucket (str): S3 bucket for job input and output.
+        prefix (str): Key prefix inside the bucket.
+        role_arn (str): Service role Bedrock assumes to read and write S3.
+        poll_seconds (float): Interval between status checks.
+    """
+
+    def __init__(
+            self,
+            session,
+            model,
+            logger,
+            bucket: str = settings.BATCH_S3_BUCKET,
+            prefix: str = settings.BATCH_S3_PREFIX,
+            role_arn: str = settings.BEDROCK_ROLE_ARN,
+            poll_seconds: float = settings.BATCH_POLL_SECONDS,
+    ):
+        if not bucket:
+            raise ValueError("BATCH_S3_BUCKET must be set to use Bedrock batch inference")
+        self.bedrock = session.client("bedrock")
+        self.s3 = session.client("s3")
+        self.model = model
+        self.logger = logger
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.role_arn = role_arn
+        self.poll_seconds = poll_seconds
+        self._jobs: dict[str, tuple[str, str]] = {}
+
+    def submit(self, input_path: Path, job_name: str) -> str:
+        input_key = f"{self.prefix}/{job_name}/input/{input_path.name}"
+        output_prefix = f"{self.prefix}/{job_name}/output/"
+        self.s3.upload_file(str(input_path), self.bucket, input_key)
+
+        response = self.bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=self.model,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{self.bucket}/{input_key}"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{self.bucket}/{output_prefix}"}},
+        )
+        job_arn = response["jobArn"]
+        self._jobs[job_arn] = (output_prefix, input_path.name)
+        self.logger.info(f"Submitted batch job {job_arn}")
+        return job_arn
+
+    def wait(self, job_id: str, output_path: Path) -> Path:
+        while True:
+            job = self.bedrock.get_model_invocation_job(jobIdentifier=job_id)
+            status = job["status"]
+            self.logger.info(f"Batch job status: {status}")
+            if status in TERMINAL_STATUSES:
+                break
+            time.sleep(self.poll_seconds)
+
+        if status not in ("Completed", "PartiallyCompleted"):
+            raise RuntimeError(f"Batch job {job_id} ended with status {status}: {job.get('message')}")
+
+        output_prefix, input_name = self._jobs[job_id]
+        job_suffix = job_id.rsplit("/", 1)[-1]
+        output_key = f"{output_prefix}{job_suffix}/{input_name}.out"
+        self.s3.download_file(self.bucket, output_key, str(output_path))
+        return output_path
+
+
+class LocalBatchClient(BatchClient):
+    """
+    In-process stand-in for batch inference, e.g. for tests or small corpora.
+
+    Args:
+        generate (Callable[[dict], str]): Maps a record's `modelInput` to generated text.
+    """
+
+    def __init__(self, generate: Callable[[dict], str]):
+        self.generate = generate
+        self._inputs: dict[str, Path] = {}
+
+    def submit(self, input_path: Path, job_name: str) -> str:
+        self._inputs[job_name] = input_path
+        return job_name
+
+    def wait(self, job_id: str, output_path: Path) -> Path:
+        with open(self._inputs[job_id], "r", encoding="utf-8") as src, \
+                open(output_path, "w", encoding="utf-8") as dst:
+            for line in src:
+                record = json.loads(line)
+                try:
+                    record["modelOutput"] = {"generation": self.generate(record["modelInput"])}
+                except Exception as e:
+                    record["error"] = {"errorMessage": str(e)}
+                dst.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return output_path
+
+
+def run_batch_extraction(
+        chunks_by_article: dict[str, list[str]],
+        batch_client: BatchClient,
+        model,
+        logger,
+        work_dir: Path = Path(settings.BATCH_WORK_DIR),
+        cache: SqliteCache | None = None,
+        prefilter: ChemicalPrefilter | None = None,
+) -> dict[str, list[dict]]:
+    """
+    Extract compounds for a whole corpus with one batch-inference job.
+
+    Args:
+        chunks_by_article (dict[str, list[str]]): Chunks per article key, in reading order.
+        batch_client (BatchClient): Batch backend.
+        model (ModelID): AWS model ID (used for cache keys).
+        logger (logging.Logger): Logger.
+        work_dir (Path): Directory for the JSONL input and output files.
+        cache (SqliteCache | None): Optional NER response cache; hits are not resubmitted.
+        prefilter (ChemicalPrefilter | None): Optional local gate; chunks without candidates are not submitted.
+
+    Returns:
+        dict[str, list[dict]]: Parsed model output per chunk, in chunk order, for every article
+        whose records all succeeded. Articles with a failed or missing record are left out,
+        so they are processed again by the next run.
+    """
+    results = {key: [{} for _ in chunks] for key, chunks in chunks_by_article.items()}
+    keys_by_record = {}
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    job_name = f"ner-{time.strftime('%Y%m%d-%H%M%S')}"
+    input_path = work_dir / f"{job_name}.jsonl"
+
+    with open(input_path, "w", encoding="utf-8") as f:
+        for article_key, chunks in chunks_by_article.items():
+            for i, chunk in enumerate(chunks):
+                if prefilter is not None and not prefilter.has_candidates(chunk):
+                    continue
+                if cache is not None:
+                    cache_key = llm_cache_key(chunk, model)
+                    cached = cache.get(cache_key)
+                    if cached is not None:
+                        results[article_key][i] = cached
+                        continue
+                else:
+                    cache_key = None
+                record_id = f"{article_key}:{i}"
+                keys_by_record[record_id] = cache_key
+                f.write(json.dumps(build_batch_record(record_id, chunk), ensure_ascii=False) + "\n")
+
+    if not keys_by_record:
+        logger.info("All chunks served from cache, no batch job needed")
+        return results
+
+    if len(keys_by_record) < settings.BATCH_MIN_RECORDS:
+        logger.warning(
+            f"Batch has {len(keys_by_record)} records, Bedrock may reject jobs "
+            f"with fewer than {settings.BATCH_MIN_RECORDS}"
+        )
+
+    logger.info(f"Submitting {len(keys_by_record)} chunks as batch job {job_name}")
+    job_id = batch_client.submit(input_path, job_name)
+    output_path = batch_client.wait(job_id, work_dir / f"{job_name}.jsonl.out")
+
+    answered = set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            record_id = record.get("recordId")
+            if record_id not in keys_by_record:
+                continue
+            if "error" in record or "modelOutput" not in record:
+                logger.error(f"Batch record {record_id} failed: {record.get('error')}")
+                continue
+            answered.add(record_id)
+            parsed, complete = parse_partial_output(output_text(record["modelOutput"]), logger)
+            article_key, idx = record_id.rsplit(":", 1)
+            results[article_key][int(idx)] = parsed
+            cache_key = keys_by_record[record_id]
+            # Recovered elements of truncated output are used, but the chunk is asked again next run
+            if cache is not None and parsed and complete:
+                cache.set(cache_key, parsed)
+
+    failed = {record_id.rsplit(":", 1)[0] for record_id in keys_by_record.keys() - answered}
+    if failed:
+        logger.error(f"Batch job {job_name} failed for {len(failed)} articles, they are left for the next run")
+    return {key: parsed_chunks for key, parsed_chunks in results.items() if key not in failed}
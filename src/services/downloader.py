@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+import httpx
+from tqdm import tqdm
+from src.core import settings
+from src.storage.metadata_store import MetadataStore
+from src.utils.rate_limit import AsyncTokenBucket
+from src.utils.resilience import ResilientService, check_response, get_service
+
+logger = logging.getLogger("pubchem_db")
+
+
+class PdfDownloader:
+    """
+    Concurrent Unpaywall resolver and PDF downloader.
+
+    One pooled keep-alive HTTP client is shared by all requests. Unpaywall
+    calls are rate limited and go through the shared "unpaywall" service; each
+    PDF host gets its own "pdf:<host>" service. The services own retries,
+    Retry-After handling, the adaptive concurrency limit and the circuit
+    breaker, and show up in `service_stats()`.
+
+    Args:
+        email (str): Email address required by the Unpaywall API.
+        output_dir (Path): Directory where PDFs are saved.
+        per_host (int): Maximum concurrent requests per PDF host.
+        unpaywall_rps (float): Unpaywall requests per second.
+    """
+
+    def __init__(
+            self,
+            email: str,
+            output_dir: Path,
+            per_host: int = settings.DOWNLOAD_PER_HOST,
+            unpaywall_rps: float = settings.UNPAYWALL_RPS,
+    ):
+        self.email = email
+        self.output_dir = Path(output_dir)
+        self.per_host = per_host
+        self._unpaywall_bucket = AsyncTokenBucket(unpaywall_rps, unpaywall_rps)
+        self._client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT_SECONDS, connect=15),
+            limits=httpx.Limits(max_connections=settings.DOWNLOAD_MAX_CONNECTIONS, max_keepalive_connections=20),
+            headers={"User-Agent": f"pubchem-extraction (mailto:{email})"},
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+
+    def _host_service(self, url: str) -> ResilientService:
+        return get_service(f"pdf:{urlparse(url).netloc}", max_concurrency=self.per_host)
+
+    async def get_unpaywall_pdf(self, doi: str | None) -> str | None:
+        """
+        Retrieve the PDF URL of an article from Unpaywall using its DOI.
+
+        Args:
+            doi (str | None): Digital Object Identifier of the article.
+
+        Returns:
+            str | None: Direct URL to the PDF if available, otherwise None.
+        """
+        if not doi:
+            return None
+        url = f"https://api.unpaywall.org/v2/{doi}"
+
+        async def request():
+            await self._unpaywall_bucket.acquire()
+            r = await self._client.get(url, params={"email": self.email})
+            check_response(r)
+            return r
+
+        try:
+            r = await get_service("unpaywall").call_async(request)
+            if r.status_code == 200:
+                location = r.json().get("best_oa_location") or {}
+                return location.get("url_for_pdf")
+        except Exception as e:
+            logger.warning(f"Unpaywall error for {doi}: {e}")
+        return None
+
+    async def download_pdf(self, pdf_url: str | None, pmid: str) -> bool:
+        """
+        Stream a PDF to a temporary file and atomically move it into place.
+
+        Args:
+            pdf_url (str | None): URL of the PDF file.
+            pmid (str): PubMed ID used as the filename.
+
+        Returns:
+            bool: True if the PDF was successfully downloaded, False otherwise.
+        """
+        if not pdf_url:
+            return False
+        out_path = self.output_dir / f"{pmid}.pdf"
+
+        async def request():
+            async with self._client.stream("GET", pdf_url) as r:
+                check_response(r)
+                if r.status_code != 200 or "pdf" not in r.headers.get("content-type", "").lower():
+                    return False
+                fd, tmp_name = tempfile.mkstemp(dir=self.output_dir, prefix=f".{pmid}.", suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        async for block in r.aiter_bytes(settings.DOWNLOAD_CHUNK_BYTES):
+                            f.write(block)
+                    os.replace(tmp_name, out_path)
+                except BaseException:
+                    os.unlink(tmp_name)
+                    raise
+                return True
+
+        try:
+            return await self._host_service(pdf_url).call_async(request)
+        except Exception as e:
+            logger.warning(f"Error downloading PDF for PMID {pmid}: {e}")
+            return False
+
+    async def fetch(self, article: dict) -> dict | None:
+        """
+        Resolve and download the PDF of one article.
+
+        Args:
+            article (dict): Metadata record with "PMID" and "DOI".
+
+        Returns:
+            dict | None: The record with "pdf_url" set, or None if no PDF was downloaded.
+        """
+        pdf_url = await self.get_unpaywall_pdf(article.get("DOI"))
+        if await self.download_pdf(pdf_url, article["PMID"]):
+            return {**article, "pdf_url": pdf_url}
+        return None
+
+
+async def collect_pdfs(articles: list[dict], email: str, output_dir: Path, store: MetadataStore) -> int:
+    """
+    Resolve and download PDFs for many articles concurrently.
+
+    Each record is appended to the metadata store as soon as its PDF lands.
+
+    Args:
+        articles (list[dict]): Metadata records.
+        email (str): Email address required by the Unpaywall API.
+        output_dir (Path): Directory where PDFs are saved.
+        store (MetadataStore): Store receiving records of downloaded articles, with "pdf_url" set.
+
+    Returns:
+        int: Number of downloaded PDFs.
+    """
+    downloaded = 0
+    async with PdfDownloader(email, output_dir) as downloader:
+        tasks = [asyncio.create_task(downloader.fetch(art)) for art in articles]
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Downloading PDFs"):
+            record = await task
+            if record is not None:
+                store.append(record)
+                downloaded += 1
+    return downloaded
+
+
+class ThreadedPdfDownloader:
+    """
+    Blocking front end of one PdfDownloader running on a background event loop.
+
+    Worker threads (e.g. the download stage of the article pipeline) share the
+    downloader's pooled HTTP client and Unpaywall rate limit.
+
+    Args:
+        email (str): Email address required by the Unpaywall API.
+        output_dir (Path): Directory where PDFs are saved.
+    """
+
+    def __init__(self, email: str, output_dir: Path):
+        self.email = email
+        self.output_dir = Path(output_dir)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pdf-downloader", daemon=True)
+        self._downloader: PdfDownloader | None = None
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def __enter__(self):
+        self._thread.start()
+
+        async def open_downloader():
+            # httpx and asyncio primitives must be created on the loop that uses them
+            return PdfDownloader(self.email, self.output_dir)
+
+        self._downloader = self._submit(open_downloader())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._downloader is not None:
+                self._submit(self._downloader.__aexit__(None, None, None))
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def fetch(self, article: dict) -> dict | None:
+        """
+        Resolve and download the PDF of one article, blocking the calling thread.
+
+        Args:
+            article (dict): Metadata record with "PMID" and "DOI".
+
+        Returns:
+            dict | None: The record with "pdf_url" set, or None if no PDF was downloaded.
+        """
+        return self._submit(self._downloader.fetch(article))
@@ -0,0 +1,222 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from src.core import settings
+from src.services.ner import extract_packed, extract_with_status, llm_cache_key
+from src.services.prefilter import ChemicalPrefilter
+from src.storage.cache import SqliteCache
+from src.utils.pdf_utils import chunk_token_budget, estimate_tokens
+from src.utils.prompt import PACKED_PROMPT_TEMPLATE
+from src.utils.rate_limit import get_bucket
+
+
+class ExtractionEngine:
+    """
+    Bounded-concurrency NER engine.
+
+    Chunks from any number of articles are fanned out over a shared thread pool
+    (at most `max_in_flight` `converse` calls at once) and throttled by a token
+    bucket shared by every engine using the same model ID.
+
+    With packing enabled, short chunks (from any article) are collected into one
+    request with delimited sections until the pack is full or has waited
+    `pack_wait_seconds`, so the instruction block is paid once per pack.
+
+    Args:
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+        max_in_flight (int): Maximum number of concurrent model calls.
+        requests_per_second (float): Sustained request rate for the model.
+        burst (float): Token bucket capacity.
+        cache (SqliteCache | None): Optional NER response cache.
+        prefilter (ChemicalPrefilter | None): Optional local gate; chunks without candidates skip the model.
+        pack (bool): Pack short chunks into multi-section requests.
+        pack_max_sections (int): Maximum chunks per packed request.
+        pack_item_tokens (int): Only chunks up to this many tokens are packed.
+        pack_wait_seconds (float): Maximum time a chunk waits for its pack to fill.
+    """
+
+    def __init__(
+            self,
+            client,
+            model,
+            logger,
+            max_in_flight: int = settings.NER_MAX_IN_FLIGHT,
+            requests_per_second: float = settings.NER_REQUESTS_PER_SECOND,
+            burst: float = settings.NER_BURST,
+            cache: SqliteCache | None = None,
+            prefilter: ChemicalPrefilter | None = None,
+            pack: bool = False,
+            pack_max_sections: int = settings.NER_PACK_MAX_SECTIONS,
+            pack_item_tokens: int = settings.NER_PACK_ITEM_TOKENS,
+            pack_wait_seconds: float = settings.NER_PACK_WAIT_SECONDS,
+    ):
+        self.client = client
+        self.model = model
+        self.logger = logger
+        self.cache = cache
+        self.prefilter = prefilter
+        self._bucket = get_bucket(model, requests_per_second, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ner")
+        self.pack = pack
+        self.pack_max_sections = pack_max_sections
+        self.pack_item_tokens = pack_item_tokens
+        self.pack_wait_seconds = pack_wait_seconds
+        self._pack_budget = chunk_token_budget()
+        self._pack: list[tuple[str, str | None, Future]] = []
+        self._pack_tokens = 0
+        self._pack_timer: threading.Timer | None = None
+        self._pack_lock = threading.Lock()
+        self.packed_requests = 0
+        self.packed_chunks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        self._flush_pack()
+        self._executor.shutdown(wait=True)
+
+    def _extract(self, chunk: str) -> dict:
+        if self.prefilter is not None and not self.prefilter.has_candidates(chunk):
+            return {}
+        # Cache hits must not consume rate-limit tokens, so the lookup happens here
+        key = None
+        if self.cache is not None:
+            key = llm_cache_key(chunk, self.model)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        self._bucket.acquire()
+        try:
+            parsed, complete = extract_with_status(chunk, self.client, self.model, self.logger)
+        except Exception as e:
+            # The error reaches the article through its future, so the article is not stored
+            self.logger.error(f"Model call failed: {e}")
+            raise
+        if key is not None and parsed and complete:
+            self.cache.set(key, parsed)
+        return parsed
+
+    def _run_pack(self, items: list[tuple[str, str | None, Future]]) -> None:
+        try:
+            self._bucket.acquire()
+            results, complete = extract_packed([chunk for chunk, _, _ in items], self.client, self.model, self.logger)
+        except Exception as e:
+            self.logger.error(f"Packed model call failed: {e}")
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        for (_, key, future), parsed, parsed_complete in zip(items, results, complete):
+            # Partial results are used for this run but re-extracted next time
+            if key is not None and parsed and parsed_complete:
+                self.cache.set(key, parsed)
+            future.set_result(parsed)
+
+    def _take_pack(self) -> list[tuple[str, str | None, Future]]:
+        # Caller holds _pack_lock
+        items, self._pack, self._pack_tokens = self._pack, [], 0
+        if self._pack_timer is not None:
+            self._pack_timer.cancel()
+            self._pack_timer = None
+        if items:
+            self.packed_requests += 1
+            self.packed_chunks += len(items)
+        return items
+
+    def _flush_pack(self) -> None:
+        with self._pack_lock:
+            items = self._take_pack()
+        if items:
+            self._executor.submit(self._run_pack, items)
+
+    def _submit_packed(self, chunk: str) -> Future:
+        future = Future()
+        if self.prefilter is not None and not self.prefilter.has_candidates(chunk):
+            future.set_result({})
+            return future
+        key = None
+        if self.cache is not None:
+            key = llm_cache_key(chunk, self.model, PACKED_PROMPT_TEMPLATE)
+            cached = self.cache.get(key)
+            if cached is not None:
+                future.set_result(cached)
+                return future
+
+        tokens = estimate_tokens(chunk)
+        ready = []
+        with self._pack_lock:
+            if self._pack and self._pack_tokens + tokens > self._pack_budget:
+                ready.append(self._take_pack())
+            self._pack.append((chunk, key, future))
+            self._pack_tokens += tokens
+            if len(self._pack) >= self.pack_max_sections:
+                ready.append(self._take_pack())
+            elif self._pack_timer is None:
+                self._pack_timer = threading.Timer(self.pack_wait_seconds, self._flush_pack)
+                self._pack_timer.daemon = True
+                self._pack_timer.start()
+        for items in ready:
+            self._executor.submit(self._run_pack, items)
+        return future
+
+    def stats(self) -> dict:
+        """
+        Return packing counters.
+
+        Returns:
+            dict: Packed requests, packed chunks and average sections per request.
+        """
+        return {
+            "packed_requests": self.packed_requests,
+            "packed_chunks": self.packed_chunks,
+            "sections_per_request": self.packed_chunks / self.packed_requests if self.packed_requests else 0.0,
+        }
+
+    def submit_article(self, chunks: list[str]) -> list[Future]:
+        """
+        Queue every chunk of an article for extraction without waiting.
+
+        Args:
+            chunks (list[str]): Article chunks in reading order.
+
+        Returns:
+            list[Future]: One future per chunk, in the same order.
+        """
+        return [
+            self._submit_packed(chunk)
+            if self.pack and estimate_tokens(chunk) <= self.pack_item_tokens
+            else self._executor.submit(self._extract, chunk)
+            for chunk in chunks
+        ]
+
+    @staticmethod
+    def gather(futures: list[Future]) -> list[dict]:
+        """
+        Wait for an article's chunk futures and return results in chunk order.
+
+        A failed model call of any chunk is raised, so that a partly extracted
+        article is never stored.
+
+        Args:
+            futures (list[Future]): Futures returned by `submit_article`.
+
+        Returns:
+            list[dict]: Parsed model output per chunk.
+        """
+        return [future.result() for future in futures]
+
+    def extract_article(self, chunks: list[str]) -> list[dict]:
+        """
+        Extract compounds from all chunks of one article concurrently.
+
+        Args:
+            chunks (list[str]): Article chunks in reading order.
+
+        Returns:
+            list[dict]: Parsed model output per chunk, in chunk order.
+        """
+        return self.gather(self.submit_article(chunks))
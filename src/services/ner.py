@@ -1,44 +1,249 @@
 import json
-from src.utils.processing import extract_json_block
+from src.utils.processing import recover_json, parse_stats
 from src.core import settings
-from src.utils.prompt import PROMPT_TEMPLATE
+from src.storage.cache import SqliteCache, make_key
+from src.utils.resilience import get_service
+from src.utils.prompt import PROMPT_TEMPLATE, PACKED_PROMPT_TEMPLATE, FOLLOWUP_INSTRUCTIONS
 
-def extract_compounds_and_context(text:str, client, model, logger) -> dict:
+
+def open_llm_cache(mode: str = "use") -> SqliteCache:
     """
-    Extract metadata and compounds from text using LLM.
+    Open the persistent NER response cache.
 
     Args:
-        text (str): The text to extract metadata from.
-        client (boto3.client): AWS boto3 client.
+        mode (str): "use", "refresh" or "bypass".
+
+    Returns:
+        SqliteCache: Cache configured from settings.
+    """
+    return SqliteCache(
+        settings.LLM_CACHE_PATH,
+        table="ner_responses",
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        max_age_seconds=settings.LLM_CACHE_MAX_AGE_DAYS * 86400,
+        mode=mode,
+    )
+
+
+def llm_cache_key(text: str, model, template: str = PROMPT_TEMPLATE) -> str:
+    """
+    Build the cache key of a NER call: everything that determines the model answer.
+
+    Args:
+        text (str): Chunk text.
         model (ModelID): AWS model ID.
-        logger (logging.Logger): Logger.
+        template (str): Prompt template the text is sent with.
+
     Returns:
-        dict: The extracted metadata.
+        str: Cache key.
     """
-    prompt = PROMPT_TEMPLATE.format(text=text)
+    return make_key(model, settings.PROMPT_TEMPERATURE, settings.PROMPT_MAX_TOKENS, template, text)
+
 
+def _converse(prompt: str, client, model) -> str:
     conversation = [{
         "role": "user",
         "content": [{"text": prompt}]
     }]
-
-
-    response = client.converse(
+    response = get_service("bedrock").call(
+        client.converse,
         modelId=model,
         messages=conversation,
         inferenceConfig={"maxTokens": settings.PROMPT_MAX_TOKENS, "temperature": settings.PROMPT_TEMPERATURE}
     )
+    return response["output"]["message"]["content"][0].get("text", "").strip()
+
+
+def extract_compounds_and_context(text:str, client, model, logger, cache: SqliteCache | None = None) -> dict:
+    """
+    Extract metadata and compounds from text using LLM.
+
+    Args:
+        text (str): The text to extract metadata from.
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+        cache (SqliteCache | None): Optional response cache consulted before calling the model.
+    Returns:
+        dict: The extracted metadata.
+    """
+    key = None
+    if cache is not None:
+        key = llm_cache_key(text, model)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.debug("NER cache hit")
+            return cached
+
+    parsed, complete = extract_with_status(text, client, model, logger)
+    if cache is not None and parsed and complete:
+        cache.set(key, parsed)
+    return parsed
+
+
+def extract_with_status(text: str, client, model, logger) -> tuple[dict, bool]:
+    """
+    Extract metadata and compounds from text, telling whether the answer was complete.
+
+    A truncated answer is followed up once; the result is complete only if the
+    first answer or the follow-up answer parsed completely. Incomplete results
+    must not be cached.
+
+    Args:
+        text (str): The text to extract metadata from.
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+    Returns:
+        tuple[dict, bool]: The extracted metadata and whether it is complete.
+    """
+    prompt = PROMPT_TEMPLATE.format(text=text)
+    raw_text = _converse(prompt, client, model)
     logger.debug("Received response from model")
 
-    raw_text = response["output"]["message"]["content"][0].get("text", "").strip()
-    cleaned = extract_json_block(raw_text)
+    parsed, complete = parse_partial_output(raw_text, logger)
+    if not complete and parsed.get("compounds"):
+        parsed, complete = _follow_up(prompt, parsed, client, model, logger)
+    return parsed, complete
 
+
+def _follow_up(prompt: str, parsed: dict, client, model, logger) -> tuple[dict, bool]:
+    """
+    Ask once more for the compounds a truncated answer did not get to.
+
+    Args:
+        prompt (str): The original prompt.
+        parsed (dict): What was recovered from the truncated answer.
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+    Returns:
+        tuple[dict, bool]: Recovered output extended with the compounds of the follow-up
+        answer, and whether the follow-up answer was complete.
+    """
+    compounds = list(parsed.get("compounds", []))
+    found = {c.get("name", "").lower() for c in compounds}
+    parse_stats.count("followups")
     try:
-        parsed = json.loads(cleaned)
-        return parsed
-        logger.info("Successfully parsed JSON response")
+        raw_text = _converse(
+            prompt + FOLLOWUP_INSTRUCTIONS.format(found=json.dumps(sorted(found), ensure_ascii=False)),
+            client,
+            model,
+        )
     except Exception as e:
-        logger.error(f"Parse error: {e}")
+        logger.warning(f"Follow-up call failed, keeping recovered compounds: {e}")
+        return parsed, False
+    extra, complete = parse_partial_output(raw_text, logger)
+    for comp in extra.get("compounds", []):
+        if comp.get("name", "").lower() not in found:
+            compounds.append(comp)
+            found.add(comp.get("name", "").lower())
+    merged = {**parsed, "compounds": compounds}
+    if "disease_area" not in merged and "disease_area" in extra:
+        merged["disease_area"] = extra["disease_area"]
+    return merged, complete
+
+
+def parse_partial_output(raw_text: str, logger) -> tuple[dict, bool]:
+    """
+    Parse the JSON answer of the model, recovering complete elements of truncated output.
+
+    Args:
+        raw_text (str): Raw model output.
+        logger (logging.Logger): Logger.
+    Returns:
+        tuple[dict, bool]: Parsed output (empty if nothing could be recovered) and
+        whether the answer was complete.
+    """
+    parsed, complete = recover_json(raw_text.strip())
+    if parsed is None:
+        parse_stats.count("failed")
+        logger.error("Parse error: no JSON object could be recovered")
         logger.debug(f"RAW OUTPUT:\n{raw_text}")
-        parsed = {}
-        return parsed
\ No newline at end of file
+        return {}, False
+    if complete:
+        parse_stats.count("complete")
+        logger.info("Successfully parsed JSON response")
+    else:
+        parse_stats.count("recovered")
+        logger.warning("Recovered complete elements of a truncated JSON response")
+    return parsed, complete
+
+
+def format_packed_text(texts: list[str]) -> str:
+    """
+    Join several texts into delimited sections of one packed prompt.
+
+    Args:
+        texts (list[str]): Texts in section order.
+    Returns:
+        str: Text with "### SECTION <n>" headers, numbered from 1.
+    """
+    return "\n\n".join(f"### SECTION {i}\n{text}" for i, text in enumerate(texts, start=1))
+
+
+def split_packed_output(parsed: dict, count: int) -> list[dict]:
+    """
+    Split the answer to a packed prompt back into one result per section.
+
+    Args:
+        parsed (dict): Parsed model output with a "sections" object keyed by section number.
+        count (int): Number of sections that were sent.
+    Returns:
+        list[dict]: Result per section in section order; {} for sections the model left out.
+    """
+    sections = parsed.get("sections", {})
+    if isinstance(sections, list):
+        # Tolerate a list of sections instead of an object keyed by number
+        sections = {str(i): section for i, section in enumerate(sections, start=1)}
+    results = []
+    for i in range(1, count + 1):
+        section = sections.get(str(i))
+        results.append(section if isinstance(section, dict) else {})
+    return results
+
+
+def extract_packed(
+        texts: list[str], client, model, logger, follow_up: bool = True,
+) -> tuple[list[dict], list[bool]]:
+    """
+    Extract compounds from several short texts with a single model call.
+
+    The fixed instruction block is sent once for all texts, and the answer is
+    split back into one result per text. When the answer was cut off, the
+    section the model was writing is incomplete as well as the sections it
+    never reached; both are re-sent in one follow-up request.
+
+    Args:
+        texts (list[str]): Texts to extract from.
+        client (boto3.client): AWS boto3 client.
+        model (ModelID): AWS model ID.
+        logger (logging.Logger): Logger.
+        follow_up (bool): If the answer was cut off, re-send only the sections it did not complete.
+    Returns:
+        tuple[list[dict], list[bool]]: The extracted metadata per text, in input order, and
+        whether each result is complete (only complete results may be cached).
+    """
+    prompt = PACKED_PROMPT_TEMPLATE.format(text=format_packed_text(texts), count=len(texts))
+    raw_text = _converse(prompt, client, model)
+    logger.debug(f"Received packed response for {len(texts)} sections")
+    parsed, complete = parse_partial_output(raw_text, logger)
+    results = split_packed_output(parsed, len(texts))
+    flags = [complete and bool(result) for result in results]
+
+    missing = [i for i, result in enumerate(results) if not result]
+    if not complete:
+        present = [i for i, result in enumerate(results) if result]
+        if present:
+            # Recovery keeps the section being written when the answer stopped, but only partly
+            missing = sorted(missing + [present[-1]])
+        flags = [i not in missing for i in range(len(texts))]
+
+    if follow_up and not complete and 0 < len(missing) < len(texts):
+        parse_stats.count("followups")
+        extra, extra_flags = extract_packed([texts[i] for i in missing], client, model, logger, False)
+        for i, result, result_complete in zip(missing, extra, extra_flags):
+            if result:
+                results[i] = result
+                flags[i] = result_complete
+    return results, flags
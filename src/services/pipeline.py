@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline stage.
+
+    Args:
+        name (str): Stage name used in metrics.
+        fn (Callable[[Any], Any]): Processes one item; returning None drops the item.
+        workers (int): Number of worker threads.
+        queue_size (int): Capacity of the stage's input queue (backpressure on the previous stage).
+    """
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 16
+    processed: int = field(default=0, init=False)
+    dropped: int = field(default=0, init=False)
+    errors: int = field(default=0, init=False)
+    busy_seconds: float = field(default=0.0, init=False)
+
+
+class Pipeline:
+    """
+    Streaming pipeline of stages connected by bounded queues.
+
+    Every stage runs its own worker threads, so stages bound by different
+    resources (network, CPU, database) overlap. A full queue blocks the
+    upstream stage, which keeps memory bounded.
+
+    Args:
+        stages (list[Stage]): Stages in processing order.
+        logger (logging.Logger): Logger.
+        report_seconds (float): Interval between metric log lines (0 disables them).
+    """
+
+    def __init__(self, stages: list[Stage], logger, report_seconds: float = 30):
+        self.stages = stages
+        self.logger = logger
+        self.report_seconds = report_seconds
+        self.queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._lock = threading.Lock()
+        self._alive = [stage.workers for stage in stages]
+        self._started = None
+        self._finished = threading.Event()
+
+    def _worker(self, index: int) -> None:
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                self.logger.error(f"Stage {stage.name} failed: {e}")
+                result = None
+                with self._lock:
+                    stage.errors += 1
+            with self._lock:
+                stage.busy_seconds += time.perf_counter() - start
+                stage.processed += 1
+                if result is None:
+                    stage.dropped += 1
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+        with self._lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        # The last worker of a stage shuts the next stage down
+        if last and outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                outbox.put(_DONE)
+
+    def metrics(self) -> dict:
+        """
+        Snapshot of per-stage counters, throughput and queue depths.
+
+        Returns:
+            dict: Metrics keyed by stage name.
+        """
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._lock:
+            return {
+                stage.name: {
+                    "queue_depth": self.queues[i].qsize(),
+                    "queue_size": stage.queue_size,
+                    "workers": stage.workers,
+                    "processed": stage.processed,
+                    "dropped": stage.dropped,
+                    "errors": stage.errors,
+                    "items_per_second": stage.processed / elapsed if elapsed else 0.0,
+                    # Share of the stage's worker time spent busy; near 1.0 marks the bottleneck
+                    "utilization": stage.busy_seconds / (elapsed * stage.workers) if elapsed else 0.0,
+                }
+                for i, stage in enumerate(self.stages)
+            }
+
+    def _report(self) -> None:
+        while not self._finished.wait(self.report_seconds):
+            summary = ", ".join(
+                f"{name}: q={m['queue_depth']}/{m['queue_size']} done={m['processed']} "
+                f"{m['items_per_second']:.2f}/s util={m['utilization']:.0%}"
+                for name, m in self.metrics().items()
+            )
+            self.logger.info(f"Pipeline {summary}")
+
+    def run(self, source: Iterable) -> dict:
+        """
+        Feed all items of `source` through the stages and wait for completion.
+
+        Args:
+            source (Iterable): Input items of the first stage.
+
+        Returns:
+            dict: Final metrics (see `metrics`).
+        """
+        self._started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"{stage.name}-{n}", daemon=True)
+            for i, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        if self.report_seconds > 0:
+            threading.Thread(target=self._report, name="pipeline-report", daemon=True).start()
+
+        try:
+            for item in source:
+                self.queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self.queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+            self._finished.set()
+
+        return self.metrics()
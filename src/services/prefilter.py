@@ -0,0 +1,174 @@
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Iterable
+from src.core import settings
+from src.storage.pubchem_mirror import PubChemMirror, get_mirror
+from src.utils.processing import STOPLIST, is_pubchem_candidate, normalize_compound_name
+
+# Morphemes of systematic (IUPAC-style) names
+IUPAC_MORPHEMES = (
+    "methyl", "ethyl", "propyl", "butyl", "phenyl", "benzyl", "amino", "hydroxy", "methoxy", "ethoxy",
+    "chloro", "fluoro", "bromo", "iodo", "nitro", "cyano", "carbonyl", "carboxy", "sulfonyl", "sulfanyl",
+    "pyridin", "pyrimidin", "piperidin", "piperazin", "morpholin", "indol", "quinolin", "quinazolin",
+    "imidazol", "thiazol", "oxazol", "triazol", "pyrazol", "pyrrol", "furan", "thiophen", "benzo",
+)
+# USAN/INN stems of small-molecule drugs (biologic stems such as -mab are excluded on purpose)
+DRUG_STEMS = (
+    "tinib", "ciclib", "parib", "rafenib", "zomib", "lisib", "afil", "conazole", "prazole", "cycline",
+    "floxacin", "mycin", "micin", "olol", "pril", "sartan", "statin", "dipine", "oxetine", "pramine",
+    "tidine", "navir", "previr", "buvir", "asvir", "setron", "triptan", "lukast", "gliptin", "gliflozin",
+    "platin", "taxel", "rubicin", "citabine", "trexate", "semide", "thiazide", "dronate", "parin",
+    "xaban", "gatran", "caine", "profen", "coxib", "barbital", "azepam", "azolam", "peridol", "cillin",
+    "asone", "olone", "isone", "vudine", "amivir", "azole",
+)
+
+# A token holding a systematic-name morpheme plus a locant, hyphen or bracket, e.g. "4-methylpiperazin-1-yl"
+_IUPAC_RE = re.compile(
+    r"\b(?=[\w,'()\[\]-]*(?:" + "|".join(IUPAC_MORPHEMES) + r"))(?=[\w,'()\[\]-]*[\d\[(-])[\w,'()\[\]-]{6,}",
+    re.IGNORECASE,
+)
+_DRUG_STEM_RE = re.compile(r"\b[A-Za-z]{2,}(?:" + "|".join(DRUG_STEMS) + r")\b", re.IGNORECASE)
+# Development codes such as AZD9291, ABT-199, GSK2118436
+_CODE_NAME_RE = re.compile(r"\b[A-Z]{2,5}-?\d{3,7}\b")
+_WORD_RE = re.compile(r"\w[\w'-]*")
+
+logger = logging.getLogger("pubchem_db")
+
+
+class ChemicalPrefilter:
+    """
+    Cheap local test for whether a chunk mentions any chemical compound.
+
+    Chunks are tokenized once and every word n-gram is looked up in a set of
+    known compound names (e.g. names already resolved through PubChem); regexes
+    for systematic names, drug stems and development codes catch compounds that
+    are not in the vocabulary yet. Chunks without a candidate skip the LLM.
+
+    The regexes alone miss common drugs (e.g. aspirin, metformin, cisplatin), so
+    with fewer than `min_vocabulary` known names the gate stays open and every
+    chunk is kept.
+
+    Args:
+        names (Iterable[str]): Known compound names and synonyms.
+        max_ngram (int): Longest name, in words, that is looked up.
+        min_length (int): Names shorter than this are ignored (they match ordinary words).
+        min_vocabulary (int): Known names needed before chunks are skipped.
+    """
+
+    def __init__(self, names: Iterable[str] = (), max_ngram: int = 6, min_length: int = 4, min_vocabulary: int = 0):
+        self.max_ngram = max_ngram
+        self.vocabulary = set()
+        for name in names:
+            if len(name) >= min_length and name not in STOPLIST and is_pubchem_candidate(name):
+                key = normalize_compound_name(name)
+                self.vocabulary.add(key)
+                self.max_ngram = max(self.max_ngram, min(len(key.split()), 10))
+        self.enabled = len(self.vocabulary) >= min_vocabulary
+        self.checked = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def find_candidates(self, text: str, limit: int = 1) -> list[str]:
+        """
+        Find compound-like mentions in a text.
+
+        Args:
+            text (str): Chunk text.
+            limit (int): Stop after this many mentions (0 = find all).
+
+        Returns:
+            list[str]: Matched mentions.
+        """
+        found = []
+        for regex in (_DRUG_STEM_RE, _CODE_NAME_RE, _IUPAC_RE):
+            for match in regex.finditer(text):
+                if match.group(0) not in STOPLIST:
+                    found.append(match.group(0))
+                    if limit and len(found) >= limit:
+                        return found
+
+        if self.vocabulary:
+            words = [normalize_compound_name(w) for w in _WORD_RE.findall(text)]
+            for i in range(len(words)):
+                for n in range(1, self.max_ngram + 1):
+                    if i + n > len(words):
+                        break
+                    candidate = " ".join(words[i:i + n])
+                    if candidate in self.vocabulary:
+                        found.append(candidate)
+                        if limit and len(found) >= limit:
+                            return found
+        return found
+
+    def has_candidates(self, text: str) -> bool:
+        """
+        Decide whether a chunk needs the LLM, and count the decision.
+
+        Args:
+            text (str): Chunk text.
+
+        Returns:
+            bool: True if the chunk mentions at least one compound candidate, or the gate is open.
+        """
+        keep = not self.enabled or bool(self.find_candidates(text))
+        with self._lock:
+            self.checked += 1
+            if not keep:
+                self.skipped += 1
+        return keep
+
+    def stats(self) -> dict:
+        """
+        Return how many chunks were checked and skipped.
+
+        Returns:
+            dict: Counters and skip rate.
+        """
+        return {
+            "enabled": self.enabled,
+            "vocabulary": len(self.vocabulary),
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+        }
+
+
+def build_prefilter(
+        pubchem_cache=None,
+        extra_names: Iterable[str] = (),
+        mirror: PubChemMirror | None = None,
+        min_vocabulary: int = settings.PREFILTER_MIN_VOCABULARY,
+) -> ChemicalPrefilter:
+    """
+    Build a prefilter whose vocabulary holds every name already resolved through PubChem.
+
+    Names come from the PubChem cache and from the synonyms of the local mirror,
+    which is used whenever its file exists.
+
+    Args:
+        pubchem_cache (PubChemCache | None): PubChem cache to read names from.
+        extra_names (Iterable[str]): Additional known compound names.
+        mirror (PubChemMirror | None): Mirror to read synonyms from; defaults to the local mirror.
+        min_vocabulary (int): Known names needed before chunks are skipped.
+
+    Returns:
+        ChemicalPrefilter: Prefilter instance.
+    """
+    names = list(extra_names)
+    if pubchem_cache is not None:
+        names.extend(pubchem_cache.known_names())
+    if mirror is None:
+        mirror = get_mirror()
+    if mirror is None and Path(settings.PUBCHEM_MIRROR_PATH).exists():
+        mirror = PubChemMirror()
+    if mirror is not None:
+        names.extend(mirror.synonyms(limit=settings.PREFILTER_MIRROR_MAX_NAMES))
+    prefilter = ChemicalPrefilter(names, min_vocabulary=min_vocabulary)
+    if not prefilter.enabled:
+        logger.warning(
+            f"Prefilter vocabulary has {len(prefilter.vocabulary)} names (< {min_vocabulary}); "
+            "keeping every chunk until the PubChem cache or mirror knows more names"
+        )
+    return prefilter
@@ -1,61 +1,426 @@
+import numpy as np
 import pubchempy as pcp
+import requests
+from urllib.parse import quote
+from src.core import settings
+from src.storage.cache import SqliteCache
+from src.storage.pubchem_mirror import get_mirror
 from src.utils.processing import fetch_assays_for_cid
-from src.schemas.compound_extraction import CompoundInfo, Assay
-from typing import List
+from src.utils.resilience import get_service
+from src.schemas.compound_extraction import CompoundInfo, Assay, AssayTable
 
+PUG_REST = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
+PROPERTY_FIELDS = (
+    "MolecularFormula", "MolecularWeight", "XLogP", "TPSA", "HBondDonorCount", "HBondAcceptorCount",
+)
 
-def fetch_pubchem_data(compound: str, article_file: str, logger) -> CompoundInfo:
+
+class PubChemCache:
+    """
+    Two-level persistent PubChem cache shared across runs and worker processes.
+
+    Level one maps a normalized compound name to its CID (None for names PubChem
+    does not know), level two maps a CID to its properties and parsed assays.
+
+    Args:
+        mode (str): "use", "refresh" or "bypass".
+        path (str): SQLite file location.
+        ttl_days (float): Entries older than this are fetched again.
+    """
+
+    def __init__(
+            self,
+            mode: str = "use",
+            path: str = settings.PUBCHEM_CACHE_PATH,
+            ttl_days: float = settings.PUBCHEM_CACHE_TTL_DAYS,
+    ):
+        max_age = ttl_days * 86400
+        self.names = SqliteCache(path, table="pubchem_names", max_age_seconds=max_age, mode=mode)
+        self.compounds = SqliteCache(path, table="pubchem_compounds", max_age_seconds=max_age, mode=mode)
+
+    @staticmethod
+    def _name_key(name: str) -> str:
+        return " ".join(name.split()).lower()
+
+    def get_cid(self, name: str) -> tuple[bool, int | None]:
+        """
+        Look up the CID of a compound name.
+
+        Args:
+            name (str): Compound name.
+
+        Returns:
+            tuple[bool, int | None]: Whether the name is cached, and its CID (None if PubChem has no match).
+        """
+        entry = self.names.get(self._name_key(name))
+        if entry is None:
+            return False, None
+        return True, entry["cid"]
+
+    def set_cid(self, name: str, cid: int | None) -> None:
+        self.names.set(self._name_key(name), {"cid": cid})
+
+    def get_compound(self, cid: int) -> tuple[dict, AssayTable] | None:
+        """
+        Look up properties and assays of a CID.
+
+        Args:
+            cid (int): PubChem Compound ID.
+
+        Returns:
+            tuple[dict, AssayTable] | None: Compound properties and assays, or None on a miss.
+        """
+        entry = self.compounds.get(str(cid))
+        if entry is None:
+            return None
+        assays = entry["assays"]
+        if isinstance(assays, list):
+            # Entries written before assays were stored column-wise
+            return entry["properties"], AssayTable.from_assays([Assay(**a) for a in assays])
+        return entry["properties"], AssayTable(**assays)
+
+    def set_compound(self, cid: int, properties: dict, assays: AssayTable) -> None:
+        self.compounds.set(str(cid), {"properties": properties, "assays": assays.to_dict()})
+
+    def known_names(self) -> list[str]:
+        """
+        Names (normalized) that resolved to a PubChem CID.
+
+        Returns:
+            list[str]: Compound names.
+        """
+        return [name for name, entry in self.names.items() if entry["cid"] is not None]
+
+    def stats(self) -> dict:
+        return {"names": self.names.stats(), "compounds": self.compounds.stats()}
+
+
+def lipinski_pass_batch(
+        molecular_weight: list[float | None],
+        logp: list[float | None],
+        h_bond_donor_count: list[int | None],
+        h_bond_acceptor_count: list[int | None],
+) -> list[bool | None]:
+    """
+    Rule-of-five check for many compounds at once.
+
+    Compounds without a molecular weight or logP get None; missing H-bond counts count as 0.
+
+    Args:
+        molecular_weight (list[float | None]): Molecular weights.
+        logp (list[float | None]): XLogP values.
+        h_bond_donor_count (list[int | None]): H-bond donor counts.
+        h_bond_acceptor_count (list[int | None]): H-bond acceptor counts.
+    Returns:
+        list[bool | None]: Lipinski result per compound.
+    """
+    def column(values):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+    mw, lp = column(molecular_weight), column(logp)
+    donors = np.nan_to_num(column(h_bond_donor_count))
+    acceptors = np.nan_to_num(column(h_bond_acceptor_count))
+    passed = (mw < 500) & (lp <= 5) & (acceptors <= 5) & (donors <= 10)
+    known = ~np.isnan(mw) & (mw != 0) & ~np.isnan(lp)
+    return [bool(p) if k else None for p, k in zip(passed, known)]
+
+
+def compound_properties(c: pcp.Compound) -> dict:
+    """
+    Extract stored properties from a PubChemPy compound.
+
+    Args:
+        c (pcp.Compound): PubChemPy compound.
+    Returns:
+        dict: Compound columns except the name.
+    """
+    logp = getattr(c, "xlogp", None)
+    tpsa = getattr(c, "tpsa", None)
+    molecular_weight = getattr(c, "molecular_weight", None)
+    h_bond_donor_count = getattr(c, "h_bond_donor_count", None)
+    h_bond_acceptor_count = getattr(c, "h_bond_acceptor_count", None)
+    pubchem_cid = getattr(c, "cid")
+
+    # Lipinski's Rule of Five check
+    try:
+        lipinski_pass = lipinski_pass_batch(
+            [molecular_weight], [logp], [h_bond_donor_count], [h_bond_acceptor_count]
+        )[0]
+    except (TypeError, ValueError):
+        lipinski_pass = None
+    return {
+        'pubchem_cid': pubchem_cid,
+        'molecular_formula': c.molecular_formula,
+        'molecular_weight': molecular_weight,
+        "logp": logp,
+        "tpsa": tpsa,
+        "lipinski_pass": lipinski_pass,
+    }
+
+
+def fetch_pubchem_data(compound: str, article_file: str, logger, cache: PubChemCache | None = None) -> CompoundInfo:
     """
     Fetch PubChem data for a compound.
+
+    Lookup errors (network, throttling, open circuit) are raised rather than
+    reported as a missing CID, so that the article is not stored without the compound.
+
     Args:
         compound (str): Compound name.
         article_file (str): Source article filename.
         logger (logging.Logger): Logger.
+        cache (PubChemCache | None): Optional persistent cache of name lookups and compound data.
     Returns:
-        CompoundInfo: Dictionary of compound data.
+        CompoundInfo: Dictionary of compound data, (None, None) if PubChem does not know the name.
     """
+    mirror_only = settings.PUBCHEM_SOURCE == "mirror"
+    if mirror_only:
+        # The mirror is a local indexed store already, and it must not be shadowed by stale cache entries
+        cache = None
     try:
-        results = pcp.get_compounds(compound, "name")
+        cached_name, pubchem_cid = cache.get_cid(compound) if cache else (False, None)
+        if cached_name and pubchem_cid is None:
+            return None, None
+
+        entry = cache.get_compound(pubchem_cid) if cached_name else None
+        if entry is None:
+            cid = pubchem_cid if cached_name else local_cid(compound)
+            entry = local_compound(cid) if cid is not None else None
+        if entry is not None:
+            properties, assays = entry
+        elif mirror_only:
+            return None, None
+        else:
+            if cached_name:
+                results = [get_service("pubchem").call(pcp.Compound.from_cid, pubchem_cid)]
+            else:
+                results = get_service("pubchem").call(pcp.get_compounds, compound, "name")
 
-        if results:
-            c = results[0]
-            logp = getattr(c, "xlogp", None)
-            tpsa = getattr(c, "tpsa", None)
-            molecular_weight = getattr(c, "molecular_weight", None)
-            h_bond_donor_count = getattr(c, "h_bond_donor_count", None)
-            h_bond_acceptor_count = getattr(c, "h_bond_acceptor_count", None)
-            pubchem_cid = getattr(c, "cid")
+            if not results:
+                if cache:
+                    cache.set_cid(compound, None)
+                return None, None
 
-            # Lipinski's Rule of Five check
-            lipinski_pass = None
+            properties = compound_properties(results[0])
+            assays: AssayTable = fetch_assays_for_cid(properties["pubchem_cid"])
+            if cache:
+                cache.set_cid(compound, properties["pubchem_cid"])
+                cache.set_compound(properties["pubchem_cid"], properties, assays)
 
-            try:
-                if c.molecular_weight and logp is not None:
-                    lipinski_pass = (
-                            molecular_weight < 500
-                            and logp <= 5
-                            and (h_bond_acceptor_count or 0) <= 5
-                            and (h_bond_donor_count or 0) <= 10
-                    )
-            except Exception:
-                lipinski_pass = None
-            assays: List[Assay] = fetch_assays_for_cid(pubchem_cid)
-            compound_info: CompoundInfo = {
-                'name': compound,
-                'pubchem_cid': pubchem_cid,
-                'molecular_formula': c.molecular_formula,
-                'molecular_weight': molecular_weight,
-                "logp": logp,
-                "tpsa": tpsa,
-                "lipinski_pass": lipinski_pass,
-            }
-            return compound_info, assays
-        else:
-            return None, None
+        compound_info: CompoundInfo = {'name': compound, **properties}
+        return compound_info, assays
     except Exception as e:
-        return None, None
+        logger.warning(f"PubChem lookup failed for {compound} ({article_file}): {e}")
+        raise
+
+
+def resolve_cid(name: str) -> int | None:
+    """
+    Resolve a compound name to its first PubChem CID with a light PUG-REST request.
+
+    Args:
+        name (str): Compound name.
+    Returns:
+        int | None: CID, or None if PubChem does not know the name.
+    """
+    def request():
+        r = requests.get(f"{PUG_REST}/compound/name/{quote(name, safe='')}/cids/JSON", timeout=30)
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.json()
+
+    data = get_service("pubchem").call(request)
+    cids = (data or {}).get("IdentifierList", {}).get("CID", [])
+    return cids[0] if cids and cids[0] else None
+
+
+def fetch_properties(cids: list[int], batch_size: int = settings.PUBCHEM_PROPERTY_BATCH) -> dict[int, dict]:
+    """
+    Fetch stored properties of many CIDs with one POST request per batch.
+
+    Args:
+        cids (list[int]): PubChem Compound IDs.
+        batch_size (int): CIDs per request.
+    Returns:
+        dict[int, dict]: Compound columns except the name, keyed by CID.
+    """
+    url = f"{PUG_REST}/compound/cid/property/{','.join(PROPERTY_FIELDS)}/JSON"
+    rows = []
+    for start in range(0, len(cids), batch_size):
+        batch = cids[start:start + batch_size]
+
+        def request():
+            r = requests.post(url, data={"cid": ",".join(map(str, batch))}, timeout=60)
+            r.raise_for_status()
+            return r.json()
+
+        rows.extend(get_service("pubchem").call(request).get("PropertyTable", {}).get("Properties", []))
+
+    def number(row, key, cast=float):
+        value = row.get(key)
+        return None if value is None else cast(value)
+
+    return compound_rows([
+        {
+            "cid": row["CID"],
+            "molecular_formula": row.get("MolecularFormula"),
+            "molecular_weight": number(row, "MolecularWeight"),
+            "logp": number(row, "XLogP"),
+            "tpsa": number(row, "TPSA"),
+            "h_bond_donor_count": number(row, "HBondDonorCount", int),
+            "h_bond_acceptor_count": number(row, "HBondAcceptorCount", int),
+        }
+        for row in rows
+    ])
+
+
+def compound_rows(rows: list[dict]) -> dict[int, dict]:
+    """
+    Turn raw property records into compound columns, with Lipinski computed for the batch.
+
+    Args:
+        rows (list[dict]): Records with "cid" and optional molecular_formula, molecular_weight,
+            logp, tpsa, h_bond_donor_count and h_bond_acceptor_count.
+    Returns:
+        dict[int, dict]: Compound columns except the name, keyed by CID.
+    """
+    lipinski = lipinski_pass_batch(
+        [row.get("molecular_weight") for row in rows],
+        [row.get("logp") for row in rows],
+        [row.get("h_bond_donor_count") for row in rows],
+        [row.get("h_bond_acceptor_count") for row in rows],
+    )
+    return {
+        row["cid"]: {
+            "pubchem_cid": row["cid"],
+            "molecular_formula": row.get("molecular_formula"),
+            "molecular_weight": row.get("molecular_weight"),
+            "logp": row.get("logp"),
+            "tpsa": row.get("tpsa"),
+            "lipinski_pass": passed,
+        }
+        for row, passed in zip(rows, lipinski)
+    }
+
 
+def local_compound(cid: int) -> tuple[dict, AssayTable] | None:
+    """
+    Look up a CID in the local PubChem mirror.
 
+    A CID the mirror only holds assays for gets its properties from PUG-REST,
+    unless PUBCHEM_SOURCE is "mirror".
 
+    Args:
+        cid (int): PubChem Compound ID.
+    Returns:
+        tuple[dict, AssayTable] | None: Compound columns and assays, or None if the
+        mirror is disabled or does not hold the CID, or its missing properties
+        could not be fetched.
+    """
+    mirror = get_mirror()
+    if mirror is None or not mirror.has_cid(cid):
+        return None
+    props = mirror.get_properties([cid])
+    if cid in props:
+        properties = compound_rows([props[cid]])[cid]
+    elif settings.PUBCHEM_SOURCE == "mirror":
+        properties = compound_rows([{"cid": cid}])[cid]
+    else:
+        try:
+            properties = fetch_properties([cid])[cid]
+        except Exception:
+            # Callers fall back to a full remote lookup
+            return None
+    assays = mirror.get_assays(cid, settings.PUBCHEM_ASSAY_ACTIVE_ONLY, settings.PUBCHEM_ASSAY_MAX_ROWS)
+    return properties, assays
+
+
+def local_cid(name: str) -> int | None:
+    """
+    Resolve a compound name through the local PubChem mirror.
 
+    Args:
+        name (str): Compound name.
+    Returns:
+        int | None: CID, or None if the mirror is disabled or does not know the name.
+    """
+    mirror = get_mirror()
+    return mirror.get_cid(name) if mirror is not None else None
+
+
+def fetch_pubchem_batch(
+        compounds: list[str],
+        article_file: str,
+        logger,
+        cache: PubChemCache | None = None,
+) -> dict[str, tuple[CompoundInfo, AssayTable]]:
+    """
+    Fetch PubChem data for all compounds of an article with batched property requests.
+
+    Names are resolved to CIDs first (name -> CID requests are light), then the
+    properties of every uncached CID are fetched in one POST per batch. With
+    PUBCHEM_SOURCE "mirror_first" the local mirror is consulted before the network,
+    with "mirror" no network request is made. A failed request is raised; only
+    names PubChem does not know are left out of the result.
+
+    Args:
+        compounds (list[str]): Compound names.
+        article_file (str): Source article filename.
+        logger (logging.Logger): Logger.
+        cache (PubChemCache | None): Optional persistent cache of name lookups and compound data.
+    Returns:
+        dict[str, tuple[CompoundInfo, AssayTable]]: Compound data and assays for every name with a CID.
+    """
+    mirror_only = settings.PUBCHEM_SOURCE == "mirror"
+    if mirror_only:
+        cache = None
+
+    cids = {}
+    for name in compounds:
+        cached_name, cid = cache.get_cid(name) if cache else (False, None)
+        if not cached_name:
+            cid = local_cid(name)
+            if cid is not None or mirror_only:
+                cached_name = True
+        if not cached_name:
+            try:
+                cid = resolve_cid(name)
+            except Exception as e:
+                logger.warning(f"PubChem lookup failed for {name} ({article_file}): {e}")
+                raise
+            if cache:
+                cache.set_cid(name, cid)
+        if cid is not None:
+            cids[name] = cid
+
+    entries = {}
+    for cid in set(cids.values()):
+        entry = cache.get_compound(cid) if cache else None
+        if entry is None:
+            entry = local_compound(cid)
+        if entry is not None:
+            entries[cid] = entry
+
+    missing = sorted(set(cids.values()) - entries.keys())
+    if missing and not mirror_only:
+        try:
+            properties = fetch_properties(missing)
+        except Exception as e:
+            logger.warning(f"PubChem property request failed for {len(missing)} CIDs ({article_file}): {e}")
+            raise
+        for cid, props in properties.items():
+            try:
+                assays = fetch_assays_for_cid(cid)
+            except Exception as e:
+                logger.warning(f"PubChem assay request failed for CID {cid} ({article_file}): {e}")
+                raise
+            entries[cid] = (props, assays)
+            if cache:
+                cache.set_compound(cid, props, assays)
 
+    return {
+        name: ({"name": name, **entries[cid][0]}, entries[cid][1])
+        for name, cid in cids.items()
+        if cid in entries
+    }
@@ -1,124 +1,151 @@
-import os
-import json
-import requests
-from tqdm import tqdm
+import asyncio
+import xml.etree.ElementTree as ET
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
 from Bio import Entrez
-from src.utils.file_io import recreate_dir
+from src.core import settings
+from src.services.downloader import collect_pdfs
+from src.storage.metadata_store import MetadataStore
+from src.utils.resilience import get_service
 
 
-def search_pubmed(query: str, retmax: int = 10, free_full_text: bool = True) -> list[str]:
+def _full_text_query(query: str, free_full_text: bool) -> str:
+    if free_full_text:
+        query = f"{query} AND free full text[filter]"
+    return query
+
+
+def search_pubmed_history(query: str, free_full_text: bool = True) -> tuple[int, str, str]:
     """
-    Search PubMed for articles matching a query.
+    Run a PubMed search on the Entrez history server without downloading IDs.
 
     Args:
         query (str): Search term for PubMed.
-        retmax (int): Maximum number of results to return.
         free_full_text (bool): Whether to restrict results to free full text.
 
     Returns:
-        List[str]: A list of PubMed IDs (PMIDs).
+        tuple[int, str, str]: Result count, WebEnv and query_key of the stored result set.
     """
-    if free_full_text:
-        query = f"{query} AND free full text[filter]"
-    handle = Entrez.esearch(db="pubmed", term=query, retmax=retmax)
+    handle = get_service("entrez").call(
+        Entrez.esearch, db="pubmed", term=_full_text_query(query, free_full_text), usehistory="y", retmax=0
+    )
     record = Entrez.read(handle)
-    return record["IdList"]
+    handle.close()
+    return int(record["Count"]), record["WebEnv"], record["QueryKey"]
 
 
-def fetch_metadata(pmids: list[str]) -> list[dict]:
-    """
-    Fetch metadata for a list of PubMed IDs.
+def _inner_xml(elem: ET.Element | None) -> str:
+    # Keeps inline markup such as <i>...</i>, like Entrez.read does
+    if elem is None:
+        return ""
+    return (elem.text or "") + "".join(ET.tostring(child, encoding="unicode") for child in elem)
 
-    Args:
-        pmids (List[str]): List of PubMed IDs.
 
-    Returns:
-        List[dict]: A list of dictionaries containing article metadata
-                    (PMID, Title, Abstract, Journal, Authors, DOI).
+def parse_article(article: ET.Element) -> dict:
     """
-    handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="xml")
-    records = Entrez.read(handle)
-    articles = []
-    for article in records["PubmedArticle"]:
-        medline = article["MedlineCitation"]
-        article_data = medline["Article"]
-
-        info = {
-            "PMID": str(medline["PMID"]),
-            "Title": article_data.get("ArticleTitle", ""),
-            "Abstract": " ".join(article_data.get("Abstract", {}).get("AbstractText", [])),
-            "Journal": article_data["Journal"]["Title"],
-            "Authors": [a.get("LastName","")+" "+a.get("ForeName","")
-                        for a in article_data.get("AuthorList", []) if "LastName" in a][:3],
-            "DOI": None,
-        }
-
-        # DOI
-        ids = article["PubmedData"]["ArticleIdList"]
-        for aid in ids:
-            if aid.attributes.get("IdType") == "doi":
-                info["DOI"] = str(aid)
-
-        articles.append(info)
-    return articles
-
-
-def get_unpaywall_pdf(doi: str | None, email: str) -> str | None:
-    """
-    Retrieve the PDF URL of an article from Unpaywall using its DOI.
+    Convert one PubmedArticle XML element into a metadata record.
 
     Args:
-        doi (str | None): Digital Object Identifier of the article.
-        email (str): Email address required by Unpaywall API.
+        article (ET.Element): PubmedArticle element.
 
     Returns:
-        str | None: Direct URL to the PDF if available, otherwise None.
+        dict: Metadata record (PMID, Title, Abstract, Journal, Authors, DOI).
+    """
+    medline = article.find("MedlineCitation")
+    article_data = medline.find("Article")
+
+    info = {
+        "PMID": medline.findtext("PMID"),
+        "Title": _inner_xml(article_data.find("ArticleTitle")),
+        "Abstract": " ".join(_inner_xml(a) for a in article_data.findall("Abstract/AbstractText")),
+        "Journal": article_data.findtext("Journal/Title"),
+        "Authors": [a.findtext("LastName", "")+" "+a.findtext("ForeName", "")
+                    for a in article_data.findall("AuthorList/Author") if a.find("LastName") is not None][:3],
+        "DOI": None,
+    }
+
+    # DOI
+    for aid in article.findall("PubmedData/ArticleIdList/ArticleId"):
+        if aid.get("IdType") == "doi":
+            info["DOI"] = aid.text
+    return info
+
+
+def _parse_efetch(handle) -> Iterator[dict]:
+    """
+    Incrementally parse an efetch XML response, one PubmedArticle at a time.
     """
-    if not doi:
-        return None
-    url = f"https://api.unpaywall.org/v2/{doi}?email={email}"
     try:
-        r = requests.get(url, timeout=15)
-        if r.status_code == 200:
-            data = r.json()
-            if data.get("best_oa_location") and data["best_oa_location"].get("url_for_pdf"):
-                return data["best_oa_location"]["url_for_pdf"]
-    except Exception as e:
-        print(f"Unpaywall error for {doi}: {e}")
-    return None
+        for _, elem in ET.iterparse(handle, events=("end",)):
+            if elem.tag == "PubmedArticle":
+                yield parse_article(elem)
+                elem.clear()
+            elif elem.tag == "PubmedBookArticle":
+                elem.clear()
+    finally:
+        handle.close()
+
+
+def fetch_history_metadata(
+        webenv: str,
+        query_key: str,
+        total: int,
+        batch_size: int = settings.ENTREZ_BATCH_SIZE,
+) -> Iterator[dict]:
+    """
+    Page through a result set stored on the Entrez history server.
 
+    Args:
+        webenv (str): WebEnv returned by `search_pubmed_history`.
+        query_key (str): Query key returned by `search_pubmed_history`.
+        total (int): Number of records to fetch.
+        batch_size (int): Number of records per efetch request.
 
-def download_pdf(pdf_url: str | None, pmid: str, output_dir: str) -> bool:
+    Yields:
+        dict: Article metadata, parsed record by record as each page is read.
     """
-    Download a PDF file from a given URL and save it locally.
+    for start in range(0, total, batch_size):
+        handle = get_service("entrez").call(
+            Entrez.efetch,
+            db="pubmed",
+            rettype="xml",
+            retstart=start,
+            retmax=min(batch_size, total - start),
+            webenv=webenv,
+            query_key=query_key,
+        )
+        yield from _parse_efetch(handle)
+
+
+def search_articles(query: str, email: str, retmax: int = 20) -> Iterator[dict]:
+    """
+    Search PubMed and stream the metadata records of the results.
 
     Args:
-        pdf_url (str | None): URL of the PDF file.
-        pmid (str): PubMed ID used as the filename.
-        output_dir (str): Directory where the PDF will be saved.
+        query (str): Search term for PubMed.
+        email (str): Email address required by the Entrez API.
+        retmax (int): Maximum number of PubMed results to retrieve.
 
-    Returns:
-        bool: True if the PDF was successfully downloaded, False otherwise.
+    Yields:
+        dict: Article metadata, parsed record by record as each page is read.
     """
-    if not pdf_url:
-        return False
-    try:
-        r = requests.get(pdf_url, stream=True, timeout=20)
-        if r.status_code == 200 and "pdf" in r.headers.get("content-type","").lower():
-            out_path = os.path.join(output_dir, f"{pmid}.pdf")
-            with open(out_path, "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            return True
-    except Exception as e:
-        print(f"Error downloading PDF for PMID {pmid}: {e}")
-    return False
+    Entrez.email = email
+    if settings.NCBI_API_KEY:
+        Entrez.api_key = settings.NCBI_API_KEY
+    count, webenv, query_key = search_pubmed_history(query)
+    yield from fetch_history_metadata(webenv, query_key, min(count, retmax))
 
 
 def article_collection(query: str, email: str, output_dir: str = './data/raw_data', retmax: int = 20) -> None:
     """
     Collect articles from PubMed, download available PDFs, and save metadata.
 
+    Used when all PDFs must be on disk before processing starts (batch
+    inference); the streaming pipeline downloads in its first stage instead.
+    Articles already in the directory's metadata store with their PDF on disk
+    are skipped, so an interrupted collection resumes where it stopped.
+
     Args:
         query (str): Search term for PubMed.
         email (str): Email address required by Entrez and Unpaywall APIs.
@@ -126,29 +153,21 @@ def article_collection(query: str, email: str, output_dir: str = './data/raw_dat
         retmax (int): Maximum number of PubMed results to retrieve.
 
     Returns:
-        None: Saves downloaded PDFs and metadata.json to the output directory.
+        None: Saves downloaded PDFs and metadata.jsonl to the output directory.
     """
-    Entrez.email = email
-    pmids = search_pubmed(query, retmax=retmax)
-    articles = fetch_metadata(pmids)
-    recreate_dir(output_dir)
-
-    success = 0
-    downloaded_metadata = []
-
-    for art in tqdm(articles, desc="Downloading PDFs"):
-        pdf_url = None
-        if art["DOI"]:
-            pdf_url = get_unpaywall_pdf(art["DOI"], email)
-
-        if download_pdf(pdf_url, art["PMID"], output_dir):
-            success += 1
-            art["pdf_url"] = pdf_url
-            downloaded_metadata.append(art)
-
-    json_path = output_dir / "metadata.json"
-    if downloaded_metadata:
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(downloaded_metadata, f, ensure_ascii=False, indent=2)
-
-    print(f"\nDownloaded {success}/{len(articles)} PDFs")
\ No newline at end of file
+    articles = search_articles(query, email, retmax)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Download page by page so only one efetch batch of records is held at a time;
+    # each record is written to metadata.jsonl as soon as its PDF is on disk
+    store = MetadataStore.open(output_dir)
+    success = skipped = total = 0
+    while batch := list(islice(articles, settings.ENTREZ_BATCH_SIZE)):
+        total += len(batch)
+        pending = [a for a in batch if a["PMID"] not in store or not (output_dir / f"{a['PMID']}.pdf").exists()]
+        skipped += len(batch) - len(pending)
+        if pending:
+            success += asyncio.run(collect_pdfs(pending, email, output_dir, store))
+
+    print(f"\nDownloaded {success}/{total - skipped} PDFs, {skipped} already collected")
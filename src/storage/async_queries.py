@@ -0,0 +1,60 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from src.storage.database import get_async_engine
+
+logger = logging.getLogger("pubchem_db")
+
+_session_factory: async_sessionmaker | None = None
+
+
+def async_session() -> AsyncSession:
+    """
+    Open a session on the shared asyncpg engine.
+
+    Returns:
+        AsyncSession: New async session.
+    """
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _session_factory()
+
+
+class AsyncQueries:
+    """
+    Read-only queries on the asyncpg engine of the query workload.
+
+    Writes belong to the pipeline and go through `Queries` on the ingest pool.
+    """
+
+    @staticmethod
+    async def run_sql(sql: str, params: dict | None = None) -> list[dict]:
+        """
+        Run a read-only SQL query.
+
+        Args:
+            sql (str): SQL statement.
+            params (dict | None): Bound parameters.
+
+        Returns:
+            list[dict]: Result rows.
+        """
+        async with async_session() as session:
+            async with session.begin():
+                # A read-only transaction refuses writes, including writable CTEs
+                await session.execute(text("SET TRANSACTION READ ONLY"))
+                result = await session.execute(text(sql), params or {})
+                return [dict(row) for row in result.mappings()]
+
+    @staticmethod
+    async def data_version() -> int:
+        """
+        Return the counter that is bumped whenever the pipeline changes stored data.
+
+        Returns:
+            int: Current data version.
+        """
+        async with async_session() as session:
+            result = await session.execute(text("SELECT version FROM data_version WHERE id = 1"))
+            return result.scalar() or 0
@@ -0,0 +1,197 @@
+import csv
+import io
+import logging
+from sqlalchemy import delete, update, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.core import settings
+from src.schemas.compound_extraction import ArticleRecord, CompoundInfo, AssayTable
+from src.storage.database import session_local
+from src.storage.models import Articles, Compounds, ArticleCompound, Assays, ActivityOutcome, ProcessingLedger
+from src.storage.queries import Queries
+
+logger = logging.getLogger("pubchem_db")
+
+ASSAY_COLUMNS = (
+    "assay_id", "compound_id", "assay_type", "target_name", "activity_outcome",
+    "potency_type", "potency_value", "potency_unit", "reference",
+)
+ACTIVITY_OUTCOMES = {outcome.value for outcome in ActivityOutcome}
+
+
+def _batches(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class BulkWriter:
+    """
+    Buffered, set-based writer for articles, compounds, links and assays.
+
+    Articles are buffered and flushed together in one transaction: multi-row
+    INSERT ... RETURNING for articles, INSERT ... ON CONFLICT ... RETURNING for
+    compounds (resolving all compound IDs in one round trip per batch), and COPY
+    for assays. The processing ledger is updated in the same transaction, so
+    only fully processed articles may be added; failed ones must be dropped
+    before they reach the writer.
+
+    Args:
+        batch_articles (int): Flush after this many buffered articles.
+        batch_assays (int): Flush after this many buffered assay rows.
+        session_factory (sessionmaker): Session factory to write with.
+    """
+
+    def __init__(
+            self,
+            batch_articles: int = settings.DB_BULK_ARTICLES,
+            batch_assays: int = settings.DB_BULK_ASSAY_ROWS,
+            session_factory=session_local,
+    ):
+        self.batch_articles = batch_articles
+        self.batch_assays = batch_assays
+        self.session_factory = session_factory
+        self._articles: dict[str, ArticleRecord] = {}
+        self._compounds: dict[int, tuple[CompoundInfo, AssayTable]] = {}
+        self._links: dict[tuple[str, int], str | None] = {}
+        self._assay_count = 0
+        self.articles_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def add_article(self, article: ArticleRecord, enriched: list[tuple]) -> None:
+        """
+        Buffer an article with its enriched compounds.
+
+        Args:
+            article (ArticleRecord): Article metadata.
+            enriched (list[tuple]): (compound_data, assays, context) tuples; assays is an
+                AssayTable or a list of Assay.
+
+        Returns:
+            None
+        """
+        pmid = article["pmid"]
+        self._articles[pmid] = article
+        for compound_data, assays, context in enriched:
+            cid = compound_data["pubchem_cid"]
+            if cid not in self._compounds:
+                if not isinstance(assays, AssayTable):
+                    assays = AssayTable.from_assays(assays or [])
+                self._compounds[cid] = (compound_data, assays)
+                self._assay_count += len(assays)
+            self._links[(pmid, cid)] = context
+
+        if len(self._articles) >= self.batch_articles or self._assay_count >= self.batch_assays:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all buffered rows in one transaction.
+
+        Returns:
+            None
+        """
+        if not self._articles:
+            return
+
+        with self.session_factory() as session:
+            pmids = list(self._articles)
+
+            # Replace rows left behind by an interrupted run
+            session.execute(delete(Articles).where(Articles.pmid.in_(pmids)))
+
+            article_ids = {}
+            for rows in _batches(list(self._articles.values()), 1000):
+                result = session.execute(pg_insert(Articles).values(rows).returning(Articles.id, Articles.pmid))
+                article_ids.update({pmid: article_id for article_id, pmid in result})
+
+            compound_ids, new_cids = self._write_compounds(session)
+
+            links = [
+                {"article_id": article_ids[pmid], "compound_id": compound_ids[cid], "context": context}
+                for (pmid, cid), context in self._links.items()
+            ]
+            for rows in _batches(links, 5000):
+                session.execute(pg_insert(ArticleCompound).values(rows).on_conflict_do_nothing())
+
+            # Assays belong to the compound, only newly created compounds need them
+            assay_rows = [
+                self._assay_row(row, compound_ids[cid])
+                for cid in new_cids
+                for row in self._compounds[cid][1].rows()
+            ]
+            self._copy_assays(session, [row for row in assay_rows if row is not None])
+            skipped = len(assay_rows) - sum(row is not None for row in assay_rows)
+            if skipped:
+                logger.warning(f"Skipped {skipped} assay rows without AID, assay type or valid outcome")
+
+            session.execute(
+                update(ProcessingLedger)
+                .where(ProcessingLedger.pmid.in_(pmids))
+                .values(db_done_at=func.now(), updated_at=func.now())
+            )
+            Queries.bump_data_version(session)
+            session.commit()
+
+        self.articles_written += len(self._articles)
+        logger.info(
+            f"Flushed {len(self._articles)} articles, {len(self._compounds)} compounds, "
+            f"{len(self._links)} links"
+        )
+        self._articles.clear()
+        self._compounds.clear()
+        self._links.clear()
+        self._assay_count = 0
+
+    def _write_compounds(self, session) -> tuple[dict[int, int], list[int]]:
+        compound_ids = {}
+        new_cids = []
+        rows = [compound_data for compound_data, _ in self._compounds.values()]
+        for batch in _batches(rows, 1000):
+            stmt = pg_insert(Compounds).values(batch)
+            # DO UPDATE (instead of DO NOTHING) makes RETURNING include existing rows;
+            # xmax = 0 only holds for freshly inserted tuples
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Compounds.pubchem_cid],
+                set_={"pubchem_cid": stmt.excluded.pubchem_cid},
+            ).returning(Compounds.id, Compounds.pubchem_cid, literal_column("xmax = 0").label("inserted"))
+            for compound_id, cid, inserted in session.execute(stmt):
+                compound_ids[cid] = compound_id
+                if inserted:
+                    new_cids.append(cid)
+        return compound_ids, new_cids
+
+    @staticmethod
+    def _assay_row(row: tuple, compound_id: int) -> tuple | None:
+        # row holds the AssayTable columns in ASSAY_FIELDS order
+        assay_id, assay_type, target_name, outcome, potency_type, potency_value, potency_unit, reference = row
+        if assay_id is None or assay_type is None:
+            return None
+        if outcome is not None and outcome not in ACTIVITY_OUTCOMES:
+            return None
+        return (
+            assay_id, compound_id, assay_type, target_name, outcome,
+            potency_type, potency_value, potency_unit, reference,
+        )
+
+    def _copy_assays(self, session, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        cursor = session.connection().connection.cursor()
+        if hasattr(cursor, "copy_expert"):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(["" if value is None else value for value in row])
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {Assays.__tablename__} ({', '.join(ASSAY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        else:
+            for batch in _batches(rows, 5000):
+                session.execute(pg_insert(Assays).values([dict(zip(ASSAY_COLUMNS, row)) for row in batch]))
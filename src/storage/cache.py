@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from src.core import settings
+
+CACHE_MODES = ("use", "bypass", "refresh")
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a content-addressed cache key from arbitrary parts.
+
+    Args:
+        *parts (Any): Values that fully determine the cached result.
+
+    Returns:
+        str: SHA-256 hex digest of the JSON-encoded parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SqliteCache:
+    """
+    Persistent key/value cache stored in a local SQLite file.
+
+    Values are stored as JSON. The file runs in WAL mode so it can be shared by
+    several threads and worker processes. Limits are enforced when the cache is
+    opened and again every `evict_every` writes, so a long run exceeds
+    `max_entries` by at most that many entries.
+
+    Args:
+        path (str | Path): SQLite file location.
+        table (str): Table name, one per logical cache.
+        max_entries (int | None): Keep at most this many entries (least recently used are evicted).
+        max_age_seconds (float | None): Entries older than this are treated as missing and evicted.
+        mode (str): "use" reads and writes, "refresh" only writes, "bypass" does neither.
+        evict_every (int): Writes between two evictions (0 evicts only on open).
+    """
+
+    def __init__(
+            self,
+            path: str | Path,
+            table: str,
+            max_entries: int | None = None,
+            max_age_seconds: float | None = None,
+            mode: str = "use",
+            evict_every: int = settings.CACHE_EVICT_EVERY_WRITES,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.path = Path(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.mode = mode
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._writes_since_evict = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        if self.mode != "bypass":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed ON {self.table}(accessed_at)")
+            self.evict()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, attr: str) -> None:
+        with self._stats_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key: str) -> Any | None:
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            Any | None: Cached value, or None on a miss (always None unless mode is "use").
+        """
+        if self.mode != "use":
+            return None
+        conn = self._connection()
+        row = conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.max_age_seconds is not None and now - row[1] > self.max_age_seconds):
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value under a key, replacing any previous entry.
+
+        Args:
+            key (str): Cache key.
+            value (Any): JSON-serializable value.
+
+        Returns:
+            None
+        """
+        if self.mode == "bypass":
+            return
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+        self._count("writes")
+        with self._stats_lock:
+            self._writes_since_evict += 1
+            due = self.evict_every > 0 and self._writes_since_evict >= self.evict_every
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+
+    def items(self):
+        """
+        Iterate over all unexpired entries, e.g. to build a vocabulary from the cache.
+
+        Yields:
+            tuple[str, Any]: Key and value.
+        """
+        if self.mode == "bypass":
+            return
+        query = f"SELECT key, value FROM {self.table}"
+        params = ()
+        if self.max_age_seconds is not None:
+            query += " WHERE created_at >= ?"
+            params = (time.time() - self.max_age_seconds,)
+        for key, value in self._connection().execute(query, params):
+            yield key, json.loads(value)
+
+    def evict(self) -> int:
+        """
+        Remove expired entries and trim the cache to `max_entries`.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        if self.mode == "bypass":
+            return 0
+        removed = 0
+        with self._connection() as conn:
+            if self.max_age_seconds is not None:
+                cur = conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,),
+                )
+                removed += cur.rowcount
+            if self.max_entries is not None:
+                cur = conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                removed += cur.rowcount
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss/write counters for this process.
+
+        Returns:
+            dict: Counters and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
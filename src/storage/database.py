@@ -1,12 +1,136 @@
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from src.core import settings
 
-sync_engine = create_engine(
-    url=settings.DATABASE_URL_psycopg,
-    echo=False
+_pool_counters: dict[str, dict[str, int]] = {}
+_pool_counters_lock = threading.Lock()
+_engines: dict[str, Engine] = {}
+
+
+def _track_pool(role: str, engine: Engine) -> None:
+    # Connections opened, checkouts, connections dropped by pre-ping and the checkout high-water mark
+    counters = {"connects": 0, "checkouts": 0, "invalidated": 0, "peak_checked_out": 0}
+    _pool_counters[role] = counters
+    _engines[role] = engine
+
+    def count(name: str) -> None:
+        with _pool_counters_lock:
+            counters[name] += 1
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        count("connects")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        count("checkouts")
+        with _pool_counters_lock:
+            counters["peak_checked_out"] = max(counters["peak_checked_out"], engine.pool.checkedout())
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        count("invalidated")
+
+
+def make_engine(role: str, pool_size: int, max_overflow: int, statement_timeout_ms: int) -> Engine:
+    """
+    Create a pooled engine for one workload.
+
+    Connections are checked with a ping before use and recycled after
+    DB_POOL_RECYCLE_SECONDS, so connections dropped by the server or a proxy
+    are replaced instead of failing the next statement.
+
+    Args:
+        role (str): Workload name, also reported as the PostgreSQL application_name.
+        pool_size (int): Connections kept open.
+        max_overflow (int): Extra connections opened under load.
+        statement_timeout_ms (int): Server-side statement timeout (0 disables it).
+
+    Returns:
+        Engine: SQLAlchemy engine.
+    """
+    engine = create_engine(
+        url=settings.DATABASE_URL_psycopg,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        connect_args={"options": f"-c statement_timeout={statement_timeout_ms}", "application_name": f"pubchem_{role}"},
+    )
+    _track_pool(role, engine)
+    return engine
+
+
+# Pipeline writes and interactive queries use separate pools, so a burst of
+# pipeline workers cannot starve the app of connections and vice versa
+ingest_engine = make_engine(
+    "ingest", settings.DB_INGEST_POOL_SIZE, settings.DB_INGEST_MAX_OVERFLOW, settings.DB_INGEST_STATEMENT_TIMEOUT_MS,
+)
+query_engine = make_engine(
+    "query", settings.DB_QUERY_POOL_SIZE, settings.DB_QUERY_MAX_OVERFLOW, settings.DB_QUERY_STATEMENT_TIMEOUT_MS,
 )
-session_local = sessionmaker(sync_engine)
+sync_engine = ingest_engine
+session_local = sessionmaker(ingest_engine)
+
+_async_engine = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """
+    Return the shared asyncpg engine of the query workload, creating it on first use.
+
+    asyncpg is only imported here, so sync code paths do not load it.
+
+    Returns:
+        AsyncEngine: SQLAlchemy async engine.
+    """
+    global _async_engine
+    with _async_lock:
+        if _async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            _async_engine = create_async_engine(
+                settings.DATABASE_URL_asyncpg,
+                echo=False,
+                pool_size=settings.DB_QUERY_POOL_SIZE,
+                max_overflow=settings.DB_QUERY_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+                pool_pre_ping=True,
+                connect_args={"server_settings": {
+                    "statement_timeout": str(settings.DB_QUERY_STATEMENT_TIMEOUT_MS),
+                    "application_name": "pubchem_async",
+                }},
+            )
+            _track_pool("async", _async_engine.sync_engine)
+        return _async_engine
+
+
+def pool_stats() -> dict:
+    """
+    Return the state and counters of every connection pool created so far.
+
+    Returns:
+        dict: Stats keyed by pool role.
+    """
+    stats = {}
+    with _pool_counters_lock:
+        for role, engine in _engines.items():
+            pool = engine.pool
+            stats[role] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                **_pool_counters[role],
+            }
+    return stats
+
 
 class Base(DeclarativeBase):
 
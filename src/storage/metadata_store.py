@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterator
+
+METADATA_FILE = "metadata.jsonl"
+LEGACY_METADATA_FILE = "metadata.json"
+
+
+class MetadataStore:
+    """
+    Append-only JSON Lines store of article metadata with lookup by PMID.
+
+    Only a PMID -> byte offset index is kept in memory; records are read from
+    disk on demand. If a PMID is appended twice, the latest record wins.
+
+    Args:
+        path (str | Path): JSON Lines file.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._offsets: dict[str, int] | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, directory: str | Path) -> "MetadataStore":
+        """
+        Open the store of an article directory, converting a legacy metadata.json once.
+
+        Args:
+            directory (str | Path): Article directory.
+
+        Returns:
+            MetadataStore: Store backed by `<directory>/metadata.jsonl`.
+        """
+        directory = Path(directory)
+        store = cls(directory / METADATA_FILE)
+        legacy = directory / LEGACY_METADATA_FILE
+        if not store.path.exists() and legacy.exists():
+            with open(legacy, "r", encoding="utf-8") as f:
+                for record in json.load(f):
+                    store.append(record)
+        return store
+
+    def _build_index(self) -> dict[str, int]:
+        offsets = {}
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                offset = f.tell()
+                for line in iter(f.readline, b""):
+                    if line.strip():
+                        try:
+                            offsets[json.loads(line)["PMID"]] = offset
+                        except (ValueError, KeyError):
+                            # A crash can leave a truncated last line behind
+                            pass
+                    offset = f.tell()
+        return offsets
+
+    @property
+    def _index(self) -> dict[str, int]:
+        if self._offsets is None:
+            self._offsets = self._build_index()
+        return self._offsets
+
+    def append(self, record: dict) -> None:
+        """
+        Append one record and make it durable immediately.
+
+        Args:
+            record (dict): Metadata record with a "PMID" key.
+
+        Returns:
+            None
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._offsets is not None:
+                self._offsets[record["PMID"]] = offset
+
+    def get(self, pmid: str) -> dict | None:
+        """
+        Look up a record by PMID.
+
+        Args:
+            pmid (str): PubMed ID.
+
+        Returns:
+            dict | None: Metadata record, or None if the PMID is unknown.
+        """
+        offset = self._index.get(pmid)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def __contains__(self, pmid: str) -> bool:
+        return pmid in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[dict]:
+        for pmid in self._index:
+            yield self.get(pmid)
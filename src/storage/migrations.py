@@ -0,0 +1,150 @@
+"""
+Versioned schema migrations for databases created before a model change.
+
+`Base.metadata.create_all` only creates missing tables, so indexes and
+constraints added to existing tables are applied here. Every migration runs
+once, in its own transaction, and is recorded in `schema_migrations`:
+
+    python -m src.storage.migrations [--status]
+"""
+import argparse
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from src.storage.database import sync_engine
+
+logger = logging.getLogger("pubchem_db")
+
+# (version, description, statements); statements must be idempotent because
+# create_all already builds the same indexes on a fresh database
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (
+        1,
+        "unique articles.pmid",
+        [
+            # Keep the newest copy of duplicated articles; compound links cascade
+            """
+            DELETE FROM articles a USING articles b
+            WHERE a.pmid = b.pmid AND a.id < b.id
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_articles_pmid ON articles (pmid)",
+        ],
+    ),
+    (
+        2,
+        "foreign key and filter indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_articles_disease_area ON articles (disease_area)",
+            "CREATE INDEX IF NOT EXISTS ix_compounds_name ON compounds (name)",
+            "CREATE INDEX IF NOT EXISTS ix_article_compound_article_id ON article_compound (article_id)",
+            "CREATE INDEX IF NOT EXISTS ix_assays_compound_id ON assays (compound_id)",
+            "CREATE INDEX IF NOT EXISTS ix_assays_target_name ON assays (target_name)",
+        ],
+    ),
+    (
+        3,
+        "partial indexes on active assay outcomes",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_assays_active_compound_id ON assays (compound_id) "
+            "WHERE activity_outcome = 'active'",
+            "CREATE INDEX IF NOT EXISTS ix_assays_active_target_name ON assays (target_name) "
+            "WHERE activity_outcome = 'active'",
+            "ANALYZE articles",
+            "ANALYZE article_compound",
+            "ANALYZE assays",
+        ],
+    ),
+    (
+        4,
+        "data version counter for result caches",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT TIMEZONE('utc', now())
+            )
+            """,
+            "INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+        ],
+    ),
+    (
+        5,
+        "drop per-stage ledger timestamps",
+        [
+            # Restarts only check db_done_at; intermediate results live in the text and NER caches
+            "ALTER TABLE processing_ledger DROP COLUMN IF EXISTS text_done_at",
+            "ALTER TABLE processing_ledger DROP COLUMN IF EXISTS ner_done_at",
+            "ALTER TABLE processing_ledger DROP COLUMN IF EXISTS pubchem_done_at",
+        ],
+    ),
+]
+
+
+def _ensure_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT TIMEZONE('utc', now())
+            )
+            """
+        ))
+
+
+def applied_versions(engine: Engine = sync_engine) -> set[int]:
+    """
+    Return the versions of the migrations already applied.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        set[int]: Applied versions.
+    """
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def migrate(engine: Engine = sync_engine) -> list[int]:
+    """
+    Apply pending migrations in version order.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        list[int]: Versions applied by this call.
+    """
+    done = applied_versions(engine)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": version, "description": description},
+            )
+        logger.info(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations without applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        done = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:4d}  {'applied' if version in done else 'pending':8s}  {description}")
+    else:
+        applied = migrate()
+        print(f"applied {applied}" if applied else "schema up to date")
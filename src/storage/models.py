@@ -1,5 +1,5 @@
 from typing import Annotated, Optional
-from sqlalchemy import ForeignKey,text
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import datetime
 import enum
@@ -12,6 +12,10 @@ str512 = Annotated[str, 512]
 
 class Articles(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ux_articles_pmid", "pmid", unique=True),
+        Index("ix_articles_disease_area", "disease_area"),
+    )
     id: Mapped[intpk]
     pmid: Mapped[Optional[str256]]
     doi: Mapped[Optional[str256]]
@@ -31,6 +35,9 @@ class Articles(Base):
 
 class Compounds(Base):
     __tablename__ = "compounds"
+    __table_args__ = (
+        Index("ix_compounds_name", "name"),
+    )
 
     id: Mapped[intpk]
     name: Mapped[str]
@@ -52,6 +59,10 @@ class Compounds(Base):
 
 class ArticleCompound(Base):
     __tablename__ = "article_compound"
+    # The primary key (compound_id, article_id) already serves lookups by compound
+    __table_args__ = (
+        Index("ix_article_compound_article_id", "article_id"),
+    )
     compound_id: Mapped[int] = mapped_column(
         ForeignKey("compounds.id", ondelete='CASCADE'),
         primary_key=True
@@ -71,6 +82,13 @@ class ActivityOutcome(enum.Enum):
 
 class Assays(Base):
     __tablename__ = "assays"
+    # activity_outcome has a handful of values, so only the selective "active" rows get their own indexes
+    __table_args__ = (
+        Index("ix_assays_compound_id", "compound_id"),
+        Index("ix_assays_target_name", "target_name"),
+        Index("ix_assays_active_compound_id", "compound_id", postgresql_where=text("activity_outcome = 'active'")),
+        Index("ix_assays_active_target_name", "target_name", postgresql_where=text("activity_outcome = 'active'")),
+    )
     id: Mapped[intpk]
     assay_id: Mapped[int]
     compound_id: Mapped[int] = mapped_column(ForeignKey("compounds.id", ondelete="CASCADE"))
@@ -87,3 +105,10 @@ class Assays(Base):
         back_populates="assays"
     )
 
+
+class ProcessingLedger(Base):
+    __tablename__ = "processing_ledger"
+    pmid: Mapped[str256] = mapped_column(primary_key=True)
+    pdf_hash: Mapped[str]
+    db_done_at: Mapped[Optional[datetime.datetime]]
+    updated_at: Mapped[created_at]
@@ -0,0 +1,477 @@
+"""
+Local, indexed mirror of PubChem dump files used as an offline enrichment source.
+
+Build or update it from the dump directory (only new or changed files are imported):
+
+    python -m src.storage.pubchem_mirror refresh --dump_dir data/pubchem_dumps [--download] [--known_cids]
+"""
+import argparse
+import csv
+import gzip
+import io
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+import requests
+from src.core import settings
+from src.schemas.compound_extraction import AssayTable
+
+logger = logging.getLogger("pubchem_db")
+
+# Default dumps on the PubChem FTP site (compound properties have no single dump file;
+# export them as CSV from PUG-REST or PubChem Download Service into the dump directory)
+DUMP_URLS = {
+    "CID-Synonym-filtered.gz": "https://ftp.ncbi.nlm.nih.gov/pubchem/Compound/Extras/CID-Synonym-filtered.gz",
+    "bioactivities.tsv.gz": "https://ftp.ncbi.nlm.nih.gov/pubchem/Bioassay/Extras/bioactivities.tsv.gz",
+    "bioassays.tsv.gz": "https://ftp.ncbi.nlm.nih.gov/pubchem/Bioassay/Extras/bioassays.tsv.gz",
+}
+
+# Header aliases per mirror column, covering both the FTP dumps and PUG-REST CSV exports
+PROPERTY_COLUMNS = {
+    "cid": ("CID",),
+    "molecular_formula": ("MolecularFormula",),
+    "molecular_weight": ("MolecularWeight",),
+    "logp": ("XLogP",),
+    "tpsa": ("TPSA",),
+    "h_bond_donor_count": ("HBondDonorCount",),
+    "h_bond_acceptor_count": ("HBondAcceptorCount",),
+}
+ASSAY_COLUMNS = {
+    "cid": ("CID",),
+    "aid": ("AID",),
+    "assay_type": ("Assay Type",),
+    "target_name": ("Target Accession", "Protein Accession", "Protein Accessions"),
+    "activity_outcome": ("Activity Outcome",),
+    "potency_type": ("Activity Name",),
+    "potency_value": ("Activity Value [uM]", "Activity Value"),
+    "reference": ("PubMed ID", "PMID"),
+}
+ASSAY_TYPE_COLUMNS = {
+    "aid": ("AID",),
+    "assay_type": ("Assay Type", "BioAssay Types", "Outcome Method"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, kind TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL,
+    rows INTEGER NOT NULL, imported_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS synonyms (name TEXT PRIMARY KEY, cid INTEGER NOT NULL, source TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS properties (
+    cid INTEGER PRIMARY KEY, molecular_formula TEXT, molecular_weight REAL, logp REAL, tpsa REAL,
+    h_bond_donor_count INTEGER, h_bond_acceptor_count INTEGER, source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assays (
+    cid INTEGER NOT NULL, aid INTEGER, assay_type TEXT, target_name TEXT, activity_outcome TEXT,
+    potency_type TEXT, potency_value REAL, reference TEXT, source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_assays_cid ON assays(cid);
+CREATE TABLE IF NOT EXISTS assay_types (aid INTEGER PRIMARY KEY, assay_type TEXT, source TEXT NOT NULL);
+"""
+
+
+def detect_kind(path: Path) -> str | None:
+    """
+    Guess what a dump file contains from its name.
+
+    Args:
+        path (Path): Dump file.
+
+    Returns:
+        str | None: "synonyms", "properties", "assays", "assay_types", or None for unknown files.
+    """
+    name = path.name.lower()
+    if "synonym" in name:
+        return "synonyms"
+    if "propert" in name:
+        return "properties"
+    if "bioactivit" in name or "assaysummary" in name:
+        return "assays"
+    if "bioassay" in name:
+        return "assay_types"
+    return None
+
+
+def _open_text(path: Path) -> io.TextIOBase:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def _delimiter(path: Path) -> str:
+    name = path.name.lower()
+    return "," if ".csv" in name else "\t"
+
+
+def _name_key(name: str) -> str:
+    # Same normalization as PubChemCache
+    return " ".join(name.split()).lower()
+
+
+def _number(value: str, cast=float):
+    try:
+        return cast(value) if value not in ("", None) else None
+    except ValueError:
+        return None
+
+
+def _batched(rows: Iterable[tuple], size: int = 50000) -> Iterator[list[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class PubChemMirror:
+    """
+    SQLite mirror of PubChem synonyms, compound properties and bioactivities, indexed by CID.
+
+    Args:
+        path (str | Path): SQLite file location.
+    """
+
+    def __init__(self, path: str | Path = settings.PUBCHEM_MIRROR_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ==== Import ====
+
+    def _rows(self, path: Path, kind: str, cids: set[int] | None) -> Iterator[tuple]:
+        source = path.name
+        with _open_text(path) as f:
+            delimiter = _delimiter(path)
+            # PubChem TSV dumps are unquoted; a stray quote in a synonym must not swallow the following lines
+            quoting = csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL
+            reader = csv.reader(f, delimiter=delimiter, quoting=quoting)
+            if kind == "synonyms":
+                # CID-Synonym files have no header: CID <tab> synonym
+                for cells in reader:
+                    if len(cells) < 2:
+                        continue
+                    cid = _number(cells[0], int)
+                    if cid is not None and (cids is None or cid in cids):
+                        yield _name_key(cells[1]), cid, source
+                return
+
+            columns = {"properties": PROPERTY_COLUMNS, "assays": ASSAY_COLUMNS, "assay_types": ASSAY_TYPE_COLUMNS}[kind]
+            header = next(reader, [])
+            positions = {}
+            for column, aliases in columns.items():
+                positions[column] = next((header.index(a) for a in aliases if a in header), None)
+            width = len(header)
+
+            def cell(cells, column):
+                i = positions[column]
+                return cells[i] if i is not None and i < len(cells) else ""
+
+            for cells in reader:
+                if len(cells) < width:
+                    cells.extend([""] * (width - len(cells)))
+                if kind == "assay_types":
+                    aid = _number(cell(cells, "aid"), int)
+                    if aid is not None:
+                        yield aid, cell(cells, "assay_type") or None, source
+                    continue
+                cid = _number(cell(cells, "cid"), int)
+                if cid is None or (cids is not None and cid not in cids):
+                    continue
+                if kind == "properties":
+                    yield (
+                        cid, cell(cells, "molecular_formula") or None, _number(cell(cells, "molecular_weight")),
+                        _number(cell(cells, "logp")), _number(cell(cells, "tpsa")),
+                        _number(cell(cells, "h_bond_donor_count"), int),
+                        _number(cell(cells, "h_bond_acceptor_count"), int), source,
+                    )
+                else:
+                    yield (
+                        cid, _number(cell(cells, "aid"), int), cell(cells, "assay_type") or None,
+                        cell(cells, "target_name") or None, cell(cells, "activity_outcome").lower() or None,
+                        cell(cells, "potency_type") or None, _number(cell(cells, "potency_value")),
+                        cell(cells, "reference") or None, source,
+                    )
+
+    def import_file(self, path: str | Path, kind: str | None = None, cids: set[int] | None = None) -> int:
+        """
+        Import one dump file, replacing the rows a previous version of it contributed.
+
+        Args:
+            path (str | Path): Dump file (plain or gzip, CSV or TSV).
+            kind (str | None): File kind; detected from the file name if omitted.
+            cids (set[int] | None): Only import rows of these CIDs.
+
+        Returns:
+            int: Number of imported rows.
+        """
+        path = Path(path)
+        kind = kind or detect_kind(path)
+        if kind is None:
+            raise ValueError(f"Cannot tell what {path.name} contains, pass kind explicitly")
+        statements = {
+            # CID-Synonym lists the preferred CID of a name first, so the first row wins
+            "synonyms": "INSERT OR IGNORE INTO synonyms VALUES (?, ?, ?)",
+            "properties": "INSERT OR REPLACE INTO properties VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            "assays": "INSERT INTO assays VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            "assay_types": "INSERT OR REPLACE INTO assay_types VALUES (?, ?, ?)",
+        }
+
+        conn = self._connection()
+        count = 0
+        with conn:
+            conn.execute(f"DELETE FROM {kind} WHERE source = ?", (path.name,))
+            for batch in _batched(self._rows(path, kind, cids)):
+                conn.executemany(statements[kind], batch)
+                count += len(batch)
+            stat = path.stat()
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)",
+                (path.name, kind, stat.st_size, stat.st_mtime, count, time.time()),
+            )
+        logger.info(f"Imported {count} {kind} rows from {path.name}")
+        return count
+
+    def refresh(self, dump_dir: str | Path, cids: set[int] | None = None) -> dict[str, int]:
+        """
+        Import every dump file that is new or changed since its last import.
+
+        Args:
+            dump_dir (str | Path): Directory with dump files.
+            cids (set[int] | None): Only import rows of these CIDs.
+
+        Returns:
+            dict[str, int]: Imported rows per file (unchanged files are left out).
+        """
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in self._connection().execute("SELECT path, size, mtime FROM sources")
+        }
+        imported = {}
+        for path in sorted(Path(dump_dir).iterdir()):
+            kind = detect_kind(path)
+            if kind is None or path.name.startswith("."):
+                continue
+            stat = path.stat()
+            if known.get(path.name) == (stat.st_size, stat.st_mtime):
+                continue
+            imported[path.name] = self.import_file(path, kind, cids)
+        return imported
+
+    # ==== Lookup ====
+
+    def get_cid(self, name: str) -> int | None:
+        """
+        Look up the CID of a compound name or synonym.
+
+        Args:
+            name (str): Compound name.
+
+        Returns:
+            int | None: CID, or None if the name is not in the mirror.
+        """
+        row = self._connection().execute("SELECT cid FROM synonyms WHERE name = ?", (_name_key(name),)).fetchone()
+        return row[0] if row else None
+
+    def synonyms(self, limit: int | None = None) -> Iterator[str]:
+        """
+        Iterate over the (normalized) names of the synonyms table.
+
+        Args:
+            limit (int | None): Stop after this many names.
+
+        Yields:
+            str: Compound name or synonym.
+        """
+        rows = self._connection().execute("SELECT name FROM synonyms LIMIT ?", (-1 if limit is None else limit,))
+        for (name,) in rows:
+            yield name
+
+    def has_cid(self, cid: int) -> bool:
+        """
+        Tell whether the mirror holds properties or bioactivities of a CID.
+
+        Args:
+            cid (int): PubChem Compound ID.
+
+        Returns:
+            bool: True if the CID is mirrored.
+        """
+        conn = self._connection()
+        return (
+            conn.execute("SELECT 1 FROM properties WHERE cid = ?", (cid,)).fetchone() is not None
+            or conn.execute("SELECT 1 FROM assays WHERE cid = ? LIMIT 1", (cid,)).fetchone() is not None
+        )
+
+    def get_properties(self, cids: list[int]) -> dict[int, dict]:
+        """
+        Look up raw properties of many CIDs.
+
+        Args:
+            cids (list[int]): PubChem Compound IDs.
+
+        Returns:
+            dict[int, dict]: Property columns keyed by CID, for CIDs present in the mirror.
+        """
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(cids), 500):
+            batch = cids[start:start + 500]
+            cursor = conn.execute(
+                "SELECT cid, molecular_formula, molecular_weight, logp, tpsa, h_bond_donor_count, "
+                f"h_bond_acceptor_count FROM properties WHERE cid IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for row in cursor:
+                found[row[0]] = dict(zip(PROPERTY_COLUMNS, row))
+        return found
+
+    def get_assays(self, cid: int, active_only: bool = False, max_rows: int = 0) -> AssayTable:
+        """
+        Read the bioactivities of a CID.
+
+        The assay type comes from the bioactivity row, or from the assay description
+        dump when the bioactivity dump has no type column.
+
+        Args:
+            cid (int): PubChem Compound ID.
+            active_only (bool): Keep only rows with activity outcome "active".
+            max_rows (int): Maximum number of rows (0 = no limit).
+
+        Returns:
+            AssayTable: Assay details, one list per column.
+        """
+        query = (
+            "SELECT a.aid, COALESCE(a.assay_type, t.assay_type), a.target_name, a.activity_outcome, "
+            "a.potency_type, a.potency_value, a.reference "
+            "FROM assays a LEFT JOIN assay_types t ON t.aid = a.aid WHERE a.cid = ?"
+        )
+        params: list = [cid]
+        if active_only:
+            query += " AND a.activity_outcome = 'active'"
+        if max_rows:
+            query += " LIMIT ?"
+            params.append(max_rows)
+
+        table = AssayTable()
+        for aid, assay_type, target, outcome, potency_type, value, reference in self._connection().execute(query, params):
+            table.assay_id.append(aid)
+            table.assay_type.append(assay_type)
+            table.target_name.append(target)
+            table.activity_outcome.append(outcome)
+            table.potency_type.append(potency_type)
+            table.potency_value.append(value)
+            table.potency_unit.append("uM" if value is not None else None)
+            table.reference.append(reference)
+        return table
+
+    def stats(self) -> dict:
+        """
+        Return row counts per table and the imported source files.
+
+        Returns:
+            dict: Stats.
+        """
+        conn = self._connection()
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("synonyms", "properties", "assays", "assay_types")
+        }
+        counts["sources"] = [row[0] for row in conn.execute("SELECT path FROM sources ORDER BY path")]
+        return counts
+
+
+_mirror: PubChemMirror | None = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror() -> PubChemMirror | None:
+    """
+    Return the shared mirror if PUBCHEM_SOURCE uses it.
+
+    Returns:
+        PubChemMirror | None: Mirror, or None when PUBCHEM_SOURCE is "online".
+    """
+    global _mirror
+    if settings.PUBCHEM_SOURCE == "online":
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = PubChemMirror()
+        return _mirror
+
+
+def download_dumps(dump_dir: Path, urls: dict[str, str] = DUMP_URLS) -> list[str]:
+    """
+    Download dump files that changed on the server since the local copy was written.
+
+    Args:
+        dump_dir (Path): Directory with dump files.
+        urls (dict[str, str]): File name -> URL.
+
+    Returns:
+        list[str]: Names of downloaded files.
+    """
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    downloaded = []
+    for name, url in urls.items():
+        target = dump_dir / name
+        headers = {}
+        if target.exists():
+            headers["If-Modified-Since"] = time.strftime(
+                "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(target.stat().st_mtime)
+            )
+        with requests.get(url, headers=headers, stream=True, timeout=60) as r:
+            if r.status_code == 304:
+                continue
+            r.raise_for_status()
+            tmp = target.with_name(f".{name}.part")
+            with open(tmp, "wb") as f:
+                for block in r.iter_content(settings.DOWNLOAD_CHUNK_BYTES):
+                    f.write(block)
+            os.replace(tmp, target)
+        downloaded.append(name)
+        logger.info(f"Downloaded {name}")
+    return downloaded
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    parser = argparse.ArgumentParser(description="Local PubChem mirror")
+    parser.add_argument("command", choices=["refresh", "stats"])
+    parser.add_argument("--dump_dir", type=Path, default=Path(settings.PUBCHEM_DUMP_DIR))
+    parser.add_argument("--download", action="store_true", help="Fetch changed dumps from the PubChem FTP site first")
+    parser.add_argument("--known_cids", action="store_true",
+                        help="Only import rows of CIDs already resolved in the PubChem cache")
+    args = parser.parse_args()
+
+    mirror = PubChemMirror()
+    if args.command == "refresh":
+        if args.download:
+            download_dumps(args.dump_dir)
+        cids = None
+        if args.known_cids:
+            from src.services.pubchem import PubChemCache
+            cids = {entry["cid"] for _, entry in PubChemCache().names.items() if entry["cid"] is not None}
+            logger.info(f"Restricting import to {len(cids)} known CIDs")
+        imported = mirror.refresh(args.dump_dir, cids)
+        logger.info(f"Refreshed {len(imported)} files: {imported}" if imported else "Mirror is up to date")
+    print(mirror.stats(), file=sys.stdout)
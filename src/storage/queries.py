@@ -1,12 +1,15 @@
-from src.storage.database import sync_engine, Base, session_local
-from src.storage.models import Articles, Compounds, ArticleCompound, Assays
+from src.storage.database import sync_engine, query_engine, Base, session_local
+from src.storage.migrations import migrate
+from src.storage.summaries import create_summaries, drop_summaries
+from src.storage.models import Articles, Compounds, ArticleCompound, Assays, ProcessingLedger
 from src.schemas.compound_extraction import ArticleRecord, CompoundInfo, Assay
-from sqlalchemy import select, insert
+from sqlalchemy import select, insert, func, text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from src.core import settings
 from dataclasses import asdict
 from sqlalchemy.exc import IntegrityError
 import logging
+import pandas as pd
 
 logging.basicConfig(
     level=settings.LOG_LEVEL,
@@ -18,18 +21,98 @@ logger = logging.getLogger("pubchem_db")
 
 class Queries:
     @staticmethod
-    def create_tables() -> None:
+    def create_tables(drop: bool = False) -> None:
         """
-        Drop and recreate all database tables.
+        Create missing database tables and summary views, optionally dropping everything first,
+        and apply pending migrations.
 
         Args:
-            None
+            drop (bool): Drop and recreate all tables, including the processing ledger.
 
         Returns:
             None
         """
-        Base.metadata.drop_all(sync_engine)
+        if drop:
+            drop_summaries(sync_engine)
+            Base.metadata.drop_all(sync_engine)
         Base.metadata.create_all(sync_engine)
+        migrate(sync_engine)
+        create_summaries(sync_engine)
+
+    @staticmethod
+    def run_sql(sql: str) -> pd.DataFrame:
+        """
+        Run a read-only SQL query on the query pool.
+
+        Args:
+            sql (str): SQL statement.
+
+        Returns:
+            pd.DataFrame: Query result.
+        """
+        with query_engine.connect() as conn:
+            # Driver-level execution: generated SQL may contain colons that are not bind parameters
+            result = conn.execution_options(no_parameters=True).exec_driver_sql(sql)
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    @staticmethod
+    def data_version() -> int:
+        """
+        Return the counter that is bumped whenever the pipeline changes stored data.
+
+        Returns:
+            int: Current data version.
+        """
+        with query_engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar() or 0
+
+    @staticmethod
+    def bump_data_version(session=None) -> None:
+        """
+        Increment the data version, invalidating cached query results.
+
+        Args:
+            session (Session | None): Session of the writing transaction; a new one is used if omitted.
+
+        Returns:
+            None
+        """
+        statement = text("UPDATE data_version SET version = version + 1, updated_at = TIMEZONE('utc', now()) WHERE id = 1")
+        if session is not None:
+            session.execute(statement)
+            return
+        with session_local() as session:
+            session.execute(statement)
+            session.commit()
+
+    @staticmethod
+    def start_ledger_entry(pmid: str, pdf_hash: str) -> bool:
+        """
+        Register an article in the processing ledger and tell whether it is already stored.
+
+        If the PDF content changed since the last run, the stored state is reset
+        and the article is processed again; the bulk writer replaces its rows.
+
+        Args:
+            pmid (str): PubMed ID.
+            pdf_hash (str): SHA-256 of the PDF file.
+
+        Returns:
+            bool: True if this PDF version is already stored.
+        """
+        with session_local() as session:
+            entry = session.get(ProcessingLedger, pmid)
+            if entry is None:
+                session.add(ProcessingLedger(pmid=pmid, pdf_hash=pdf_hash))
+                session.commit()
+                return False
+            if entry.pdf_hash != pdf_hash:
+                entry.pdf_hash = pdf_hash
+                entry.db_done_at = None
+                entry.updated_at = func.now()
+                session.commit()
+                return False
+            return entry.db_done_at is not None
 
     @staticmethod
     def insert_article(article: ArticleRecord) -> int:
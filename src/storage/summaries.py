@@ -0,0 +1,172 @@
+"""
+Materialized summary views for the aggregate questions asked in the Streamlit app.
+
+Each view is keyed by a unique index so that it can be refreshed CONCURRENTLY:
+PostgreSQL computes the new contents, diffs them against the old ones and
+applies only the changed rows while readers keep querying the view. The
+pipeline refreshes the views after every run that wrote articles.
+"""
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from src.storage.database import sync_engine
+
+logger = logging.getLogger("pubchem_db")
+
+# name -> (description, unique key columns, defining query)
+SUMMARY_VIEWS: dict[str, tuple[str, tuple[str, ...], str]] = {
+    "mv_compound_disease_activity": (
+        "One row per compound and disease area: articles mentioning the compound and its assay counts.",
+        ("compound_id", "disease_area"),
+        """
+        WITH assay_counts AS (
+            SELECT compound_id,
+                   count(*) AS total_assays,
+                   count(*) FILTER (WHERE activity_outcome = 'active') AS active_assays,
+                   count(DISTINCT target_name) FILTER (WHERE activity_outcome = 'active') AS active_targets
+            FROM assays
+            GROUP BY compound_id
+        )
+        SELECT c.id AS compound_id,
+               c.name AS compound_name,
+               c.pubchem_cid,
+               c.lipinski_pass,
+               COALESCE(ar.disease_area, 'unspecified') AS disease_area,
+               count(DISTINCT ar.id) AS article_count,
+               COALESCE(max(s.total_assays), 0) AS total_assays,
+               COALESCE(max(s.active_assays), 0) AS active_assays,
+               COALESCE(max(s.active_targets), 0) AS active_targets
+        FROM compounds c
+        JOIN article_compound ac ON ac.compound_id = c.id
+        JOIN articles ar ON ar.id = ac.article_id
+        LEFT JOIN assay_counts s ON s.compound_id = c.id
+        GROUP BY c.id, c.name, c.pubchem_cid, c.lipinski_pass, COALESCE(ar.disease_area, 'unspecified')
+        """,
+    ),
+    "mv_journal_lipinski": (
+        "One row per journal: articles, distinct compounds and their Lipinski rule-of-five pass rate.",
+        ("journal",),
+        """
+        SELECT COALESCE(ar.journal, 'unknown') AS journal,
+               count(DISTINCT ar.id) AS article_count,
+               count(DISTINCT c.id) AS compound_count,
+               count(DISTINCT c.id) FILTER (WHERE c.lipinski_pass) AS lipinski_pass_count,
+               round(
+                   count(DISTINCT c.id) FILTER (WHERE c.lipinski_pass)::numeric
+                   / NULLIF(count(DISTINCT c.id) FILTER (WHERE c.lipinski_pass IS NOT NULL), 0),
+                   4
+               ) AS lipinski_pass_rate
+        FROM articles ar
+        LEFT JOIN article_compound ac ON ac.article_id = ar.id
+        LEFT JOIN compounds c ON c.id = ac.compound_id
+        GROUP BY COALESCE(ar.journal, 'unknown')
+        """,
+    ),
+    "mv_target_activity": (
+        "One row per assay target: compounds tested, compounds active and assay counts.",
+        ("target_name",),
+        """
+        SELECT a.target_name,
+               count(DISTINCT a.compound_id) AS tested_compounds,
+               count(DISTINCT a.compound_id) FILTER (WHERE a.activity_outcome = 'active') AS active_compounds,
+               count(*) AS total_assays,
+               count(*) FILTER (WHERE a.activity_outcome = 'active') AS active_assays
+        FROM assays a
+        WHERE a.target_name IS NOT NULL
+        GROUP BY a.target_name
+        """,
+    ),
+    "mv_disease_area_summary": (
+        "One row per disease area: articles, distinct compounds, compounds with an active assay and Lipinski pass rate.",
+        ("disease_area",),
+        """
+        WITH active_compounds AS (
+            SELECT DISTINCT compound_id FROM assays WHERE activity_outcome = 'active'
+        )
+        SELECT COALESCE(ar.disease_area, 'unspecified') AS disease_area,
+               count(DISTINCT ar.id) AS article_count,
+               count(DISTINCT c.id) AS compound_count,
+               count(DISTINCT x.compound_id) AS active_compound_count,
+               round(
+                   count(DISTINCT c.id) FILTER (WHERE c.lipinski_pass)::numeric
+                   / NULLIF(count(DISTINCT c.id) FILTER (WHERE c.lipinski_pass IS NOT NULL), 0),
+                   4
+               ) AS lipinski_pass_rate
+        FROM articles ar
+        LEFT JOIN article_compound ac ON ac.article_id = ar.id
+        LEFT JOIN compounds c ON c.id = ac.compound_id
+        LEFT JOIN active_compounds x ON x.compound_id = c.id
+        GROUP BY COALESCE(ar.disease_area, 'unspecified')
+        """,
+    ),
+}
+
+
+def summary_ddl(name: str) -> str:
+    """
+    Return the CREATE statement of a summary view.
+
+    Args:
+        name (str): View name.
+
+    Returns:
+        str: CREATE MATERIALIZED VIEW statement.
+    """
+    query = SUMMARY_VIEWS[name][2]
+    return f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query.strip()}"
+
+
+def create_summaries(engine: Engine = sync_engine) -> None:
+    """
+    Create missing summary views and their unique indexes.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        None
+    """
+    with engine.begin() as conn:
+        for name, (_, key, _) in SUMMARY_VIEWS.items():
+            conn.execute(text(summary_ddl(name)))
+            description = SUMMARY_VIEWS[name][0].replace("'", "''")
+            conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {name} IS '{description}'"))
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name} ({', '.join(key)})"))
+
+
+def drop_summaries(engine: Engine = sync_engine) -> None:
+    """
+    Drop the summary views (they depend on the tables, which cannot be dropped while the views exist).
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        None
+    """
+    with engine.begin() as conn:
+        for name in SUMMARY_VIEWS:
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+
+
+def refresh_summaries(engine: Engine = sync_engine, concurrently: bool = True) -> dict[str, float]:
+    """
+    Recompute every summary view.
+
+    Args:
+        engine (Engine): Database engine.
+        concurrently (bool): Keep the views readable during the refresh.
+
+    Returns:
+        dict[str, float]: Refresh time in seconds per view.
+    """
+    timings = {}
+    mode = " CONCURRENTLY" if concurrently else ""
+    for name in SUMMARY_VIEWS:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW{mode} {name}"))
+        timings[name] = round(time.perf_counter() - start, 3)
+    logger.info(f"Refreshed summary views: {timings}")
+    return timings
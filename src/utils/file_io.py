@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 from pathlib import Path
 
@@ -15,3 +16,21 @@ def recreate_dir(path: str | Path) -> None:
     if path.exists():
         shutil.rmtree(path)
     path.mkdir(parents=True, exist_ok=True)
+
+
+def file_sha256(path: str | Path, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        path (str | Path): Path to the file.
+        block_size (int): Read size in bytes.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,6 +1,13 @@
+import gzip
+import os
+import re
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from PyPDF2 import PdfReader
-from typing import List
+from typing import Iterator, List
+from src.core import settings
+from src.utils.prompt import PROMPT_TEMPLATE
 
 
 def extract_text_from_pdf(pdf_path: Path) -> str:
@@ -19,21 +26,325 @@ def extract_text_from_pdf(pdf_path: Path) -> str:
             text.append(page_text)
     return "\n".join(text)
 
-def chunk_text(text:str, chunk_size:int=5000, overlap:int=250) -> List[str]:
+
+def text_cache_path(pdf_hash: str, cache_dir: Path = Path(settings.TEXT_CACHE_DIR)) -> Path:
+    """
+    Location of the cached text of a PDF.
+
+    Args:
+        pdf_hash (str): SHA-256 of the PDF file.
+        cache_dir (Path): Text cache directory.
+    Returns:
+        Path: Gzip-compressed text file.
+    """
+    return cache_dir / pdf_hash[:2] / f"{pdf_hash}.txt.gz"
+
+
+class _ExtractionTimeout(BaseException):
+    # BaseException so that PyPDF2's broad `except Exception` handlers do not swallow it
+    pass
+
+
+def _on_timeout(signum, frame):
+    raise _ExtractionTimeout
+
+
+def _extract_to_cache(pdf_path: Path, cache_path: Path, timeout: float) -> str:
+    """
+    Worker: extract text under a timeout and store it compressed.
+
+    Args:
+        pdf_path (Path): Path to PDF.
+        cache_path (Path): Where to store the compressed text.
+        timeout (float): Seconds before extraction is aborted.
+    Returns:
+        str: Text extracted from PDF.
+    """
+    # Workers are separate processes, so SIGALRM interrupts only this extraction
+    use_alarm = timeout > 0 and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        text = extract_text_from_pdf(pdf_path)
+    except _ExtractionTimeout:
+        raise TimeoutError(f"extraction exceeded {timeout}s")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text
+
+
+def read_cached_text(pdf_hash: str, cache_dir: Path = Path(settings.TEXT_CACHE_DIR)) -> str | None:
     """
-    Splits text into overlapping chunks for LLM processing.
+    Read the cached text of a PDF.
+
+    Args:
+        pdf_hash (str): SHA-256 of the PDF file.
+        cache_dir (Path): Text cache directory.
+    Returns:
+        str | None: Cached text, or None if the PDF was never parsed.
+    """
+    cache_path = text_cache_path(pdf_hash, cache_dir)
+    if not cache_path.exists():
+        return None
+    with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def extract_text_cached(
+        pdf_path: Path,
+        pdf_hash: str,
+        executor: ProcessPoolExecutor,
+        logger,
+        timeout: float = settings.PDF_TIMEOUT_SECONDS,
+        cache_dir: Path = Path(settings.TEXT_CACHE_DIR),
+) -> str | None:
+    """
+    Return the text of one PDF from the cache, or parse it in the given process pool.
+
+    Args:
+        pdf_path (Path): Path to PDF.
+        pdf_hash (str): SHA-256 of the PDF file.
+        executor (ProcessPoolExecutor): Pool running the extraction.
+        logger (logging.Logger): Logger.
+        timeout (float): Per-file timeout in seconds (0 disables it).
+        cache_dir (Path): Text cache directory.
+    Returns:
+        str | None: Text, or None if extraction failed or timed out.
+    """
+    text = read_cached_text(pdf_hash, cache_dir)
+    if text is not None:
+        return text
+    future = executor.submit(_extract_to_cache, pdf_path, text_cache_path(pdf_hash, cache_dir), timeout)
+    try:
+        return future.result()
+    except TimeoutError:
+        logger.error(f"Text extraction timed out after {timeout}s for {pdf_path.name}")
+    except Exception as e:
+        logger.error(f"Text extraction failed for {pdf_path.name}: {e}")
+    return None
+
+
+def extract_texts_parallel(
+        jobs: list[tuple[Path, str]],
+        logger,
+        workers: int = settings.PDF_WORKERS,
+        timeout: float = settings.PDF_TIMEOUT_SECONDS,
+        cache_dir: Path = Path(settings.TEXT_CACHE_DIR),
+) -> Iterator[tuple[Path, str | None]]:
+    """
+    Extract text of many PDFs in a process pool, reusing cached text.
+
+    Cached PDFs are yielded first, the rest in completion order as workers finish.
+
+    Args:
+        jobs (list[tuple[Path, str]]): (PDF path, SHA-256 of the file) pairs.
+        logger (logging.Logger): Logger.
+        workers (int): Number of worker processes.
+        timeout (float): Per-file timeout in seconds (0 disables it).
+        cache_dir (Path): Text cache directory.
+    Yields:
+        tuple[Path, str | None]: PDF path and its text, None if extraction failed or timed out.
+    """
+    to_parse = []
+    for pdf_path, pdf_hash in jobs:
+        text = read_cached_text(pdf_hash, cache_dir)
+        if text is not None:
+            yield pdf_path, text
+        else:
+            to_parse.append((pdf_path, text_cache_path(pdf_hash, cache_dir)))
+
+    if not to_parse:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_extract_to_cache, pdf_path, cache_path, timeout): pdf_path
+            for pdf_path, cache_path in to_parse
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                yield pdf_path, future.result()
+            except TimeoutError:
+                logger.error(f"Text extraction timed out after {timeout}s for {pdf_path.name}")
+                yield pdf_path, None
+            except Exception as e:
+                logger.error(f"Text extraction failed for {pdf_path.name}: {e}")
+                yield pdf_path, None
+
+
+# Rough average for English scientific text with Llama tokenizers
+CHARS_PER_TOKEN = 4
+
+SECTION_HEADINGS = (
+    "abstract", "introduction", "background", "materials and methods", "methods", "experimental",
+    "results", "results and discussion", "discussion", "conclusion", "conclusions",
+    "references", "bibliography", "literature cited", "acknowledgements", "acknowledgments",
+    "funding", "conflict of interest", "conflicts of interest", "competing interests",
+    "author contributions", "supplementary material", "supplementary materials",
+)
+BACK_MATTER_SECTIONS = {
+    "references", "bibliography", "literature cited", "acknowledgements", "acknowledgments",
+    "funding", "conflict of interest", "conflicts of interest", "competing interests", "author contributions",
+}
+
+_HEADING_RE = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+)?(" + "|".join(SECTION_HEADINGS) + r")\s*:?\s*$",
+    re.IGNORECASE,
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+_ABBREVIATIONS = ("e.g.", "i.e.", "et al.", "Fig.", "Figs.", "Eq.", "Ref.", "vs.", "approx.", "No.", "ca.")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens of a text.
+
+    Args:
+        text (str): Text.
+    Returns:
+        int: Estimated token count.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def chunk_token_budget() -> int:
+    """
+    Input tokens available for article text in one NER call.
+
+    The context window must hold the prompt template, the text and the
+    completion, so the budget is capped by what is left after the template
+    and PROMPT_MAX_TOKENS, and by NER_CHUNK_TOKENS.
+
+    Returns:
+        int: Token budget per chunk.
+    """
+    overhead = estimate_tokens(PROMPT_TEMPLATE.format(text=""))
+    available = settings.MODEL_CONTEXT_TOKENS - settings.PROMPT_MAX_TOKENS - overhead
+    return max(1, min(settings.NER_CHUNK_TOKENS, available))
+
+
+def split_sections(text: str) -> list[tuple[str | None, str]]:
+    """
+    Split text at recognised section headings.
+
+    Args:
+        text (str): Text extracted from PDF.
+    Returns:
+        list[tuple[str | None, str]]: (lower-cased heading, body) pairs; the
+        heading is None for text before the first heading.
+    """
+    sections = []
+    heading, lines = None, []
+    for line in text.splitlines():
+        match = _HEADING_RE.match(line)
+        if match:
+            sections.append((heading, "\n".join(lines)))
+            heading, lines = match.group(1).lower(), [line.strip()]
+        else:
+            lines.append(line)
+    sections.append((heading, "\n".join(lines)))
+    return [(h, body) for h, body in sections if body.strip()]
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Split text into sentences.
+
+    Line breaks are joined first; a line ending in a hyphen is joined without a
+    space so that names such as "5-fluorouracil" stay intact.
+
+    Args:
+        text (str): Text.
+    Returns:
+        list[str]: Sentences.
+    """
+    text = re.sub(r"-\s*\n\s*", "-", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    sentences = []
+    for piece in _SENTENCE_END_RE.split(text):
+        if sentences and sentences[-1].endswith(_ABBREVIATIONS):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return [s for s in sentences if s]
+
+
+def _split_long(sentence: str, max_chars: int) -> list[str]:
+    # Hard-wrap on whitespace for "sentences" (tables, run-on text) that exceed a whole chunk
+    parts = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        parts.append(sentence[:cut])
+        sentence = sentence[cut:].lstrip()
+    parts.append(sentence)
+    return parts
+
+
+def chunk_text(
+        text: str,
+        max_tokens: int | None = None,
+        overlap_tokens: int = settings.NER_CHUNK_OVERLAP_TOKENS,
+        drop_back_matter: bool = settings.CHUNK_DROP_BACK_MATTER,
+) -> List[str]:
+    """
+    Split text into chunks for LLM processing, sized by the model's token budget.
+
+    Chunks end on sentence boundaries. A section that does not fit in the current
+    chunk but fits in an empty one starts a new chunk, so sections are not cut
+    needlessly. Each chunk repeats the last sentences of the previous chunk, up
+    to `overlap_tokens`, when the previous chunk ended mid-section.
 
     Args:
         text (str): Text to chunk.
-        chunk_size (int, optional): Chunk size. Defaults to 5000.
-        overlap (int, optional): Overlap size. Defaults to 200.
+        max_tokens (int | None): Tokens per chunk. Defaults to `chunk_token_budget()`.
+        overlap_tokens (int): Tokens of trailing sentences repeated in the next chunk.
+        drop_back_matter (bool): Skip references, acknowledgements and similar sections.
     Returns:
         list: List of chunks.
     """
+    max_tokens = max_tokens or chunk_token_budget()
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
     chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
\ No newline at end of file
+    current: list[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append(" ".join(current))
+        current, size = [], 0
+
+    for heading, body in split_sections(text):
+        if drop_back_matter and heading in BACK_MATTER_SECTIONS:
+            continue
+        sentences = [part for s in split_sentences(body) for part in _split_long(s, max_chars)]
+        section_size = sum(len(s) + 1 for s in sentences)
+        if size and size + section_size > max_chars and section_size <= max_chars:
+            flush()
+
+        for sentence in sentences:
+            if size and size + len(sentence) + 1 > max_chars:
+                tail, tail_size = [], 0
+                for prev in reversed(current):
+                    if tail_size + len(prev) + 1 > overlap_tokens * CHARS_PER_TOKEN:
+                        break
+                    tail.insert(0, prev)
+                    tail_size += len(prev) + 1
+                flush()
+                current, size = tail, tail_size
+            current.append(sentence)
+            size += len(sentence) + 1
+
+    flush()
+    return chunks
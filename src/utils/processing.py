@@ -1,90 +1,218 @@
+import csv
+import json
 import re
+import threading
+import unicodedata
 import requests
-from typing import List
-from src.schemas.compound_extraction import Assay
+from src.core import settings
+from src.schemas.compound_extraction import AssayTable
+from src.utils.resilience import get_service
 
 BIOLOGIC_SUFFIXES = ("mab", "cept", "kinra")
 CYTOKINE_PREFIXES = ("IL-", "TNF-")
 STOPLIST = {"EGFR", "KRAS", "ctDNA", "mRNA", "DNA", "RNA"}
+SALT_FORMS = {
+    "hydrochloride", "dihydrochloride", "hcl", "hydrobromide", "sodium", "potassium", "calcium",
+    "magnesium", "mesylate", "mesilate", "besylate", "tosylate", "maleate", "tartrate", "citrate",
+    "sulfate", "sulphate", "phosphate", "acetate", "fumarate", "succinate", "bromide", "chloride",
+    "hydrate", "monohydrate", "dihydrate", "trihydrate",
+}
+# Bare ions: "sodium chloride" is a compound of its own, not a salt form of "sodium"
+ION_NAMES = {
+    "sodium", "potassium", "calcium", "magnesium", "lithium", "zinc", "ammonium", "chloride", "bromide",
+    "iodide", "fluoride", "sulfate", "sulphate", "phosphate", "acetate", "carbonate", "bicarbonate",
+    "nitrate", "hydroxide", "oxide",
+}
+GREEK_LETTERS = {
+    "α": "alpha", "β": "beta", "γ": "gamma", "δ": "delta", "ε": "epsilon",
+    "κ": "kappa", "λ": "lambda", "μ": "mu", "ω": "omega",
+}
+CONTEXT_MAX_LENGTH = 512
 
 
-def extract_json_block(raw_text: str) -> str:
+class ParseStats:
     """
-    Extract JSON block from raw text.
+    Thread-safe counters of how model output was parsed.
+
+    complete: valid JSON; recovered: truncated/malformed JSON from which complete
+    elements were salvaged; failed: nothing usable; followups: extra model calls
+    made to ask for what recovery could not salvage.
+    """
+
+    def __init__(self):
+        self.complete = 0
+        self.recovered = 0
+        self.failed = 0
+        self.followups = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        parsed = self.complete + self.recovered + self.failed
+        return {
+            "complete": self.complete,
+            "recovered": self.recovered,
+            "failed": self.failed,
+            "followups": self.followups,
+            "recovery_rate": self.recovered / parsed if parsed else 0.0,
+        }
+
+
+parse_stats = ParseStats()
+
+
+def _json_cut_points(text: str) -> list[tuple[int, tuple[str, ...]]]:
+    # Positions right after a closed object/array, with the brackets still open there
+    cuts = []
+    stack = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                break
+            cuts.append((i + 1, tuple(stack)))
+    return cuts
+
+
+def recover_json(raw_text: str, max_attempts: int = 20) -> tuple[dict | None, bool]:
+    """
+    Parse the first JSON object in model output, salvaging what is complete.
+
+    Trailing text after the object is ignored. If the object is truncated (e.g.
+    the answer hit maxTokens) or malformed, it is cut after the last complete
+    nested object or array and the open brackets are closed, so every complete
+    element of e.g. the "compounds" array is kept and only the partial one is lost.
+
     Args:
-        raw_text (str): Raw text.
+        raw_text (str): Raw model output.
+        max_attempts (int): Cut points tried, from the end, before giving up.
     Returns:
-        str: Extracted JSON block.
+        tuple[dict | None, bool]: Parsed object (None if nothing could be recovered)
+        and whether the output was complete.
     """
-    match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-    if match:
-        return match.group(0)
-    return raw_text
+    start = raw_text.find("{")
+    if start < 0:
+        return None, False
+    text = raw_text[start:]
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text)
+        if isinstance(value, dict):
+            return value, True
+    except ValueError:
+        pass
+
+    for cut, stack in reversed(_json_cut_points(text)[-max_attempts:]):
+        closing = "".join("}" if b == "{" else "]" for b in reversed(stack))
+        try:
+            value = json.loads(text[:cut] + closing)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value, False
+    return None, False
+
+
+def _cell(value: str) -> str | None:
+    return value or None
+
+
+def _float_cell(value: str) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
 
-def fetch_assays_for_cid(cid: int) -> list[Assay]:
+
+def _int_cell(value: str) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def fetch_assays_for_cid(
+        cid: int,
+        active_only: bool = settings.PUBCHEM_ASSAY_ACTIVE_ONLY,
+        max_rows: int = settings.PUBCHEM_ASSAY_MAX_ROWS,
+) -> AssayTable:
     """
-    Fetch assay summary data for a given PubChem Compound ID (CID).
+    Stream the assay summary of a PubChem Compound ID (CID) into column arrays.
+
+    The CSV form of the table is read line by line, so the raw response is never
+    held in memory; column positions are resolved once from the header.
+
+    PUG-REST cannot filter the assay summary on the server, so `active_only`
+    reduces memory and stored rows but not the payload. `max_rows` does cut the
+    transfer: the stream is closed once enough rows are kept.
 
     Args:
         cid (int): PubChem Compound ID.
+        active_only (bool): Keep only rows with activity outcome "active".
+        max_rows (int): Stop reading after this many kept rows (0 = no limit).
 
     Returns:
-        List[Assay]: A list of Assay objects containing assay details.
+        AssayTable: Assay details, one list per column.
     """
-    url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/assaysummary/JSON"
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    data = r.json()
-
-    table = data.get("Table", {})
-    columns = table.get("Columns", {}).get("Column", [])
-    rows = table.get("Row", [])
+    url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/assaysummary/CSV"
 
-    # Map column name → index
-    col_index = {col: i for i, col in enumerate(columns)}
-
-    assays: List[Assay] = []
-    for row in rows:
-        cells = row.get("Cell", [])
-
-        try:
-            assay_id = int(cells[col_index["AID"]])
-        except Exception:
-            assay_id = None
-
-        activity_outcome = cells[col_index.get("Activity Outcome", -1)] or None
-        assay_type = cells[col_index.get("Assay Type", -1)] or None
-        target_name = cells[col_index.get("Target Accession", -1)] or None
-        potency_type = cells[col_index.get("Activity Name", -1)] or None
-
-        potency_value = None
-        potency_unit = None
-        if "Activity Value [uM]" in col_index:
-            val = cells[col_index["Activity Value [uM]"]]
-            if val:
-                try:
-                    potency_value = float(val)
-                    potency_unit = "uM"
-                except ValueError:
-                    pass
-
-        reference = cells[col_index.get("PubMed ID", -1)] or None
-
-        assays.append(
-            Assay(
-                assay_id=assay_id,
-                assay_type=assay_type,
-                target_name=target_name,
-                activity_outcome=activity_outcome.lower(),
-                potency_type=potency_type,
-                potency_value=potency_value,
-                potency_unit=potency_unit,
-                reference=reference,
+    def request():
+        table = AssayTable()
+        with requests.get(url, stream=True, timeout=60) as r:
+            if r.status_code == 404:
+                # PubChem answers 404 for compounds without any assay data
+                return table
+            r.raise_for_status()
+            reader = csv.reader(r.iter_lines(decode_unicode=True))
+            header = next(reader, None)
+            if header is None:
+                return table
+            col = {name: i for i, name in enumerate(header)}
+            missing = len(header)
+            # Absent columns point at the padding cell after the last column and read as ""
+            aid, outcome, assay_type, target, activity, value, pmid = (
+                col.get(name, missing) for name in (
+                    "AID", "Activity Outcome", "Assay Type", "Target Accession",
+                    "Activity Name", "Activity Value [uM]", "PubMed ID",
+                )
             )
-        )
-
-    return assays
+            width = len(header) + 1
+            for cells in reader:
+                if len(cells) < width:
+                    cells.extend([""] * (width - len(cells)))
+                outcome_value = cells[outcome].lower() or None
+                if active_only and outcome_value != "active":
+                    continue
+                potency_value = _float_cell(cells[value])
+                table.assay_id.append(_int_cell(cells[aid]))
+                table.assay_type.append(_cell(cells[assay_type]))
+                table.target_name.append(_cell(cells[target]))
+                table.activity_outcome.append(outcome_value)
+                table.potency_type.append(_cell(cells[activity]))
+                table.potency_value.append(potency_value)
+                table.potency_unit.append("uM" if potency_value is not None else None)
+                table.reference.append(_cell(cells[pmid]))
+                if max_rows and len(table) >= max_rows:
+                    break
+        return table
 
+    return get_service("pubchem").call(request)
 
 
 def is_pubchem_candidate(name: str) -> bool:
@@ -110,4 +238,67 @@ def is_pubchem_candidate(name: str) -> bool:
     # Exclude broad classes
     if n.lower().endswith(("oids", "ines", "anes", "chemotherapy")):
         return False
-    return True
\ No newline at end of file
+    return True
+
+
+def _strip_salt(tokens: list[str]) -> list[str]:
+    # Hydrates always go; a counter-ion only when a parent name is left, never down to bare ions
+    while len(tokens) > 1 and tokens[-1] in SALT_FORMS:
+        parent = tokens[:-1]
+        only_ions = all(t in SALT_FORMS or t in ION_NAMES for t in parent)
+        if only_ions and ("hydrate" not in tokens[-1] or len(parent) == 1):
+            break
+        tokens = parent
+    return tokens
+
+
+def normalize_compound_name(name: str) -> str:
+    """
+    Canonicalize a compound name for deduplication.
+
+    Case, whitespace, dash variants, Greek letters and trailing salt/hydrate forms
+    are normalized, so "Imatinib  Mesylate" and "imatinib" map to the same key.
+
+    Args:
+        name (str): Compound name as returned by the model.
+
+    Returns:
+        str: Canonical key.
+    """
+    n = unicodedata.normalize("NFKC", name).lower()
+    for letter, spelled in GREEK_LETTERS.items():
+        n = n.replace(letter, spelled)
+    n = re.sub(r"[\u2010-\u2015\u2212]", "-", n)
+    return " ".join(_strip_salt(n.split()))
+
+
+def dedupe_compounds(compounds: list[dict]) -> list[dict]:
+    """
+    Merge compound mentions of one article into one candidate per distinct compound.
+
+    The first mention without a salt suffix (or the first mention) provides the
+    name; distinct contexts are joined in order of appearance.
+
+    Args:
+        compounds (list[dict]): Compound mentions with "name" and optional "context".
+
+    Returns:
+        list[dict]: One compound per canonical name, in order of first appearance.
+    """
+    merged: dict[str, dict] = {}
+    for comp in compounds:
+        name = comp["name"].strip()
+        key = normalize_compound_name(name)
+        if not key:
+            continue
+        entry = merged.setdefault(key, {"name": name, "contexts": []})
+        if entry["name"].lower().split()[-1] in SALT_FORMS and name.lower().split()[-1] not in SALT_FORMS:
+            entry["name"] = name
+        context = comp.get("context")
+        if context and context not in entry["contexts"]:
+            entry["contexts"].append(context)
+
+    return [
+        {"name": entry["name"], "context": "; ".join(entry["contexts"])[:CONTEXT_MAX_LENGTH] or None}
+        for entry in merged.values()
+    ]
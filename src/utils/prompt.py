@@ -42,4 +42,82 @@ PROMPT_TEMPLATE = """
     
     Text:
     {text}
-    """
\ No newline at end of file
+    """
+
+PACKED_PROMPT_TEMPLATE = """
+    You are a biomedical text mining assistant.
+    
+    The text below consists of {count} independent sections, each starting with a line "### SECTION <n>".
+    Process every section on its own, as if it were the only text you were given.
+    
+    Tasks, for each section:
+    1. Identify all chemical compounds that are recognized as **small molecules or drugs** suitable for lookup in PubChem.
+       - Only include compounds explicitly mentioned in that section.
+       - Include: small molecules, approved drugs, investigational drugs that are explicitly named.
+        - Exclude:
+          * Chemical elements (e.g., Boron, Radon)
+          * Proteins, cytokines, enzymes (e.g., KRAS, EGFR, TNF-α, IL-1β)
+          * Antibodies or biologics (e.g., names ending with -mab, -cept, -kinra; vaccines; ADCs; ProTACs)
+          * General classes/categories (e.g., flavonoids, alkaloids, steroids, "platinum-based chemotherapy")
+          * Genetic/molecular biomarkers (e.g., ctDNA, mRNA, DNA, RNA)
+        - Standardize names to PubChem‑accepted forms (e.g., “acetylsalicylic acid” → “Aspirin”).
+        - If no valid small molecules are present, return an empty list.
+    
+    2. **context**: For each compound, extract its context of use in the section.
+       - Use short descriptive phrases.
+       - Examples: "EGFR inhibitor", "lead candidate for Alzheimer’s", "control compound", "FDA-approved reference drug".
+       - If no context is provided in the text, omit the compound entirely. Do NOT output placeholders like "not mentioned".
+    
+    3. **disease area**: Identify the primary disease area or condition studied in the section.
+   - If no disease is clearly specified, return "unspecified".
+    
+    Output format:
+    Return JSON only, with no explanations or extra text, with one entry per section number.
+    
+    {{
+      "sections": {{
+        "1": {{
+          "compounds": [
+            {{
+              "name": "<compound_name>",
+              "context": "<short phrase describing role>"
+            }},
+            ...
+          ],
+          "disease_area": "<one of: oncology, neurology, infectious disease, cardiovascular, metabolic, other>"
+        }},
+        ...
+      }}
+    }}
+    
+    Text:
+    {text}
+    """
+
+
+FOLLOWUP_INSTRUCTIONS = """
+    Your previous answer for this text was cut off. These compounds were already extracted:
+    {found}
+    
+    Return only compounds that are NOT in this list, in the same JSON format, together with the disease area.
+    """
+
+COMBINED_ANSWER_PROMPT = """
+    The user asked: "{question}"
+    
+    It was answered with this PostgreSQL query:
+    {sql}
+    
+    The result is a pandas DataFrame `df` with columns and dtypes:
+    {dtypes}
+    
+    First rows of `df` (CSV):
+    {sample}
+    
+    Return a single JSON object with these keys and nothing else:
+    {{
+      "summary": "a brief summary of the result that answers the question",
+      "followup_questions": ["up to 5 follow-up questions that could be answered with SQL on the same database"],
+      "plotly_code": "Python code that builds a Plotly figure named `fig` from `df` (empty string if no chart fits)"
+    }}
+    """
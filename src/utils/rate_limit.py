@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to cap the request rate to a remote service.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens the bucket can hold (burst size).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Block until the requested number of tokens is available, then consume them.
+
+        Args:
+            tokens (float): Number of tokens to consume.
+
+        Returns:
+            None
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(key: str, rate: float, capacity: float) -> TokenBucket:
+    """
+    Return the shared token bucket for a key (e.g. a model ID), creating it on first use.
+
+    Args:
+        key (str): Bucket key.
+        rate (float): Tokens added per second.
+        capacity (float): Burst size.
+
+    Returns:
+        TokenBucket: Bucket shared by every caller using the same key.
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[key] = bucket
+        return bucket
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for coroutines sharing one event loop.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens the bucket can hold (burst size).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Wait until the requested number of tokens is available, then consume them.
+
+        Args:
+            tokens (float): Number of tokens to consume.
+
+        Returns:
+            None
+        """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
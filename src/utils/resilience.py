@@ -0,0 +1,489 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+from src.core import settings
+
+logger = logging.getLogger("pubchem_db")
+
+THROTTLE_STATUSES = {429, 503}
+TRANSIENT_STATUSES = {500, 502, 504, 408}
+# Error codes/class names are matched by name so that no client library has to be imported here
+THROTTLE_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException", "ServerBusy",
+}
+TRANSIENT_CODES = {
+    "ModelNotReadyException", "InternalServerException", "ModelTimeoutException",
+    "EndpointConnectionError", "ReadTimeoutError", "ConnectTimeoutError", "ConnectionClosedError",
+    "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError",
+    "TransportError", "TimeoutException", "NetworkError", "RemoteProtocolError",
+    "URLError", "TimeoutError", "IncompleteRead", "RemoteDisconnected",
+}
+
+
+class TransientError(Exception):
+    """
+    Raised by callers for responses that should be retried (e.g. HTTP 429 returned without raising).
+
+    Args:
+        message (str): Error message.
+        status (int | None): HTTP status code.
+        retry_after (float | None): Seconds the server asked us to wait.
+    """
+
+    def __init__(self, message: str, status: int | None = None, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the service while its circuit breaker is open."""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header (delta seconds or HTTP date).
+
+    Args:
+        value (str | None): Header value.
+
+    Returns:
+        float | None: Seconds to wait, or None if absent or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_response(response) -> None:
+    """
+    Raise TransientError for a throttled or failed HTTP response that was returned instead of raised.
+
+    Args:
+        response (requests.Response | httpx.Response): Response.
+
+    Returns:
+        None
+    """
+    if response.status_code in THROTTLE_STATUSES or response.status_code in TRANSIENT_STATUSES:
+        raise TransientError(
+            f"HTTP {response.status_code} for {response.url}",
+            status=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+
+def classify_error(exc: Exception) -> tuple[str, float | None]:
+    """
+    Classify an exception from a remote call.
+
+    Args:
+        exc (Exception): Raised exception.
+
+    Returns:
+        tuple[str, float | None]: "throttle", "transient" or "permanent", and the
+        server's Retry-After in seconds if it sent one.
+    """
+    if isinstance(exc, TransientError):
+        kind = "throttle" if exc.status in THROTTLE_STATUSES else "transient"
+        return kind, exc.retry_after
+
+    status, headers = None, {}
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        code = response.get("Error", {}).get("Code")
+        if code in THROTTLE_CODES:
+            return "throttle", None
+        if code in TRANSIENT_CODES:
+            return "transient", None
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    elif response is not None:
+        # requests / httpx HTTP errors
+        status = getattr(response, "status_code", None)
+        headers = getattr(response, "headers", {}) or {}
+    elif isinstance(getattr(exc, "code", None), int):
+        # urllib HTTPError (Entrez)
+        status, headers = exc.code, getattr(exc, "headers", {}) or {}
+
+    retry_after = parse_retry_after(headers.get("Retry-After")) if headers else None
+    if status in THROTTLE_STATUSES:
+        return "throttle", retry_after
+    if status in TRANSIENT_STATUSES:
+        return "transient", retry_after
+    if status is None and any(cls.__name__ in THROTTLE_CODES for cls in type(exc).__mro__):
+        return "throttle", None
+    if status is None and any(cls.__name__ in TRANSIENT_CODES for cls in type(exc).__mro__):
+        return "transient", None
+    return "permanent", None
+
+
+class AimdLimiter:
+    """
+    Concurrency limit that adapts to a service's sustainable load (additive increase, multiplicative decrease).
+
+    Every successful call raises the limit by 1/limit (about +1 per round of
+    calls); a throttled call multiplies it by `decrease`, at most once per
+    `cooldown_seconds` so that a burst of rejections counts as one signal.
+
+    Args:
+        max_limit (int): Upper bound, and starting value, of concurrent calls.
+        min_limit (int): Lower bound of concurrent calls.
+        decrease (float): Factor applied on throttling.
+        cooldown_seconds (float): Minimum time between two decreases.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease: float = 0.5, cooldown_seconds: float = 1.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease = decrease
+        self.cooldown_seconds = cooldown_seconds
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def _release(self, outcome: dict) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome["throttled"]:
+                if now - self._last_decrease >= self.cooldown_seconds:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif outcome["ok"]:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one concurrency slot for the duration of a call.
+
+        Yields:
+            dict: Outcome holder; set "throttled" or "ok" to True before leaving.
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        outcome = {"ok": False, "throttled": False}
+        try:
+            yield outcome
+        finally:
+            self._release(outcome)
+
+    @asynccontextmanager
+    async def async_slot(self, poll_seconds: float = 0.05):
+        """
+        Async variant of `slot`, sharing the same limit.
+
+        Waiting polls instead of blocking on the condition, so that the event
+        loop keeps running while the limit is reached.
+
+        Args:
+            poll_seconds (float): Delay between two attempts to take a slot.
+
+        Yields:
+            dict: Outcome holder; set "throttled" or "ok" to True before leaving.
+        """
+        while not self._try_acquire():
+            await asyncio.sleep(poll_seconds)
+        outcome = {"ok": False, "throttled": False}
+        try:
+            yield outcome
+        finally:
+            self._release(outcome)
+
+
+class CircuitBreaker:
+    """
+    Stop calling a service that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. After `reset_seconds` one trial call is let
+    through (half-open); its success closes the circuit, its failure reopens it.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_seconds (float): Time before a trial call is allowed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.opens = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> None:
+        """
+        Raise CircuitOpenError unless a call may go through now.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return
+        raise CircuitOpenError(f"circuit open, retrying after {self.reset_seconds:.0f}s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opens += 1
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ResilientService:
+    """
+    Retry, adaptive concurrency and circuit breaking for one remote service.
+
+    Throttling and transient errors are retried with full-jitter exponential
+    backoff, waiting at least as long as the server's Retry-After. Permanent
+    errors (e.g. 404, bad request) are raised immediately.
+
+    Args:
+        name (str): Service name used in logs and stats.
+        max_concurrency (int): Upper bound of the AIMD concurrency limit.
+        retries (int): Retries after the first attempt.
+        backoff_seconds (float): Base delay of the exponential backoff.
+        max_backoff_seconds (float): Cap of a single backoff delay.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_seconds (float): Time the circuit stays open.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_concurrency: int,
+            retries: int = settings.RETRY_ATTEMPTS,
+            backoff_seconds: float = settings.RETRY_BACKOFF_SECONDS,
+            max_backoff_seconds: float = settings.RETRY_MAX_BACKOFF_SECONDS,
+            failure_threshold: int = settings.BREAKER_FAILURES,
+            reset_seconds: float = settings.BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.limiter = AimdLimiter(max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.calls = 0
+        self.retried = 0
+        self.throttled = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, attr: str) -> None:
+        with self._stats_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Delay before retry number `attempt` (0-based).
+
+        Args:
+            attempt (int): Retry number.
+            retry_after (float | None): Server-requested delay.
+
+        Returns:
+            float: Seconds to sleep.
+        """
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _record(self, outcome: dict, error: Exception | None = None) -> tuple[str, float | None]:
+        """
+        Record the result of one attempt in the limiter outcome, breaker and counters.
+
+        Args:
+            outcome (dict): Outcome holder of the attempt's limiter slot.
+            error (Exception | None): Error raised by the attempt, None on success.
+
+        Returns:
+            tuple[str, float | None]: Error kind ("ok" on success) and Retry-After seconds.
+        """
+        if error is None:
+            kind, retry_after = "ok", None
+        else:
+            kind, retry_after = classify_error(error)
+        if kind in ("ok", "permanent"):
+            # A permanent error means the service answered, it just did not like the request
+            self.breaker.record_success()
+            outcome["ok"] = True
+            return kind, retry_after
+        outcome["throttled"] = kind == "throttle"
+        self.breaker.record_failure()
+        if kind == "throttle":
+            self._count("throttled")
+        return kind, retry_after
+
+    def _retry_delay(self, attempt: int, kind: str, error: Exception, retry_after: float | None) -> float:
+        delay = self.backoff(attempt, retry_after)
+        self._count("retried")
+        logger.debug(f"{self.name}: {kind} error ({error}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call `fn(*args, **kwargs)` under the service's retry, concurrency and breaker policy.
+
+        Args:
+            fn (Callable): Function performing one remote call.
+
+        Returns:
+            Any: Return value of `fn`.
+        """
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self.breaker.allow()
+            with self.limiter.slot() as outcome:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    kind, retry_after = self._record(outcome, e)
+                    if kind == "permanent":
+                        raise
+                    error = e
+                else:
+                    self._record(outcome)
+                    return result
+
+            if attempt == self.retries:
+                break
+            time.sleep(self._retry_delay(attempt, kind, error, retry_after))
+
+        self._count("failed")
+        raise error
+
+    async def call_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await `fn(*args, **kwargs)` under the same policy as `call`, without blocking the event loop.
+
+        Args:
+            fn (Callable): Coroutine function performing one remote call.
+
+        Returns:
+            Any: Result of `fn`.
+        """
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self.breaker.allow()
+            async with self.limiter.async_slot() as outcome:
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    kind, retry_after = self._record(outcome, e)
+                    if kind == "permanent":
+                        raise
+                    error = e
+                else:
+                    self._record(outcome)
+                    return result
+
+            if attempt == self.retries:
+                break
+            await asyncio.sleep(self._retry_delay(attempt, kind, error, retry_after))
+
+        self._count("failed")
+        raise error
+
+    def stats(self) -> dict:
+        """
+        Return call counters, the current concurrency limit and the breaker state.
+
+        Returns:
+            dict: Stats.
+        """
+        return {
+            "calls": self.calls,
+            "retried": self.retried,
+            "throttled": self.throttled,
+            "failed": self.failed,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "breaker": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+        }
+
+
+_services: dict[str, ResilientService] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(name: str, max_concurrency: int | None = None) -> ResilientService:
+    """
+    Return the shared resilience policy of a remote service, creating it on first use.
+
+    Known services: "bedrock", "pubchem", "entrez", "unpaywall"; PDF hosts are
+    registered as "pdf:<host>".
+
+    Args:
+        name (str): Service name.
+        max_concurrency (int | None): Concurrency bound used when the service is
+            created, defaults to settings.SERVICE_MAX_CONCURRENCY.
+
+    Returns:
+        ResilientService: Policy shared by every caller of the service.
+    """
+    with _services_lock:
+        service = _services.get(name)
+        if service is None:
+            if max_concurrency is None:
+                max_concurrency = settings.SERVICE_MAX_CONCURRENCY.get(name, 4)
+            service = ResilientService(name, max_concurrency)
+            _services[name] = service
+        return service
+
+
+def service_stats() -> dict:
+    """
+    Return stats of every service used so far.
+
+    Returns:
+        dict: Stats keyed by service name.
+    """
+    with _services_lock:
+        return {name: service.stats() for name, service in _services.items()}
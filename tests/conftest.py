@@ -0,0 +1,8 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings build the database URL at import time; the tests never connect
+for name, value in {"DB_USER": "test", "DB_PASS": "test", "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "test"}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,39 @@
+import logging
+import pytest
+from src.services import article_service
+from src.services.article_service import ArticleJob, build_pipeline
+from src.services.extraction_engine import ExtractionEngine
+
+logger = logging.getLogger("test")
+
+
+class FailingClient:
+    def converse(self, **kwargs):
+        raise ValueError("model unavailable")
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.articles = []
+
+    def add_article(self, article, enriched):
+        self.articles.append(article["pmid"])
+
+
+@pytest.mark.parametrize("pack", [False, True])
+def test_failed_model_call_does_not_store_article(tmp_path, monkeypatch, pack):
+    pdf_file = tmp_path / "1.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(article_service, "file_sha256", lambda path: "hash")
+    monkeypatch.setattr(article_service.Queries, "start_ledger_entry", staticmethod(lambda pmid, pdf_hash: False))
+    monkeypatch.setattr(article_service, "extract_text_cached", lambda *args: "Aspirin inhibits COX-1.")
+    writer = RecordingWriter()
+    engine = ExtractionEngine(FailingClient(), "model", logger, pack=pack, pack_wait_seconds=0.01)
+
+    with engine:
+        pipeline = build_pipeline({"1"}, None, engine, writer, None, logger)
+        metrics = pipeline.run([ArticleJob(pmid="1", meta={"PMID": "1"}, pdf_file=pdf_file)])
+
+    assert writer.articles == []
+    assert metrics["ner"]["errors"] == 1
+    assert metrics["persist"]["processed"] == 0
@@ -0,0 +1,44 @@
+import json
+import logging
+import pytest
+from src.services.batch_inference import BatchClient, LocalBatchClient, run_batch_extraction
+from src.storage.cache import SqliteCache
+
+logger = logging.getLogger("test")
+
+
+def test_batch_client_is_abstract():
+    with pytest.raises(TypeError):
+        BatchClient()
+
+
+def test_truncated_records_are_used_but_not_cached(tmp_path):
+    complete = json.dumps({"compounds": [{"name": "aspirin", "context": None}], "disease_area": "pain"})
+    truncated = '{"compounds": [{"name": "ibuprofen", "context": null}, {"name": "napro'
+    answers = {"first chunk": complete, "second chunk": truncated}
+    client = LocalBatchClient(lambda model_input: next(v for k, v in answers.items() if k in model_input["prompt"]))
+    cache = SqliteCache(tmp_path / "ner.sqlite", "ner")
+
+    results = run_batch_extraction(
+        {"article": ["first chunk", "second chunk"]}, client, "model", logger, work_dir=tmp_path, cache=cache,
+    )
+
+    assert results["article"][0]["compounds"][0]["name"] == "aspirin"
+    assert results["article"][1]["compounds"] == [{"name": "ibuprofen", "context": None}]
+    assert cache.stats()["writes"] == 1
+
+
+def test_articles_with_failed_records_are_left_out(tmp_path):
+    answer = json.dumps({"compounds": [{"name": "aspirin", "context": None}]})
+
+    def generate(model_input):
+        if "broken chunk" in model_input["prompt"]:
+            raise RuntimeError("model error")
+        return answer
+
+    results = run_batch_extraction(
+        {"good": ["good chunk"], "bad": ["good chunk", "broken chunk"]},
+        LocalBatchClient(generate), "model", logger, work_dir=tmp_path,
+    )
+
+    assert list(results) == ["good"]
@@ -0,0 +1,64 @@
+import pytest
+from src.storage import cache as cache_module
+from src.storage.cache import SqliteCache, make_key
+
+
+def test_make_key_is_content_addressed():
+    assert make_key("text", "model") == make_key("text", "model")
+    assert make_key("text", "model") != make_key("text", "other model")
+
+
+def test_use_mode_round_trip(tmp_path):
+    cache = SqliteCache(tmp_path / "c.sqlite", "t")
+    cache.set("k", {"a": [1, 2]})
+    assert cache.get("k") == {"a": [1, 2]}
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_refresh_mode_writes_without_reading(tmp_path):
+    SqliteCache(tmp_path / "c.sqlite", "t").set("k", "old")
+    refresh = SqliteCache(tmp_path / "c.sqlite", "t", mode="refresh")
+    assert refresh.get("k") is None
+    refresh.set("k", "new")
+    assert SqliteCache(tmp_path / "c.sqlite", "t").get("k") == "new"
+
+
+def test_bypass_mode_neither_reads_nor_writes(tmp_path):
+    bypass = SqliteCache(tmp_path / "c.sqlite", "t", mode="bypass")
+    bypass.set("k", "value")
+    assert bypass.get("k") is None
+    assert not (tmp_path / "c.sqlite").exists()
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SqliteCache(tmp_path / "c.sqlite", "t", mode="sometimes")
+
+
+def test_expired_entries_are_misses_and_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = SqliteCache(tmp_path / "c.sqlite", "t", max_age_seconds=60)
+    cache.set("k", "value")
+    now[0] += 61
+    assert cache.get("k") is None
+    assert list(cache.items()) == []
+    assert cache.evict() == 1
+
+
+def test_least_recently_used_entries_are_evicted_while_writing(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = SqliteCache(tmp_path / "c.sqlite", "t", max_entries=3, evict_every=1)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.set(key, key)
+    now[0] += 1
+    assert cache.get("a") == "a"
+    for key in ("d", "e"):
+        now[0] += 1
+        cache.set(key, key)
+
+    # Writes trim the cache without reopening it; "a" was used recently and stays
+    assert sorted(key for key, _ in cache.items()) == ["a", "d", "e"]
@@ -0,0 +1,26 @@
+import asyncio
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from src.services.downloader import PdfDownloader
+from src.utils.resilience import get_service
+
+
+def test_download_pdf_retries_through_the_host_service(tmp_path, monkeypatch):
+    service = get_service("pdf:pdf.test")
+    monkeypatch.setattr(service, "backoff", lambda attempt, retry_after=None: 0)
+    responses = [
+        httpx.Response(503, headers={"Retry-After": "0"}),
+        httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF-1.4"),
+    ]
+
+    async def run():
+        async with PdfDownloader("me@example.org", tmp_path) as downloader:
+            await downloader._client.aclose()
+            downloader._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+            return await downloader.download_pdf("https://pdf.test/a.pdf", "1")
+
+    assert asyncio.run(run())
+    assert (tmp_path / "1.pdf").read_bytes() == b"%PDF-1.4"
+    assert service.stats()["retried"] == 1
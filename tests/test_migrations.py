@@ -0,0 +1,46 @@
+from src.storage.migrations import MIGRATIONS, migrate
+
+
+class FakeConn:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.engine.statements.append(sql)
+        if sql.startswith("INSERT INTO schema_migrations"):
+            self.engine.applied.add(params["version"])
+        return self
+
+    def scalars(self):
+        return list(self.engine.applied)
+
+
+class FakeEngine:
+    def __init__(self, applied=()):
+        self.applied = set(applied)
+        self.statements = []
+
+    def begin(self):
+        return FakeConn(self)
+
+    def connect(self):
+        return FakeConn(self)
+
+
+def test_versions_are_unique_and_ordered():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+def test_migrate_applies_pending_versions_once():
+    engine = FakeEngine(applied={1, 2})
+    assert migrate(engine) == [version for version, _, _ in MIGRATIONS if version > 2]
+    assert not any("ux_articles_pmid" in statement for statement in engine.statements)
+    assert migrate(engine) == []
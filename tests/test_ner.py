@@ -0,0 +1,72 @@
+import json
+import logging
+from src.services.ner import extract_compounds_and_context, extract_packed, split_packed_output
+from src.storage.cache import SqliteCache
+
+logger = logging.getLogger("test")
+
+
+class FakeClient:
+    """Returns the queued answers in order and records the prompts."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def converse(self, modelId, messages, inferenceConfig):
+        self.prompts.append(messages[0]["content"][0]["text"])
+        return {"output": {"message": {"content": [{"text": self.answers.pop(0)}]}}}
+
+
+def section(*names):
+    return {"compounds": [{"name": n, "context": None} for n in names], "disease_area": "oncology"}
+
+
+def test_split_packed_output_fills_missing_sections():
+    parsed = {"sections": {"1": section("a"), "3": section("c")}}
+    assert split_packed_output(parsed, 3) == [section("a"), {}, section("c")]
+
+
+def test_complete_packed_answer():
+    answer = json.dumps({"sections": {"1": section("a"), "2": section("b")}})
+    results, complete = extract_packed(["one", "two"], FakeClient(answer), "model", logger)
+    assert results == [section("a"), section("b")]
+    assert complete == [True, True]
+
+
+def test_truncated_section_is_asked_again():
+    full = json.dumps({"sections": {"1": section("a"), "2": section("b1", "b2"), "3": section("c")}})
+    # Cut inside the second compound of section 2: recovery keeps section 2 with "b1" only
+    truncated = full[:full.index('"b2"') + 3]
+    follow_up = json.dumps({"sections": {"1": section("b1", "b2"), "2": section("c")}})
+    client = FakeClient(truncated, follow_up)
+
+    results, complete = extract_packed(["one", "two", "three"], client, "model", logger)
+
+    assert results == [section("a"), section("b1", "b2"), section("c")]
+    assert complete == [True, True, True]
+    assert "### SECTION 1\ntwo" in client.prompts[1]
+    assert "### SECTION 2\nthree" in client.prompts[1]
+
+
+def test_truncated_section_without_follow_up_is_incomplete():
+    full = json.dumps({"sections": {"1": section("a"), "2": section("b1", "b2")}})
+    truncated = full[:full.index('"b2"') + 3]
+    results, complete = extract_packed(["one", "two"], FakeClient(truncated), "model", logger, follow_up=False)
+    assert results[1]["compounds"] == [{"name": "b1", "context": None}]
+    assert complete == [True, False]
+
+
+def test_incomplete_answer_is_not_cached(tmp_path):
+    cache = SqliteCache(tmp_path / "ner.sqlite", "ner")
+    full = json.dumps(section("a", "b"))
+    truncated = full[:full.index('"b"') + 2]
+    client = FakeClient(truncated, truncated)
+
+    parsed = extract_compounds_and_context("text", client, "model", logger, cache=cache)
+
+    assert parsed["compounds"] == [{"name": "a", "context": None}]
+    assert len(client.prompts) == 2
+    client.answers = [full]
+    assert extract_compounds_and_context("text", client, "model", logger, cache=cache) == section("a", "b")
+    assert extract_compounds_and_context("text", FakeClient(), "model", logger, cache=cache) == section("a", "b")
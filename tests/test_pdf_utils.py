@@ -0,0 +1,37 @@
+from src.utils.pdf_utils import CHARS_PER_TOKEN, chunk_text, split_sections, split_sentences
+
+
+def sentences(prefix, count, words=8):
+    return " ".join(f"{prefix.capitalize()} sentence {i} " + "word " * words + "end." for i in range(count))
+
+
+def test_split_sentences_keeps_hyphenated_names():
+    assert split_sentences("Cells were treated with 5-\nfluorouracil. Viability fell.") == [
+        "Cells were treated with 5-fluorouracil.", "Viability fell.",
+    ]
+
+
+def test_split_sections_lowercases_headings():
+    text = "Title\nAbstract\nShort summary.\n2. Methods\nWe did things."
+    assert [heading for heading, _ in split_sections(text)] == [None, "abstract", "methods"]
+
+
+def test_chunks_respect_budget_and_drop_back_matter():
+    text = f"Introduction\n{sentences('intro', 30)}\nReferences\n{sentences('ref', 30)}"
+    chunks = chunk_text(text, max_tokens=100, overlap_tokens=0, drop_back_matter=True)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 * CHARS_PER_TOKEN for chunk in chunks)
+    assert not any("Ref sentence" in chunk for chunk in chunks)
+
+
+def test_section_that_fits_starts_a_new_chunk():
+    text = f"Introduction\n{sentences('intro', 3)}\nMethods\n{sentences('methods', 5)}"
+    chunks = chunk_text(text, max_tokens=60, overlap_tokens=0, drop_back_matter=False)
+    assert chunks[0].startswith("Introduction") and "Methods" not in chunks[0]
+    assert chunks[1].startswith("Methods")
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = chunk_text(sentences("intro", 40), max_tokens=100, overlap_tokens=20, drop_back_matter=False)
+    last_sentence = split_sentences(chunks[0])[-1]
+    assert chunks[1].startswith(last_sentence)
@@ -0,0 +1,44 @@
+import pytest
+from src.services.prefilter import ChemicalPrefilter, build_prefilter
+from src.storage.pubchem_mirror import PubChemMirror
+
+
+@pytest.mark.parametrize("text", [
+    "Patients received imatinib for twelve months.",
+    "The inhibitor AZD9291 was well tolerated.",
+    "A 4-methylpiperazin-1-yl derivative was synthesized.",
+])
+def test_regexes_find_candidates(text):
+    assert ChemicalPrefilter().has_candidates(text)
+
+
+def test_vocabulary_finds_multi_word_names():
+    prefilter = ChemicalPrefilter(["acetylsalicylic acid"])
+    assert prefilter.find_candidates("Doses of Acetylsalicylic  acid were low.") == ["acetylsalicylic acid"]
+
+
+def test_chunks_without_candidates_are_skipped():
+    prefilter = ChemicalPrefilter(["aspirin"])
+    assert not prefilter.has_candidates("We thank the patients and the EGFR study group.")
+    assert prefilter.has_candidates("Aspirin was given daily.")
+    assert prefilter.stats()["skipped"] == 1
+
+
+def test_small_vocabulary_keeps_every_chunk():
+    prefilter = ChemicalPrefilter(["aspirin"], min_vocabulary=2)
+    assert not prefilter.enabled
+    assert prefilter.has_candidates("Metformin was given daily.")
+    assert prefilter.stats()["skipped"] == 0
+
+
+def test_vocabulary_is_seeded_from_mirror_synonyms(tmp_path):
+    dump = tmp_path / "CID-Synonym-filtered"
+    dump.write_text("2244\taspirin\n4091\tmetformin\n2767\tcisplatin\n")
+    mirror = PubChemMirror(tmp_path / "mirror.sqlite")
+    mirror.import_file(dump)
+
+    prefilter = build_prefilter(mirror=mirror, min_vocabulary=3)
+
+    assert prefilter.enabled
+    assert prefilter.has_candidates("Patients on metformin were excluded.")
+    assert not prefilter.has_candidates("We thank the study nurses.")
@@ -0,0 +1,42 @@
+import pytest
+from src.utils.processing import dedupe_compounds, normalize_compound_name, recover_json
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Imatinib  Mesylate", "imatinib"),
+    ("Metformin HCl", "metformin"),
+    ("atorvastatin calcium", "atorvastatin"),
+    ("β-carotene", "beta-carotene"),
+    ("Sodium chloride", "sodium chloride"),
+    ("Calcium phosphate", "calcium phosphate"),
+    ("calcium chloride dihydrate", "calcium chloride"),
+])
+def test_normalize_compound_name(name, expected):
+    assert normalize_compound_name(name) == expected
+
+
+def test_dedupe_merges_salt_forms():
+    compounds = dedupe_compounds([
+        {"name": "imatinib mesylate", "context": "a"},
+        {"name": "Imatinib", "context": "b"},
+    ])
+    assert compounds == [{"name": "Imatinib", "context": "a; b"}]
+
+
+def test_dedupe_keeps_inorganic_salts_apart():
+    names = ["Sodium chloride", "Sodium sulfate", "Calcium phosphate", "Calcium chloride"]
+    compounds = dedupe_compounds([{"name": name} for name in names])
+    assert [c["name"] for c in compounds] == names
+
+
+def test_recover_json_complete_with_trailing_text():
+    assert recover_json('Here it is: {"a": [1, 2]} done') == ({"a": [1, 2]}, True)
+
+
+def test_recover_json_keeps_complete_elements_of_truncated_output():
+    raw = '{"compounds": [{"name": "a"}, {"name": "b"}, {"name": "c'
+    assert recover_json(raw) == ({"compounds": [{"name": "a"}, {"name": "b"}]}, False)
+
+
+def test_recover_json_without_object():
+    assert recover_json("no json here") == (None, False)
@@ -0,0 +1,51 @@
+import logging
+import pytest
+from src.core import settings
+from src.services import pubchem
+from src.storage.pubchem_mirror import PubChemMirror
+
+logger = logging.getLogger("test")
+
+
+@pytest.fixture
+def assay_only_mirror(tmp_path, monkeypatch):
+    dump = tmp_path / "bioactivities.tsv"
+    dump.write_text("CID\tAID\tActivity Outcome\tTarget Accession\n2244\t1\tActive\tCOX-1\n")
+    mirror = PubChemMirror(tmp_path / "mirror.sqlite")
+    mirror.import_file(dump, kind="assays")
+    monkeypatch.setattr(pubchem, "get_mirror", lambda: mirror)
+    return mirror
+
+
+def test_local_compound_fetches_missing_properties(assay_only_mirror, monkeypatch):
+    monkeypatch.setattr(settings, "PUBCHEM_SOURCE", "mirror_first")
+    monkeypatch.setattr(pubchem, "fetch_properties", lambda cids: {
+        2244: {"pubchem_cid": 2244, "molecular_formula": "C9H8O4", "molecular_weight": 180.16,
+               "logp": 1.2, "tpsa": 63.6, "lipinski_pass": True},
+    })
+    properties, assays = pubchem.local_compound(2244)
+    assert properties["molecular_formula"] == "C9H8O4"
+    assert len(assays) == 1
+
+
+def test_local_compound_mirror_only_keeps_empty_properties(assay_only_mirror, monkeypatch):
+    monkeypatch.setattr(settings, "PUBCHEM_SOURCE", "mirror")
+    monkeypatch.setattr(pubchem, "fetch_properties", lambda cids: pytest.fail("no remote call in mirror mode"))
+    properties, _ = pubchem.local_compound(2244)
+    assert properties["pubchem_cid"] == 2244
+    assert properties["molecular_formula"] is None
+
+
+def test_fetch_pubchem_batch_raises_lookup_errors(monkeypatch):
+    monkeypatch.setattr(settings, "PUBCHEM_SOURCE", "mirror_first")
+    monkeypatch.setattr(pubchem, "get_mirror", lambda: None)
+
+    def resolve_cid(name):
+        if name == "aspirin":
+            raise ConnectionError("PubChem unreachable")
+        return None
+
+    monkeypatch.setattr(pubchem, "resolve_cid", resolve_cid)
+    assert pubchem.fetch_pubchem_batch(["unknown name"], "1.pdf", logger) == {}
+    with pytest.raises(ConnectionError):
+        pubchem.fetch_pubchem_batch(["unknown name", "aspirin"], "1.pdf", logger)
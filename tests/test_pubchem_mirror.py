@@ -0,0 +1,12 @@
+from src.storage.pubchem_mirror import PubChemMirror
+
+
+def test_synonyms_keep_first_cid_and_ignore_quotes(tmp_path):
+    dump = tmp_path / "CID-Synonym-filtered"
+    dump.write_text('2244\taspirin\n2244\t"Aspirin" tablets\n1983\tacetaminophen\n9999\taspirin\n')
+    mirror = PubChemMirror(tmp_path / "mirror.sqlite")
+
+    assert mirror.import_file(dump) == 4
+    assert mirror.get_cid("Aspirin") == 2244
+    assert mirror.get_cid('"aspirin" tablets') == 2244
+    assert mirror.get_cid("acetaminophen") == 1983
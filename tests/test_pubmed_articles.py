@@ -0,0 +1,27 @@
+from src.services import pubmed_articles
+from src.storage.metadata_store import MetadataStore
+
+
+def test_collection_keeps_earlier_articles_and_skips_them(tmp_path, monkeypatch):
+    store = MetadataStore.open(tmp_path)
+    store.append({"PMID": "1", "DOI": "10.1/a", "pdf_url": "https://example.org/1.pdf"})
+    (tmp_path / "1.pdf").write_bytes(b"%PDF-1.4")
+    requested = []
+
+    async def fake_collect(articles, email, output_dir, store):
+        requested.extend(a["PMID"] for a in articles)
+        for article in articles:
+            (output_dir / f"{article['PMID']}.pdf").write_bytes(b"%PDF-1.4")
+            store.append(article)
+        return len(articles)
+
+    monkeypatch.setattr(pubmed_articles, "search_articles", lambda query, email, retmax: iter([
+        {"PMID": "1", "DOI": "10.1/a"}, {"PMID": "2", "DOI": "10.1/b"},
+    ]))
+    monkeypatch.setattr(pubmed_articles, "collect_pdfs", fake_collect)
+
+    pubmed_articles.article_collection("query", "a@b.c", output_dir=str(tmp_path), retmax=2)
+
+    assert requested == ["2"]
+    assert (tmp_path / "1.pdf").exists()
+    assert MetadataStore.open(tmp_path).get("1")["pdf_url"] == "https://example.org/1.pdf"
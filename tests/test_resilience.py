@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from src.utils.resilience import (
+    AimdLimiter, CircuitBreaker, CircuitOpenError, ResilientService, TransientError, classify_error,
+)
+
+
+def test_aimd_limiter_halves_on_throttle_and_grows_back():
+    limiter = AimdLimiter(max_limit=8, cooldown_seconds=0)
+    with limiter.slot() as outcome:
+        outcome["throttled"] = True
+    assert limiter.limit == 4
+    for _ in range(10):
+        with limiter.slot() as outcome:
+            outcome["ok"] = True
+    assert 4 < limiter.limit <= 8
+
+
+def test_aimd_limiter_counts_a_burst_of_throttles_once():
+    limiter = AimdLimiter(max_limit=8, cooldown_seconds=60)
+    for _ in range(3):
+        with limiter.slot() as outcome:
+            outcome["throttled"] = True
+    assert limiter.limit == 4
+
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.utils.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    breaker.record_failure()
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    now[0] = 11
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        # Only one trial call while half-open
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_classify_error():
+    assert classify_error(TransientError("slow down", status=429, retry_after=2)) == ("throttle", 2)
+    assert classify_error(TransientError("bad gateway", status=502)) == ("transient", None)
+    assert classify_error(ValueError("bad input")) == ("permanent", None)
+
+
+def test_service_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr("src.utils.resilience.time.sleep", lambda seconds: None)
+    service = ResilientService("test", max_concurrency=2, retries=2, failure_threshold=10)
+    answers = [TransientError("busy", status=503), "ok"]
+
+    def call():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert service.call(call) == "ok"
+    assert service.retried == 1
+
+
+def test_service_raises_permanent_errors_at_once():
+    service = ResilientService("test", max_concurrency=2, retries=2)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        service.call(call)
+    assert len(calls) == 1
+
+
+def test_service_call_async_retries_and_shares_the_limiter(monkeypatch):
+    service = ResilientService("test", max_concurrency=1, retries=2, failure_threshold=10)
+    monkeypatch.setattr(service, "backoff", lambda attempt, retry_after=None: 0)
+    answers = [TransientError("slow down", status=429), "ok"]
+
+    async def call():
+        assert service.limiter.in_flight == 1
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert asyncio.run(service.call_async(call)) == "ok"
+    assert (service.calls, service.retried, service.throttled) == (1, 1, 1)
+    assert service.limiter.in_flight == 0
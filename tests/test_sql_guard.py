@@ -0,0 +1,121 @@
+import datetime
+import decimal
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src.api import sql_guard
+from src.api.sql_guard import SqlGuard, SqlGuardError, guard_sql, normalize_sql
+from src.storage.cache import SqliteCache
+
+
+class FakeResult:
+    def __init__(self, rows, columns=("value",)):
+        self.rows = rows
+        self.columns = list(columns)
+
+    def scalar(self):
+        return self.rows[0][0]
+
+    def fetchmany(self, size):
+        return self.rows[:size]
+
+    def keys(self):
+        return self.columns
+
+
+class FakeConn:
+    """Answers EXPLAIN with the plan registered for the statement and records what ran."""
+
+    def __init__(self, plans, rows=()):
+        self.plans = plans
+        self.rows = list(rows)
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execution_options(self, **options):
+        return self
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+        if statement.startswith("EXPLAIN (FORMAT JSON) "):
+            cost, rows = self.plans[statement.removeprefix("EXPLAIN (FORMAT JSON) ")]
+            return FakeResult([([{"Plan": {"Total Cost": cost, "Plan Rows": rows}}],)])
+        return FakeResult(self.rows, columns=("day", "value"))
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+
+    def begin(self):
+        return self
+
+    def rollback(self):
+        pass
+
+
+class FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def connect(self):
+        return self.conn
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("  SELECT 1;  ", "SELECT 1"),
+    ("with t as (select 1) select * from t;;", "with t as (select 1) select * from t"),
+    ("SELECT 'a;b' AS x", "SELECT 'a;b' AS x"),
+])
+def test_normalize_sql(sql, expected):
+    assert normalize_sql(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM articles",
+    "SELECT 1; DROP TABLE articles",
+    "explain analyze select 1",
+])
+def test_normalize_sql_rejects(sql):
+    with pytest.raises(SqlGuardError):
+        normalize_sql(sql)
+
+
+def test_guard_sql_keeps_cheap_query():
+    conn = FakeConn({"SELECT 1": (10, 1)})
+    assert guard_sql(conn, "SELECT 1", row_cap=100, max_cost=1000) == ("SELECT 1", False, 10)
+
+
+def test_guard_sql_limits_large_result():
+    limited = "SELECT * FROM (SELECT * FROM assays) AS guarded LIMIT 101"
+    conn = FakeConn({"SELECT * FROM assays": (500, 10_000), limited: (5, 101)})
+    assert guard_sql(conn, "SELECT * FROM assays", row_cap=100, max_cost=1000) == (limited, True, 5)
+
+
+def test_guard_sql_rejects_expensive_limited_plan():
+    sql = "SELECT name FROM compounds ORDER BY name"
+    limited = f"SELECT * FROM ({sql}) AS guarded LIMIT 101"
+    conn = FakeConn({sql: (50_000, 10_000), limited: (40_000, 101)})
+    with pytest.raises(SqlGuardError):
+        guard_sql(conn, sql, row_cap=100, max_cost=1000)
+
+
+def test_cached_result_keeps_dtypes(tmp_path, monkeypatch):
+    monkeypatch.setattr(sql_guard.Queries, "data_version", staticmethod(lambda: 1))
+    rows = [(datetime.date(2024, 1, i), decimal.Decimal(f"{i}.5")) for i in (1, 2, 3)]
+    conn = FakeConn({"SELECT day, value FROM t": (10, 2)}, rows)
+    guard = SqlGuard(SqliteCache(tmp_path / "sql.sqlite", "sql_results"), row_cap=2, max_cost=1000,
+                     engine=FakeEngine(conn))
+
+    first = guard.run("SELECT day, value FROM t")
+    second = guard.run("SELECT day, value FROM t")
+
+    assert first.truncated and not first.cached
+    assert second.cached and second.truncated
+    pd.testing.assert_frame_equal(first.frame, second.frame)
+    assert isinstance(second.frame["day"][0], datetime.date)
+    assert second.frame["value"][0] == decimal.Decimal("1.5")